@@ -1 +1,20 @@
-# Version: 2.1.0
\ No newline at end of file
+# Version: 2.1.0
+'''
+com.nwrobel.mypycommons
+
+The modules of this package are loaded lazily: after "from com.nwrobel import mypycommons", a module
+like mypycommons.file is imported the first time it is accessed. Scripts therefore only pay the
+import cost of the modules they actually use.
+'''
+
+_MODULE_NAMES = ('aio', 'archive', 'display', 'file', 'instrumentation', 'logger', 'string', 'system', 'time', 'utils')
+
+def __getattr__(name):
+    if (name in _MODULE_NAMES):
+        import importlib
+        return importlib.import_module('.' + name, __name__)
+
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_MODULE_NAMES))
@@ -0,0 +1,251 @@
+'''
+com.nwrobel.aio
+
+This module contains asyncio versions of the (blocking) file operations of the file module, for use
+in event loop applications. The blocking work runs on a dedicated, bounded thread pool, so it never
+blocks the event loop and it doesn't compete with the loop's default executor.
+'''
+
+import os
+import threading
+
+from com.nwrobel import mypycommons
+import com.nwrobel.mypycommons.file
+
+# asyncio (and shutil, itertools) are imported inside the functions, so that importing this module
+# stays cheap. When the functions are called, asyncio is already imported by the running event loop.
+
+_executor = None
+_executorLock = threading.Lock()
+_maxWorkers = min(32, (os.cpu_count() or 1) + 4)
+_maxPendingOperations = _maxWorkers * 4
+# event loop -> semaphore limiting the operations pending on the executor from that loop
+_loopSemaphores = None
+
+def configureExecutor(maxWorkers: int = None, maxPendingOperations: int = None):
+    '''
+    Sets the limits of the thread pool used to run the blocking file operations. Operations already
+    running finish on the old pool.
+
+    @params
+    maxWorkers: (optional) max number of blocking operations running at the same time. Default is
+        based on the CPU count (like the ThreadPoolExecutor default)
+    maxPendingOperations: (optional) max number of operations running or queued per event loop. More
+        operations wait (asynchronously) before being queued, so a burst of calls can't queue up
+        unbounded work. Default is 4 times maxWorkers
+    '''
+    global _executor, _maxWorkers, _maxPendingOperations, _loopSemaphores
+
+    with _executorLock:
+        _maxWorkers = maxWorkers if (maxWorkers is not None) else min(32, (os.cpu_count() or 1) + 4)
+        _maxPendingOperations = maxPendingOperations if (maxPendingOperations is not None) else (_maxWorkers * 4)
+
+        oldExecutor = _executor
+        _executor = None
+        _loopSemaphores = None
+
+    if (oldExecutor is not None):
+        oldExecutor.shutdown(wait=False)
+
+def shutdownExecutor():
+    '''
+    Shuts down the thread pool used to run the blocking file operations, waiting for the running
+    operations to finish. A new pool is created if another operation is started later.
+    '''
+    global _executor, _loopSemaphores
+
+    with _executorLock:
+        oldExecutor = _executor
+        _executor = None
+        _loopSemaphores = None
+
+    if (oldExecutor is not None):
+        oldExecutor.shutdown(wait=True)
+
+async def readFile(filepath, encoding: str = 'utf-8'):
+    '''
+    Async version of file.readFile: reads the given file and returns a list of its lines, without
+    newline characters.
+
+    @params
+    filepath: path to the file
+    encoding: (optional) the encoding to use to read the text of the file as, default is utf-8
+    '''
+    return await _runBlocking(mypycommons.file.readFile, filepath, encoding)
+
+async def writeToFile(filepath, content, append: bool = False, compression: str = None, atomic: bool = False, durability: str = 'none'):
+    '''
+    Async version of file.writeToFile: writes the given content (a string, or a list of strings
+    written one per line) to the given file. See file.writeToFile for the params.
+    '''
+    return await _runBlocking(mypycommons.file.writeToFile, filepath, content, append, compression, atomic, durability)
+
+async def copyToDirectory(path, destDir):
+    '''
+    Async version of file.copyToDirectory: copies the given path (file or folder) to the destination
+    directory, preserving metadata and permissions.
+
+    When the calling task is cancelled, copying a directory stops before the next file (the files
+    copied so far are kept); a single file being copied is finished.
+
+    @params
+    path: (str) the path (file or folder) to copy to the dir
+    destDir: (str) path of the target directory to copy to
+    '''
+    cancelEvent = threading.Event()
+    return await _runBlocking(_copyToDirectory, path, destDir, cancelEvent, cancelEvent=cancelEvent)
+
+async def getChildPathsRecursive(rootDir: str, pathType: str = None, containsStr: str = None, useWindowsExtendedPaths: bool = False):
+    '''
+    Async version of file.getChildPathsRecursive: gets the sorted list of child paths of the root
+    directory, recursively. See file.getChildPathsRecursive for the params.
+
+    For large trees, iterateChildPaths gives the paths as they are found instead.
+    '''
+    return await _runBlocking(mypycommons.file.getChildPathsRecursive, rootDir, pathType, containsStr, useWindowsExtendedPaths)
+
+async def iterateChildPaths(rootDir: str, recursive: bool = True, pathType: str = None, batchSize: int = 256):
+    '''
+    Async generator giving the child paths of the root directory as the directory tree is walked
+    (not sorted). The walk runs on the thread pool in batches of paths, so the event loop gets
+    control back after every batch.
+
+    @params
+    rootDir: the parent directory to walk
+    recursive: (optional) include the paths within the child directories
+    pathType: (optional) "file" or "dir" to give only files or only directories
+    batchSize: (optional) number of paths walked per thread pool call
+
+    @example
+    async for filepath in iterateChildPaths("/var/log", pathType="file"):
+        ...
+    '''
+    import itertools
+
+    walker = mypycommons.file._scanDirectoryPaths(rootDir, recursive)
+    while (True):
+        pathsBatch = await _runBlocking(lambda: list(itertools.islice(walker, batchSize)))
+        if (not pathsBatch):
+            return
+
+        for path, isDir in pathsBatch:
+            if (pathType is None or (pathType == 'dir') == isDir):
+                yield path
+
+async def iterateFileLines(filepath, encoding: str = 'utf-8', batchSize: int = 1024):
+    '''
+    Async generator giving the lines of the given file (without newline characters), so large files
+    can be processed without reading them whole. The file is read on the thread pool in batches of
+    lines, so the event loop gets control back after every batch. Compressed files (gzip, bz2, xz)
+    are decompressed as they are read.
+
+    @params
+    filepath: path to the file
+    encoding: (optional) the encoding to use to read the text of the file as, default is utf-8
+    batchSize: (optional) number of lines read per thread pool call
+
+    @example
+    async for line in iterateFileLines("access.log"):
+        ...
+    '''
+    import itertools
+
+    inputFile = await _runBlocking(mypycommons.file._openTextFileForRead, filepath, encoding)
+    # a cancelled batch read can still be running on the pool, so it must finish before closing
+    fileLock = threading.Lock()
+
+    def readLinesBatch():
+        with fileLock:
+            return [line.rstrip('\n') for line in itertools.islice(inputFile, batchSize)]
+
+    def closeFile():
+        with fileLock:
+            inputFile.close()
+
+    try:
+        while (True):
+            linesBatch = await _runBlocking(readLinesBatch)
+            if (not linesBatch):
+                return
+
+            for line in linesBatch:
+                yield line
+    finally:
+        await _runBlocking(closeFile)
+
+# -------------------------------- Private module helper functions ---------------------------------
+#
+def _getExecutor():
+    '''
+    Returns the thread pool for the blocking operations, creating it on first use.
+    '''
+    global _executor
+
+    with _executorLock:
+        if (_executor is None):
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=_maxWorkers, thread_name_prefix='mypycommons-aio')
+        return _executor
+
+def _getLoopSemaphore(loop):
+    '''
+    Returns the semaphore limiting the pending operations of the given event loop.
+    '''
+    global _loopSemaphores
+
+    import asyncio
+    import weakref
+
+    with _executorLock:
+        if (_loopSemaphores is None):
+            _loopSemaphores = weakref.WeakKeyDictionary()
+
+        semaphore = _loopSemaphores.get(loop)
+        if (semaphore is None):
+            semaphore = asyncio.Semaphore(_maxPendingOperations)
+            _loopSemaphores[loop] = semaphore
+        return semaphore
+
+async def _runBlocking(func, *args, cancelEvent=None):
+    '''
+    Runs the given blocking function on the thread pool and returns its result. If the calling task
+    is cancelled, an operation that hasn't started yet is dropped, and the cancel event (if given) is
+    set so that a running operation can stop early.
+    '''
+    import asyncio
+    import functools
+
+    loop = asyncio.get_running_loop()
+    async with _getLoopSemaphore(loop):
+        try:
+            return await loop.run_in_executor(_getExecutor(), functools.partial(func, *args))
+        except asyncio.CancelledError:
+            if (cancelEvent is not None):
+                cancelEvent.set()
+            raise
+
+def _copyToDirectory(path, destDir, cancelEvent):
+    '''
+    Copies the given path to the destination directory like file.copyToDirectory, checking the
+    cancel event before copying each file.
+    '''
+    import shutil
+
+    def copyFileUnlessCancelled(sourcePath, destPath):
+        if (cancelEvent.is_set()):
+            raise _CopyCancelledError("The copy was cancelled")
+        return shutil.copy2(sourcePath, destPath)
+
+    if (mypycommons.file.isFile(path)):
+        shutil.copy2(path, destDir)
+    elif (mypycommons.file.isDirectory(path)):
+        newDirFilepath = mypycommons.file.joinPaths(destDir, mypycommons.file.getFilename(path))
+        shutil.copytree(path, newDirFilepath, copy_function=copyFileUnlessCancelled)
+    else:
+        raise Exception("The given path is invalid")
+
+class _CopyCancelledError(Exception):
+    '''
+    Raised in the worker thread of a cancelled copy, to stop copytree early (it only collects OSErrors).
+    '''
+    pass
@@ -4,19 +4,204 @@ com.nwrobel.archive
 This module contains functionality dealing with archives/compressed files in various formats.
 '''
 
-import subprocess
-import gzip
-import shutil
+import os
+import abc
+
 from com.nwrobel import mypycommons
 import com.nwrobel.mypycommons.system
 import com.nwrobel.mypycommons.file
 
+# Format of the archive index sidecar files ("<archive>.index.json")
+_ARCHIVE_INDEX_VERSION = 1
+_ARCHIVE_INDEX_FILE_SUFFIX = '.index.json'
+# Checksum manifest sidecar files ("<archive>.sha256.json")
+_CHECKSUM_MANIFEST_FILE_SUFFIX = '.sha256.json'
+_7Z_MAGIC_BYTES = b"7z\xbc\xaf\x27\x1c"
+# Files/blocks whose sampled data compresses to more than this fraction of its size are stored raw
+_INCOMPRESSIBLE_RATIO = 0.95
+# 7z switches for each compression codec name (None: the default, maximum compression settings)
+_7Z_COMPRESSION_ARGS = {
+    None: ['-mx=7', '-mfb=64', '-md=64m'],
+    'store': ['-mx=0'],
+    'gzip': ['-m0=Deflate', '-mx=7'],
+    'bz2': ['-m0=BZip2', '-mx=7'],
+    'lzma': ['-m0=LZMA2', '-mx=7', '-mfb=64', '-md=64m'],
+}
+
+# name -> CompressionCodec, filled on first use (see _getCompressionCodecs)
+_compressionCodecs = None
+
 class ArchiveSourcePathNotFoundError(Exception):
     '''
     '''
     def __init__(self, message):            
         super().__init__(message)
 
+class ArchiveMemberNotFoundError(Exception):
+    '''
+    '''
+    def __init__(self, message):            
+        super().__init__(message)
+
+class CompressionCodec(abc.ABC):
+    '''
+    Base class for the compression codecs used by the archive functions. A codec compresses whole
+    byte strings or files. Subclass this (implementing compress, decompress and openFile) and
+    register an instance with registerCompressionCodec to add a codec.
+
+    @attributes
+    name: name of the codec, used to select it (like "gzip")
+    fileExtension: file extension of files compressed with the codec (like ".gz")
+    defaultLevel: compression level used when none is given
+    zipCompressType: zipfile compression constant for this codec, or None if zip doesn't support it
+    '''
+    name = None
+    fileExtension = ''
+    defaultLevel = None
+    zipCompressType = None
+
+    def isAvailable(self):
+        '''
+        Returns whether the codec can be used (its module is installed).
+        '''
+        return True
+
+    @abc.abstractmethod
+    def compress(self, data, level=None):
+        '''
+        Returns the given bytes compressed, at the given level (or the default level).
+        '''
+
+    @abc.abstractmethod
+    def decompress(self, data):
+        '''
+        Returns the given compressed bytes decompressed.
+        '''
+
+    @abc.abstractmethod
+    def openFile(self, filepath, mode='rb', level=None):
+        '''
+        Opens the given file for reading ("rb") or writing ("wb") through the codec, giving a binary
+        file object that (de)compresses on the fly.
+        '''
+
+    def __repr__(self):
+        return "CompressionCodec({!r})".format(self.name)
+
+class ArchiveCreationError(Exception):
+    '''
+    Raised when the archiving tool (tar, 7z) fails to create the archive.
+    '''
+    def __init__(self, message):            
+        super().__init__(message)
+
+class ArchiveVerificationResult:
+    '''
+    Result of verifyArchive: which archive members didn't match the checksum manifest, and how fast
+    the archive was verified.
+
+    @attributes
+    verifiedCount: number of members whose checksum was checked
+    mismatchedMembers: names of the members whose data doesn't match the manifest (or couldn't be read)
+    missingMembers: names of the files in the manifest that are not in the archive
+    extraMembers: names of the file members of the archive that are not in the manifest
+    bytesVerified: total size of the member data read
+    elapsedSeconds: time taken to verify the archive
+    '''
+    def __init__(self, verifiedCount, mismatchedMembers, missingMembers, extraMembers, bytesVerified, elapsedSeconds):
+        self.verifiedCount = verifiedCount
+        self.mismatchedMembers = mismatchedMembers
+        self.missingMembers = missingMembers
+        self.extraMembers = extraMembers
+        self.bytesVerified = bytesVerified
+        self.elapsedSeconds = elapsedSeconds
+
+    def __repr__(self):
+        return "ArchiveVerificationResult(isValid={}, verifiedCount={}, mismatched={}, missing={}, extra={}, {:.1f} MB/s)".format(
+            self.isValid, self.verifiedCount, len(self.mismatchedMembers), len(self.missingMembers), len(self.extraMembers), 
+            self.throughputBytesPerSecond / 1000000)
+
+    @property
+    def isValid(self):
+        '''
+        True if all the files of the manifest are in the archive with matching data.
+        '''
+        return (not self.mismatchedMembers and not self.missingMembers)
+
+    @property
+    def throughputBytesPerSecond(self):
+        if (self.elapsedSeconds <= 0):
+            return 0.0
+        return self.bytesVerified / self.elapsedSeconds
+
+class ArchiveMemberInfo:
+    '''
+    Information about one member (file, directory, link) of an archive, as recorded in its index.
+
+    @attributes
+    name: path of the member within the archive
+    memberType: "file", "dir", "symlink", "hardlink" or "other"
+    size: size of the member data in bytes (0 for non-files)
+    offset: position of the member data within the (uncompressed) tar stream
+    mode: permission bits of the member
+    mtime: modified timestamp of the member
+    linkName: target of a symlink/hardlink member, otherwise empty
+    '''
+    def __init__(self, name, memberType, size, offset, mode, mtime, linkName=''):
+        self.name = name
+        self.memberType = memberType
+        self.size = size
+        self.offset = offset
+        self.mode = mode
+        self.mtime = mtime
+        self.linkName = linkName
+
+    def __repr__(self):
+        return "ArchiveMemberInfo(name={!r}, memberType={!r}, size={})".format(self.name, self.memberType, self.size)
+
+class ArchiveIndex:
+    '''
+    Index of the members of an archive, giving their data offsets and sizes so that single members can
+    be listed and read without scanning the archive. Get one with loadArchiveIndex or buildArchiveIndex.
+
+    @attributes
+    archiveFilepath: path of the indexed archive
+    archiveFormat: "tar" (uncompressed tar) or "tar.gz-blocks" (tar compressed as independent gzip
+        blocks, by createIndexedGzipArchive)
+    '''
+    def __init__(self, archiveFilepath, archiveFormat, members, blocks=None):
+        self.archiveFilepath = archiveFilepath
+        self.archiveFormat = archiveFormat
+        self._members = { member.name: member for member in members }
+        # (uncompressed offset, compressed offset) of each gzip block, for "tar.gz-blocks" archives
+        self._blocks = blocks or []
+        self._blockUncompressedOffsets = [block[0] for block in self._blocks]
+
+    def __len__(self):
+        return len(self._members)
+
+    def __contains__(self, memberName):
+        return memberName in self._members
+
+    def __iter__(self):
+        return iter(self._members.values())
+
+    def getMemberNames(self):
+        '''
+        Returns the list of the names of all the archive members, in archive order.
+        '''
+        return list(self._members)
+
+    def getMember(self, memberName) -> ArchiveMemberInfo:
+        '''
+        Returns the ArchiveMemberInfo of the given member. Raises ArchiveMemberNotFoundError if the
+        archive has no member with that name.
+        '''
+        try:
+            return self._members[memberName.lstrip('/')]
+        except KeyError:
+            raise ArchiveMemberNotFoundError("The archive {} has no member named {}".format(self.archiveFilepath, memberName))
+
 def extractSingleFileGZArchive(archiveFilepath, outputFilepath):
     '''
     Given the filepath of an input .GZ file and the filepath of the output file, this
@@ -29,22 +214,33 @@ def extractSingleFileGZArchive(archiveFilepath, outputFilepath):
     archiveFilepath: path of the input archive file (gzip)
     outputFilepath: path that will be the output, uncompressed file
     '''
+    import gzip
+    import shutil
+
     with gzip.open(archiveFilepath, 'rb') as inputFile:
         with open(outputFilepath, 'wb') as outputFile:
             shutil.copyfileobj(inputFile, outputFile)
 
-def create7zArchive(inputFilePath, archiveOutFilePath, sevenZipCommand=''):
+def create7zArchive(inputFilePath, archiveOutFilePath, sevenZipCommand='', writeManifest=False, compression=None):
     '''
-    Compresses the given paths into a 7zip archive with maximum compression settings.
+    Compresses the given paths into a 7zip archive, with maximum compression settings by default.
+    Raises ArchiveCreationError if 7z fails (warnings, like files that couldn't be read, don't raise).
     
     @params
     inputFilePath: (str or list) the input path(s) to compress into an archive
     archiveOutFilePath: the filepath of the output archive file (should include the .7z extension)
     sevenZipCommand: (optional) string of the command used to execute 7z on this system
+    writeManifest: (optional) also write a checksum (sha256) manifest of the input files to a sidecar
+        file ("<archive>.sha256.json"), for checking the archive later with verifyArchive
+    compression: (optional) "store", "gzip" (Deflate), "bz2" or "lzma" (LZMA2) to choose the 7z
+        compression method, or "auto" to sample the input files and store them uncompressed when
+        they are (mostly) incompressible, like media files. Default is LZMA2 with maximum settings
     
     @notes
     7zip must be installed on the system and 7z must be in the path for this command to work.
     '''
+    import subprocess
+
     if (not isinstance(inputFilePath, list)):
         inputFilePath = [inputFilePath]
 
@@ -59,20 +255,44 @@ def create7zArchive(inputFilePath, archiveOutFilePath, sevenZipCommand=''):
         else:
             sevenZipCommand = '7z'
 
-    sevenZipArgs = [sevenZipCommand] + ['a', '-t7z', '-mx=7', '-mfb=64', '-md=64m', '-mtc', '-mta', '-mtm', archiveOutFilePath]
+    if (compression == 'auto'):
+        compression = 'store' if (_estimateInputPathsCompressionRatio(inputFilePath) > _INCOMPRESSIBLE_RATIO) else None
+    if (compression not in _7Z_COMPRESSION_ARGS):
+        raise ValueError("Compression '{}' is not supported for 7z archives".format(compression))
+
+    sevenZipArgs = [sevenZipCommand] + ['a', '-t7z'] + _7Z_COMPRESSION_ARGS[compression] + ['-mtc', '-mta', '-mtm', archiveOutFilePath]
     for inFilePath in inputFilePath:
         sevenZipArgs.append(inFilePath)
-        
-    subprocess.call(sevenZipArgs)
 
-def createTarArchive(inputFilePath, archiveOutFilePath):
+    # the input files are hashed on other threads while 7z runs, so hashing overlaps with the archive creation
+    manifestBuilder = _ChecksumManifestBuilder(inputFilePath, useBaseNames=True) if (writeManifest) else None
+    try:
+        returnCode = subprocess.call(sevenZipArgs)
+        # 7z exit code 1 is a warning (some files couldn't be read), 2 and up are errors
+        if (returnCode >= 2):
+            raise ArchiveCreationError("7z failed to create the archive {} (exit code {})".format(archiveOutFilePath, returnCode))
+
+        if (manifestBuilder is not None):
+            manifestBuilder.writeManifest(archiveOutFilePath)
+    finally:
+        if (manifestBuilder is not None):
+            manifestBuilder.close()
+
+def createTarArchive(inputFilePath, archiveOutFilePath, writeIndex=False, writeManifest=False):
     '''
-    Compresses the given paths into a TAR archive. This function only works on Linux machines.
+    Compresses the given paths into a TAR archive. This function only works on Linux machines. 
+    Raises ArchiveCreationError if tar fails (including when a file changed while it was read).
     
     @params
     inputFilePath: (str or list) the input path(s) to compress into an archive
     archiveOutFilePath: the filepath of the output archive file (should include the .tar extension)
+    writeIndex: (optional) also write the member index of the archive to a sidecar file
+        ("<archive>.index.json"), for fast listing and extraction of single members later
+    writeManifest: (optional) also write a checksum (sha256) manifest of the input files to a sidecar
+        file ("<archive>.sha256.json"), for checking the archive later with verifyArchive
     '''
+    import subprocess
+
     if (not isinstance(inputFilePath, list)):
         inputFilePath = [inputFilePath]
 
@@ -86,5 +306,859 @@ def createTarArchive(inputFilePath, archiveOutFilePath):
     tarArgs = ['tar', 'cvf', archiveOutFilePath]
     for inFilePath in inputFilePath:
         tarArgs.append(inFilePath)
-        
-    subprocess.call(tarArgs)
\ No newline at end of file
+
+    manifestBuilder = _ChecksumManifestBuilder(inputFilePath, useBaseNames=False) if (writeManifest) else None
+    try:
+        returnCode = subprocess.call(tarArgs)
+        if (returnCode != 0):
+            raise ArchiveCreationError("tar failed to create the archive {} (exit code {})".format(archiveOutFilePath, returnCode))
+
+        if (writeIndex):
+            buildArchiveIndex(archiveOutFilePath)
+        if (manifestBuilder is not None):
+            manifestBuilder.writeManifest(archiveOutFilePath)
+    finally:
+        if (manifestBuilder is not None):
+            manifestBuilder.close()
+
+def createIndexedGzipArchive(inputFilePath, archiveOutFilePath, blockSizeBytes=1024 * 1024, compressionLevel=6, writeManifest=False,
+                             storeIncompressibleBlocks=True):
+    '''
+    Compresses the given paths into a gzip compressed TAR archive (.tar.gz) made of independent gzip
+    blocks, and writes its member index to a sidecar file ("<archive>.index.json"). Single members
+    can then be read/extracted by decompressing only the blocks holding them, instead of the whole
+    archive. The archive is still a standard .tar.gz that any tar/gzip tool can read. Works on all 
+    platforms (doesn't use the tar command). Returns the ArchiveIndex of the archive.
+
+    Member names are the input paths without a leading slash, like the tar command gives them.
+
+    @params
+    inputFilePath: (str or list) the input path(s) to compress into an archive
+    archiveOutFilePath: the filepath of the output archive file (should include the .tar.gz extension)
+    blockSizeBytes: (optional) amount of uncompressed data per gzip block: smaller blocks make reading
+        single members faster, bigger blocks compress a bit better. Default is 1 MiB
+    compressionLevel: (optional) gzip compression level, 1 (fastest) to 9 (smallest)
+    writeManifest: (optional) also write a checksum (sha256) manifest of the input files to a sidecar
+        file ("<archive>.sha256.json"), for checking the archive later with verifyArchive
+    storeIncompressibleBlocks: (optional) sample each block and store it uncompressed (still valid
+        gzip) if it barely compresses, like blocks of media files, to save the CPU time
+    '''
+    import tarfile
+
+    if (not isinstance(inputFilePath, list)):
+        inputFilePath = [inputFilePath]
+
+    for filePath in inputFilePath:
+        if (not mypycommons.file.pathExists(filePath)):
+            raise ArchiveSourcePathNotFoundError("The given source path was not found ({}), unable to create archive".format(filePath))
+
+    manifestBuilder = _ChecksumManifestBuilder(inputFilePath, useBaseNames=False) if (writeManifest) else None
+    try:
+        members = []
+        with open(archiveOutFilePath, 'wb') as archiveFile:
+            blockWriter = _GzipBlockWriter(archiveFile, blockSizeBytes, compressionLevel, storeIncompressibleBlocks)
+            with tarfile.open(fileobj=blockWriter, mode='w', format=tarfile.PAX_FORMAT) as tar:
+                for inFilePath in inputFilePath:
+                    _addPathToTar(tar, inFilePath, members)
+            blockWriter.close()
+
+        archiveIndex = ArchiveIndex(archiveOutFilePath, 'tar.gz-blocks', members, blockWriter.blocks)
+        _writeArchiveIndex(archiveIndex)
+
+        if (manifestBuilder is not None):
+            manifestBuilder.writeManifest(archiveOutFilePath)
+    finally:
+        if (manifestBuilder is not None):
+            manifestBuilder.close()
+
+    return archiveIndex
+
+def buildArchiveIndex(archiveFilepath, writeIndex=True):
+    '''
+    Scans the given uncompressed TAR archive for its members (reading only the member headers, not
+    their data), writes the member index to a sidecar file ("<archive>.index.json") and returns the
+    ArchiveIndex.
+
+    Compressed archives can't be indexed after they are created (a compressed stream can't be 
+    decompressed from the middle): create them with createIndexedGzipArchive instead. 7z archives are
+    not supported.
+
+    @params
+    archiveFilepath: path of the .tar archive
+    writeIndex: (optional) whether or not to write the sidecar index file, default is True
+    '''
+    import tarfile
+
+    members = []
+    try:
+        with tarfile.open(archiveFilepath, 'r:') as tar:
+            for tarInfo in tar:
+                members.append(_getArchiveMemberInfo(tarInfo, tarInfo.offset_data))
+    except tarfile.ReadError:
+        raise ValueError("Only uncompressed tar archives can be indexed, unable to index {}".format(archiveFilepath))
+
+    archiveIndex = ArchiveIndex(archiveFilepath, 'tar', members)
+    if (writeIndex):
+        _writeArchiveIndex(archiveIndex)
+    return archiveIndex
+
+def loadArchiveIndex(archiveFilepath, writeIndex=True) -> ArchiveIndex:
+    '''
+    Returns the ArchiveIndex of the given archive, from its sidecar index file. If there is no index
+    file yet, or the archive changed since it was written, the (uncompressed tar) archive is scanned
+    and a new index file is written.
+
+    @params
+    archiveFilepath: path of the archive
+    writeIndex: (optional) whether or not to write the new index file when the archive is scanned,
+        default is True
+    '''
+    import json
+
+    indexFilepath = archiveFilepath + _ARCHIVE_INDEX_FILE_SUFFIX
+    try:
+        with open(indexFilepath, 'r', encoding='utf-8') as indexFile:
+            indexData = json.load(indexFile)
+    except FileNotFoundError:
+        return buildArchiveIndex(archiveFilepath, writeIndex)
+
+    archiveStat = os.stat(archiveFilepath)
+    indexIsCurrent = (indexData.get('version') == _ARCHIVE_INDEX_VERSION and indexData['archiveSize'] == archiveStat.st_size and 
+                      indexData['archiveMtimeNs'] == archiveStat.st_mtime_ns)
+    if (not indexIsCurrent):
+        if (indexData.get('format') != 'tar'):
+            raise ValueError("The index of the archive {} is out of date, and can't be rebuilt for its format".format(archiveFilepath))
+        return buildArchiveIndex(archiveFilepath, writeIndex)
+
+    members = [ArchiveMemberInfo(*memberData) for memberData in indexData['members']]
+    blocks = [tuple(block) for block in indexData.get('blocks', [])]
+    return ArchiveIndex(archiveFilepath, indexData['format'], members, blocks)
+
+def listArchiveMembers(archiveFilepath, archiveIndex=None):
+    '''
+    Returns the list of the names of the members of the given archive, in archive order, using the
+    archive index (see loadArchiveIndex).
+
+    @params
+    archiveFilepath: path of the archive
+    archiveIndex: (optional) the already loaded ArchiveIndex of the archive
+    '''
+    if (archiveIndex is None):
+        archiveIndex = loadArchiveIndex(archiveFilepath)
+
+    return archiveIndex.getMemberNames()
+
+def readArchiveMember(archiveFilepath, memberName, archiveIndex=None):
+    '''
+    Returns the data (bytes) of a single file member of the given archive, read directly from its
+    offset using the archive index (see loadArchiveIndex), without extracting the archive.
+
+    @params
+    archiveFilepath: path of the archive (a .tar, or a .tar.gz made by createIndexedGzipArchive)
+    memberName: name of the member, as given by listArchiveMembers
+    archiveIndex: (optional) the already loaded ArchiveIndex of the archive
+    '''
+    if (archiveIndex is None):
+        archiveIndex = loadArchiveIndex(archiveFilepath)
+
+    return b''.join(_iterateArchiveMemberData(archiveIndex, archiveIndex.getMember(memberName)))
+
+def extractArchiveMember(archiveFilepath, memberName, outputFilepath, archiveIndex=None):
+    '''
+    Extracts a single file member of the given archive to the output file, reading it directly from
+    its offset using the archive index (see loadArchiveIndex), without extracting the whole archive.
+    The member's modified time is applied to the output file.
+
+    @params
+    archiveFilepath: path of the archive (a .tar, or a .tar.gz made by createIndexedGzipArchive)
+    memberName: name of the member, as given by listArchiveMembers
+    outputFilepath: path of the file to extract the member to
+    archiveIndex: (optional) the already loaded ArchiveIndex of the archive
+    '''
+    if (archiveIndex is None):
+        archiveIndex = loadArchiveIndex(archiveFilepath)
+
+    member = archiveIndex.getMember(memberName)
+    with open(outputFilepath, 'wb') as outputFile:
+        for dataChunk in _iterateArchiveMemberData(archiveIndex, member):
+            outputFile.write(dataChunk)
+
+    os.utime(outputFilepath, (member.mtime, member.mtime))
+
+def verifyArchive(archiveFilepath, manifestFilepath=None, numWorkers=None, sevenZipCommand='') -> ArchiveVerificationResult:
+    '''
+    Checks every file member of the given archive against the checksum manifest written when the
+    archive was created (see the writeManifest param of the create functions). The member data is
+    streamed and hashed in memory, nothing is extracted to disk. Returns an ArchiveVerificationResult
+    with the mismatched/missing members and the throughput.
+
+    Uncompressed tars and archives made by createIndexedGzipArchive are verified in parallel, each
+    worker seeking to its members using the archive index (a tar without an index file is scanned,
+    its index is kept in memory only). Other compressed tars (.tar.gz, .tar.bz2,
+    .tar.xz) are streamed through once. 7z archives are verified in parallel by having 7z extract
+    each member to a pipe (7z must be installed).
+
+    @params
+    archiveFilepath: path of the archive to verify
+    manifestFilepath: (optional) path of the checksum manifest, default is the sidecar file of the 
+        archive ("<archive>.sha256.json")
+    numWorkers: (optional) number of threads hashing members in parallel, default is based on the 
+        CPU count
+    sevenZipCommand: (optional) string of the command used to execute 7z on this system
+    '''
+    import json
+    import time
+
+    if (manifestFilepath is None):
+        manifestFilepath = archiveFilepath + _CHECKSUM_MANIFEST_FILE_SUFFIX
+    with open(manifestFilepath, 'r', encoding='utf-8') as manifestFile:
+        manifestMembers = json.load(manifestFile)['members']
+
+    startTime = time.perf_counter()
+    with open(archiveFilepath, 'rb') as archiveFile:
+        isSevenZipArchive = (archiveFile.read(len(_7Z_MAGIC_BYTES)) == _7Z_MAGIC_BYTES)
+
+    if (isSevenZipArchive):
+        memberNames = _get7zArchiveFileMemberNames(archiveFilepath, sevenZipCommand)
+        memberDataFunc = lambda memberName: _iterate7zArchiveMemberData(archiveFilepath, memberName, sevenZipCommand)
+        memberChecksums = _getMemberChecksumsInParallel(memberNames, manifestMembers, memberDataFunc, numWorkers)
+    else:
+        try:
+            archiveIndex = loadArchiveIndex(archiveFilepath, writeIndex=False)
+        except ValueError:
+            archiveIndex = None
+
+        if (archiveIndex is not None):
+            memberNames = [member.name for member in archiveIndex if (member.memberType == 'file')]
+            memberDataFunc = lambda memberName: _iterateArchiveMemberData(archiveIndex, archiveIndex.getMember(memberName))
+            memberChecksums = _getMemberChecksumsInParallel(memberNames, manifestMembers, memberDataFunc, numWorkers)
+        else:
+            memberChecksums = _getStreamedTarMemberChecksums(archiveFilepath)
+
+    mismatchedMembers = []
+    bytesVerified = 0
+    for memberName, (checksum, size) in memberChecksums.items():
+        if (memberName not in manifestMembers):
+            continue
+        bytesVerified += size
+        if (checksum != manifestMembers[memberName]['sha256'] or size != manifestMembers[memberName]['size']):
+            mismatchedMembers.append(memberName)
+
+    missingMembers = [memberName for memberName in manifestMembers if (memberName not in memberChecksums)]
+    extraMembers = [memberName for memberName in memberChecksums if (memberName not in manifestMembers)]
+    verifiedCount = len(memberChecksums) - len(extraMembers)
+
+    return ArchiveVerificationResult(verifiedCount, sorted(mismatchedMembers), sorted(missingMembers), sorted(extraMembers), 
+                                     bytesVerified, time.perf_counter() - startTime)
+
+def registerCompressionCodec(codec: CompressionCodec):
+    '''
+    Adds the given codec (an instance of a CompressionCodec subclass) to the codecs that can be
+    selected by name, replacing any codec with the same name.
+    '''
+    _getCompressionCodecs()[codec.name] = codec
+
+def getCompressionCodec(codecName) -> CompressionCodec:
+    '''
+    Returns the compression codec with the given name: "store" (no compression), "gzip", "bz2",
+    "lzma", "zstd" (if the zstandard package is installed), or a registered codec. Raises ValueError
+    if there is no such codec or it is not available.
+    '''
+    codec = _getCompressionCodecs().get(codecName)
+    if (codec is None):
+        raise ValueError("Unknown compression codec '{}'".format(codecName))
+    if (not codec.isAvailable()):
+        raise ValueError("The compression codec '{}' is not available (its module is not installed)".format(codecName))
+
+    return codec
+
+def getAvailableCompressionCodecNames():
+    '''
+    Returns the names of the compression codecs that can be used on this system.
+    '''
+    return [codecName for codecName, codec in _getCompressionCodecs().items() if (codec.isAvailable())]
+
+def estimateCompressionRatio(filepath, sampleSizeBytes=64 * 1024, numSamples=4):
+    '''
+    Estimates how well the given file compresses, by compressing a few sample blocks of it (the
+    first block and blocks spread through the rest of the file) with fast zlib compression. Returns
+    the estimated compressed size / original size: about 1.0 (or more) for incompressible data, like
+    already compressed media files, lower for compressible data.
+
+    @params
+    filepath: path of the file
+    sampleSizeBytes: (optional) size of each sample block
+    numSamples: (optional) number of sample blocks
+    '''
+    fileSize = os.path.getsize(filepath)
+    if (fileSize == 0):
+        return 1.0
+
+    if (fileSize <= sampleSizeBytes * numSamples):
+        sampleOffsets = [0]
+        sampleSizeBytes = fileSize
+    else:
+        sampleStep = (fileSize - sampleSizeBytes) // (numSamples - 1) if (numSamples > 1) else 0
+        sampleOffsets = [sampleNumber * sampleStep for sampleNumber in range(numSamples)]
+
+    samples = []
+    with open(filepath, 'rb') as inputFile:
+        for sampleOffset in sampleOffsets:
+            inputFile.seek(sampleOffset)
+            samples.append(inputFile.read(sampleSizeBytes))
+
+    return _estimateDataCompressionRatio(samples)
+
+def selectCompressionCodec(filepath, preferredCodecName='gzip') -> CompressionCodec:
+    '''
+    Returns the codec to compress the given file with: the "store" codec if sampling the file shows
+    it is incompressible (see estimateCompressionRatio), otherwise the preferred codec.
+
+    @params
+    filepath: path of the file
+    preferredCodecName: (optional) name of the codec to use for compressible files
+    '''
+    if (estimateCompressionRatio(filepath) > _INCOMPRESSIBLE_RATIO):
+        return getCompressionCodec('store')
+
+    return getCompressionCodec(preferredCodecName)
+
+def compressFile(inputFilepath, outputFilepath, codecName='auto', compressionLevel=None, preferredCodecName='gzip'):
+    '''
+    Compresses the given file with the given codec, streaming it, and returns the codec used. With
+    codecName "auto", the codec is chosen with selectCompressionCodec, so incompressible files are 
+    just copied.
+
+    @params
+    inputFilepath: path of the file to compress
+    outputFilepath: path of the compressed output file
+    codecName: (optional) name of the codec (see getCompressionCodec), or "auto"
+    compressionLevel: (optional) compression level for the codec, default is the codec's default
+    preferredCodecName: (optional) codec used for compressible files with codecName "auto"
+    '''
+    import shutil
+
+    if (codecName == 'auto'):
+        codec = selectCompressionCodec(inputFilepath, preferredCodecName)
+    else:
+        codec = getCompressionCodec(codecName)
+
+    with open(inputFilepath, 'rb') as inputFile:
+        with codec.openFile(outputFilepath, 'wb', compressionLevel) as outputFile:
+            shutil.copyfileobj(inputFile, outputFile, 1024 * 1024)
+
+    return codec
+
+def createZipArchive(inputFilePath, archiveOutFilePath, compression='auto', compressionLevel=None):
+    '''
+    Compresses the given paths into a ZIP archive, choosing the compression of each file separately.
+    With compression "auto", each file is sampled (see estimateCompressionRatio) and stored
+    uncompressed if it is incompressible (like media files), or compressed with Deflate otherwise.
+    Member names start at the last part of each input path. Works on all platforms.
+
+    @params
+    inputFilePath: (str or list) the input path(s) to compress into an archive
+    archiveOutFilePath: the filepath of the output archive file (should include the .zip extension)
+    compression: (optional) "auto", or the codec used for all the files: "store", "gzip" (Deflate), 
+        "bz2" or "lzma"
+    compressionLevel: (optional) compression level for the codec, default is the codec's default
+    '''
+    import zipfile
+
+    if (not isinstance(inputFilePath, list)):
+        inputFilePath = [inputFilePath]
+
+    for filePath in inputFilePath:
+        if (not mypycommons.file.pathExists(filePath)):
+            raise ArchiveSourcePathNotFoundError("The given source path was not found ({}), unable to create archive".format(filePath))
+
+    if (compression != 'auto' and getCompressionCodec(compression).zipCompressType is None):
+        raise ValueError("Compression '{}' is not supported for zip archives".format(compression))
+
+    with zipfile.ZipFile(archiveOutFilePath, 'w', allowZip64=True) as zipArchive:
+        for inFilePath in inputFilePath:
+            for filepath, memberName in _iterateArchiveInputFiles(inFilePath, useBaseNames=True):
+                if (compression == 'auto'):
+                    codec = selectCompressionCodec(filepath, 'gzip')
+                else:
+                    codec = getCompressionCodec(compression)
+
+                level = compressionLevel if (compressionLevel is not None) else codec.defaultLevel
+                zipArchive.write(filepath, memberName, compress_type=codec.zipCompressType, compresslevel=level)
+
+# -------------------------------- Private module helper functions ---------------------------------
+#
+class _GzipBlockWriter:
+    '''
+    Write-only file object that compresses the data written to it as a series of independent gzip
+    members (blocks) of blockSizeBytes of uncompressed data each, recording where each block starts.
+    tell() gives the uncompressed position, as tarfile expects.
+    '''
+    def __init__(self, outputFile, blockSizeBytes, compressionLevel, storeIncompressibleBlocks):
+        self._outputFile = outputFile
+        self._storeIncompressibleBlocks = storeIncompressibleBlocks
+        self._blockSizeBytes = blockSizeBytes
+        self._compressionLevel = compressionLevel
+        self._buffer = bytearray()
+        self._blockUncompressedOffset = 0
+        # (uncompressed offset, compressed offset) of each block
+        self.blocks = []
+
+    def write(self, data):
+        self._buffer += data
+        while (len(self._buffer) >= self._blockSizeBytes):
+            self._writeBlock(bytes(self._buffer[:self._blockSizeBytes]))
+            del self._buffer[:self._blockSizeBytes]
+        return len(data)
+
+    def tell(self):
+        return self._blockUncompressedOffset + len(self._buffer)
+
+    def close(self):
+        if (self._buffer):
+            self._writeBlock(bytes(self._buffer))
+            self._buffer = bytearray()
+
+    def _writeBlock(self, blockData):
+        import gzip
+
+        compressionLevel = self._compressionLevel
+        if (self._storeIncompressibleBlocks and _estimateDataCompressionRatio([blockData[:64 * 1024]]) > _INCOMPRESSIBLE_RATIO):
+            compressionLevel = 0
+
+        self.blocks.append((self._blockUncompressedOffset, self._outputFile.tell()))
+        self._outputFile.write(gzip.compress(blockData, compresslevel=compressionLevel, mtime=0))
+        self._blockUncompressedOffset += len(blockData)
+
+def _addPathToTar(tar, path, members):
+    '''
+    Adds the given path (recursively for directories) to the tar being written, appending the
+    ArchiveMemberInfo of each added member to the members list.
+    '''
+    tarInfo = tar.gettarinfo(path)
+    if (tarInfo is None):
+        # sockets and other unsupported file types are skipped, like the tar command does
+        return
+
+    if (tarInfo.isreg()):
+        with open(path, 'rb') as inputFile:
+            tar.addfile(tarInfo, inputFile)
+        # the data ends at the (512 byte aligned) current offset
+        dataOffset = tar.offset - (-(-tarInfo.size // 512) * 512)
+    else:
+        tar.addfile(tarInfo)
+        dataOffset = tar.offset
+
+    members.append(_getArchiveMemberInfo(tarInfo, dataOffset))
+
+    if (tarInfo.isdir()):
+        for childName in sorted(os.listdir(path)):
+            _addPathToTar(tar, os.path.join(path, childName), members)
+
+def _getArchiveMemberInfo(tarInfo, dataOffset):
+    '''
+    Returns the ArchiveMemberInfo for the given tarfile.TarInfo.
+    '''
+    if (tarInfo.issparse()):
+        memberType = 'other'
+    elif (tarInfo.isreg()):
+        memberType = 'file'
+    elif (tarInfo.isdir()):
+        memberType = 'dir'
+    elif (tarInfo.issym()):
+        memberType = 'symlink'
+    elif (tarInfo.islnk()):
+        memberType = 'hardlink'
+    else:
+        memberType = 'other'
+
+    memberSize = tarInfo.size if (memberType == 'file') else 0
+    return ArchiveMemberInfo(tarInfo.name, memberType, memberSize, dataOffset, tarInfo.mode, tarInfo.mtime, tarInfo.linkname)
+
+def _writeArchiveIndex(archiveIndex):
+    '''
+    Writes the given index to the sidecar index file of its archive, recording the archive size and
+    modified time so that an out of date index can be detected.
+    '''
+    import json
+
+    archiveStat = os.stat(archiveIndex.archiveFilepath)
+    indexData = {
+        'version': _ARCHIVE_INDEX_VERSION,
+        'format': archiveIndex.archiveFormat,
+        'archiveSize': archiveStat.st_size,
+        'archiveMtimeNs': archiveStat.st_mtime_ns,
+        'members': [[member.name, member.memberType, member.size, member.offset, member.mode, member.mtime, member.linkName] for member in archiveIndex],
+    }
+    if (archiveIndex._blocks):
+        indexData['blocks'] = archiveIndex._blocks
+
+    with mypycommons.file.atomicWriteFile(archiveIndex.archiveFilepath + _ARCHIVE_INDEX_FILE_SUFFIX, durability='none') as indexFile:
+        json.dump(indexData, indexFile)
+
+def _iterateArchiveMemberData(archiveIndex, member, chunkSizeBytes=1024 * 1024):
+    '''
+    Yields the data of the given file member of the indexed archive, in chunks, seeking directly to it.
+    '''
+    if (member.memberType == 'hardlink'):
+        member = archiveIndex.getMember(member.linkName)
+    if (member.memberType != 'file'):
+        raise ValueError("The archive member {} is not a file (it is a {})".format(member.name, member.memberType))
+
+    with open(archiveIndex.archiveFilepath, 'rb') as archiveFile:
+        if (archiveIndex.archiveFormat == 'tar'):
+            archiveFile.seek(member.offset)
+            remainingBytes = member.size
+            while (remainingBytes > 0):
+                dataChunk = archiveFile.read(min(chunkSizeBytes, remainingBytes))
+                if (not dataChunk):
+                    raise ValueError("The archive {} is truncated".format(archiveIndex.archiveFilepath))
+                remainingBytes -= len(dataChunk)
+                yield dataChunk
+        else:
+            yield from _iterateGzipBlocksRange(archiveFile, archiveIndex, member.offset, member.size, chunkSizeBytes)
+
+def _iterateGzipBlocksRange(archiveFile, archiveIndex, startOffset, size, chunkSizeBytes):
+    '''
+    Yields the given range of the uncompressed data of a gzip block archive, starting decompression
+    at the block holding the start of the range.
+    '''
+    import bisect
+    import zlib
+
+    blockNumber = bisect.bisect_right(archiveIndex._blockUncompressedOffsets, startOffset) - 1
+    blockUncompressedOffset, blockCompressedOffset = archiveIndex._blocks[blockNumber]
+    archiveFile.seek(blockCompressedOffset)
+
+    bytesToSkip = startOffset - blockUncompressedOffset
+    remainingBytes = size
+    # wbits=31: gzip format; each block is its own gzip member, so a new decompressor starts each one
+    decompressor = zlib.decompressobj(31)
+    pendingData = b''
+    while (remainingBytes > 0):
+        if (not pendingData):
+            pendingData = archiveFile.read(chunkSizeBytes)
+            if (not pendingData):
+                raise ValueError("The archive {} is truncated".format(archiveIndex.archiveFilepath))
+
+        dataChunk = decompressor.decompress(pendingData, chunkSizeBytes)
+        pendingData = decompressor.unconsumed_tail
+        if (decompressor.eof):
+            pendingData = decompressor.unused_data
+            decompressor = zlib.decompressobj(31)
+
+        if (bytesToSkip):
+            if (len(dataChunk) <= bytesToSkip):
+                bytesToSkip -= len(dataChunk)
+                continue
+            dataChunk = dataChunk[bytesToSkip:]
+            bytesToSkip = 0
+
+        dataChunk = dataChunk[:remainingBytes]
+        remainingBytes -= len(dataChunk)
+        if (dataChunk):
+            yield dataChunk
+
+class _ChecksumManifestBuilder:
+    '''
+    Hashes the given input files on a thread pool (started right away, so hashing overlaps with the
+    archive creation), and writes the checksum manifest once the archive is created. Member names
+    are given like tar does (the input paths without a leading slash), or like 7z does (starting at
+    the last part of each input path) when useBaseNames is True.
+    '''
+    def __init__(self, inputPaths, useBaseNames):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+        self._checksumFutures = []
+        for inputPath in inputPaths:
+            for filepath, memberName in _iterateArchiveInputFiles(inputPath, useBaseNames):
+                self._checksumFutures.append((memberName, self._executor.submit(_getFileChecksum, filepath)))
+
+    def writeManifest(self, archiveFilepath):
+        import json
+
+        manifestMembers = {}
+        for memberName, checksumFuture in self._checksumFutures:
+            checksum, size = checksumFuture.result()
+            manifestMembers[memberName] = { 'sha256': checksum, 'size': size }
+
+        with mypycommons.file.atomicWriteFile(archiveFilepath + _CHECKSUM_MANIFEST_FILE_SUFFIX, durability='none') as manifestFile:
+            json.dump({ 'algorithm': 'sha256', 'members': manifestMembers }, manifestFile, indent=1)
+
+    def close(self):
+        # the hashing not started yet is cancelled (like shutdown(cancel_futures=True), for Python 3.8)
+        for memberName, checksumFuture in self._checksumFutures:
+            checksumFuture.cancel()
+        self._executor.shutdown()
+
+def _iterateArchiveInputFiles(inputPath, useBaseNames):
+    '''
+    Yields (filepath, archive member name) for each regular file of the given archive input path
+    (recursively for directories). Symlinks are skipped, since archives store them as links.
+    '''
+    inputPath = inputPath.rstrip('/\\') or inputPath
+    if (useBaseNames):
+        memberNameRoot = os.path.basename(inputPath)
+    else:
+        memberNameRoot = inputPath.replace(os.sep, '/').lstrip('/')
+
+    if (not os.path.isdir(inputPath) or os.path.islink(inputPath)):
+        if (os.path.isfile(inputPath) and not os.path.islink(inputPath)):
+            yield (inputPath, memberNameRoot)
+        return
+
+    for dirPath, dirNames, filenames in os.walk(inputPath):
+        dirNames.sort()
+        relativeDirPath = os.path.relpath(dirPath, inputPath)
+        for filename in sorted(filenames):
+            filepath = os.path.join(dirPath, filename)
+            if (os.path.islink(filepath) or not os.path.isfile(filepath)):
+                continue
+
+            relativeFilepath = filename if (relativeDirPath == '.') else os.path.join(relativeDirPath, filename)
+            yield (filepath, memberNameRoot + '/' + relativeFilepath.replace(os.sep, '/'))
+
+def _getFileChecksum(filepath):
+    '''
+    Returns (sha256 hex digest, size) of the given file.
+    '''
+    with open(filepath, 'rb') as inputFile:
+        return _getDataChecksum(iter(lambda: inputFile.read(1024 * 1024), b''))
+
+def _getDataChecksum(dataChunks):
+    '''
+    Returns (sha256 hex digest, size) of the data given as an iterable of chunks.
+    '''
+    import hashlib
+
+    dataHash = hashlib.sha256()
+    size = 0
+    for dataChunk in dataChunks:
+        dataHash.update(dataChunk)
+        size += len(dataChunk)
+
+    return (dataHash.hexdigest(), size)
+
+def _getMemberChecksumsInParallel(memberNames, manifestMembers, memberDataFunc, numWorkers):
+    '''
+    Returns a dict of member name -> (sha256 hex digest, size) for the given archive members, hashing
+    the members that are in the manifest on a thread pool (hashlib and zlib release the GIL). Members
+    that can't be read get a checksum of None.
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+
+    def getMemberChecksum(memberName):
+        try:
+            return _getDataChecksum(memberDataFunc(memberName))
+        except (OSError, ValueError):
+            return (None, 0)
+
+    # members missing from the manifest are only reported, so there is no need to read them
+    memberChecksums = { memberName: (None, 0) for memberName in memberNames if (memberName not in manifestMembers) }
+    memberNamesToHash = [memberName for memberName in memberNames if (memberName in manifestMembers)]
+
+    numWorkers = numWorkers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=numWorkers) as executor:
+        for memberName, checksum in zip(memberNamesToHash, executor.map(getMemberChecksum, memberNamesToHash)):
+            memberChecksums[memberName] = checksum
+
+    return memberChecksums
+
+def _getStreamedTarMemberChecksums(archiveFilepath):
+    '''
+    Returns a dict of member name -> (sha256 hex digest, size) for the file members of the given
+    (compressed) tar, reading it as a stream from start to end.
+    '''
+    import tarfile
+
+    memberChecksums = {}
+    with tarfile.open(archiveFilepath, 'r|*') as tar:
+        for tarInfo in tar:
+            if (tarInfo.isreg()):
+                memberFile = tar.extractfile(tarInfo)
+                memberChecksums[tarInfo.name] = _getDataChecksum(iter(lambda: memberFile.read(1024 * 1024), b''))
+
+    return memberChecksums
+
+def _get7zCommand(sevenZipCommand):
+    if (sevenZipCommand):
+        return sevenZipCommand
+    if (mypycommons.system.thisMachineIsWindowsOS()):
+        return 'C:\\Program Files\\7-Zip\\7z.exe'
+    return '7z'
+
+def _get7zArchiveFileMemberNames(archiveFilepath, sevenZipCommand):
+    '''
+    Returns the names of the file members of the given 7z archive, using "7z l -slt".
+    '''
+    import subprocess
+
+    listResult = subprocess.run([_get7zCommand(sevenZipCommand), 'l', '-slt', archiveFilepath], capture_output=True, text=True)
+    if (listResult.returncode >= 2):
+        raise ValueError("7z failed to list the archive {} (exit code {})".format(archiveFilepath, listResult.returncode))
+
+    memberNames = []
+    # -slt gives a block of "Key = Value" lines for each member, after a "----------" line
+    memberListing = listResult.stdout.partition('\n----------\n')[2]
+    for memberBlock in memberListing.split('\n\n'):
+        memberProperties = dict(line.split(' = ', 1) for line in memberBlock.splitlines() if (' = ' in line))
+        if ('Path' in memberProperties and memberProperties.get('Folder') != '+'):
+            memberNames.append(memberProperties['Path'].replace('\\', '/'))
+
+    return memberNames
+
+def _iterate7zArchiveMemberData(archiveFilepath, memberName, sevenZipCommand):
+    '''
+    Yields the data of the given 7z archive member in chunks, extracted by 7z to a pipe. Raises 
+    ValueError if 7z fails to extract it (for example a CRC error).
+    '''
+    import subprocess
+
+    # -spd: the member name is matched literally, not as a wildcard
+    sevenZipArgs = [_get7zCommand(sevenZipCommand), 'e', '-so', '-spd', archiveFilepath, memberName]
+    with subprocess.Popen(sevenZipArgs, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as sevenZipProcess:
+        for dataChunk in iter(lambda: sevenZipProcess.stdout.read(1024 * 1024), b''):
+            yield dataChunk
+        returnCode = sevenZipProcess.wait()
+
+    if (returnCode >= 2):
+        raise ValueError("7z failed to extract {} from the archive {} (exit code {})".format(memberName, archiveFilepath, returnCode))
+
+class _StoreCodec(CompressionCodec):
+    name = 'store'
+    zipCompressType = 0  # zipfile.ZIP_STORED
+
+    def compress(self, data, level=None):
+        return bytes(data)
+
+    def decompress(self, data):
+        return bytes(data)
+
+    def openFile(self, filepath, mode='rb', level=None):
+        return open(filepath, mode)
+
+class _GzipCodec(CompressionCodec):
+    name = 'gzip'
+    fileExtension = '.gz'
+    defaultLevel = 6
+    zipCompressType = 8  # zipfile.ZIP_DEFLATED
+
+    def compress(self, data, level=None):
+        import gzip
+        return gzip.compress(data, compresslevel=self.defaultLevel if (level is None) else level)
+
+    def decompress(self, data):
+        import gzip
+        return gzip.decompress(data)
+
+    def openFile(self, filepath, mode='rb', level=None):
+        import gzip
+        return gzip.open(filepath, mode, compresslevel=self.defaultLevel if (level is None) else level)
+
+class _Bz2Codec(CompressionCodec):
+    name = 'bz2'
+    fileExtension = '.bz2'
+    defaultLevel = 9
+    zipCompressType = 12  # zipfile.ZIP_BZIP2
+
+    def compress(self, data, level=None):
+        import bz2
+        return bz2.compress(data, compresslevel=self.defaultLevel if (level is None) else level)
+
+    def decompress(self, data):
+        import bz2
+        return bz2.decompress(data)
+
+    def openFile(self, filepath, mode='rb', level=None):
+        import bz2
+        return bz2.open(filepath, mode, compresslevel=self.defaultLevel if (level is None) else level)
+
+class _LzmaCodec(CompressionCodec):
+    name = 'lzma'
+    fileExtension = '.xz'
+    defaultLevel = 6
+    zipCompressType = 14  # zipfile.ZIP_LZMA
+
+    def compress(self, data, level=None):
+        import lzma
+        return lzma.compress(data, preset=self.defaultLevel if (level is None) else level)
+
+    def decompress(self, data):
+        import lzma
+        return lzma.decompress(data)
+
+    def openFile(self, filepath, mode='rb', level=None):
+        import lzma
+        if ('r' in mode):
+            return lzma.open(filepath, mode)
+        return lzma.open(filepath, mode, preset=self.defaultLevel if (level is None) else level)
+
+class _ZstdCodec(CompressionCodec):
+    '''
+    Zstandard codec, available when the (optional) zstandard package is installed.
+    '''
+    name = 'zstd'
+    fileExtension = '.zst'
+    defaultLevel = 3
+
+    def isAvailable(self):
+        import importlib.util
+        return importlib.util.find_spec('zstandard') is not None
+
+    def compress(self, data, level=None):
+        import zstandard
+        return zstandard.ZstdCompressor(level=self.defaultLevel if (level is None) else level).compress(data)
+
+    def decompress(self, data):
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    def openFile(self, filepath, mode='rb', level=None):
+        import zstandard
+        if ('r' in mode):
+            return zstandard.open(filepath, mode)
+        compressor = zstandard.ZstdCompressor(level=self.defaultLevel if (level is None) else level)
+        return zstandard.open(filepath, mode, cctx=compressor)
+
+def _getCompressionCodecs():
+    '''
+    Returns the dict of name -> codec, creating it with the built-in codecs on first use.
+    '''
+    global _compressionCodecs
+
+    if (_compressionCodecs is None):
+        _compressionCodecs = { codec.name: codec for codec in [_StoreCodec(), _GzipCodec(), _Bz2Codec(), _LzmaCodec(), _ZstdCodec()] }
+    return _compressionCodecs
+
+def _estimateDataCompressionRatio(samples):
+    '''
+    Returns the compressed size / original size of the given sample byte strings, compressed with
+    the fastest zlib level.
+    '''
+    import zlib
+
+    originalSize = sum(len(sample) for sample in samples)
+    if (originalSize == 0):
+        return 1.0
+
+    compressedSize = sum(len(zlib.compress(sample, 1)) for sample in samples)
+    return compressedSize / originalSize
+
+def _estimateInputPathsCompressionRatio(inputPaths, maxSampledFiles=64):
+    '''
+    Estimates the compression ratio of all the files of the given archive input paths together,
+    weighted by file size. Only the biggest files (which make up most of the data) are sampled.
+    '''
+    fileSizes = []
+    for inputPath in inputPaths:
+        for filepath, memberName in _iterateArchiveInputFiles(inputPath, useBaseNames=True):
+            fileSizes.append((os.path.getsize(filepath), filepath))
+
+    fileSizes.sort(reverse=True)
+    sampledSize = sum(fileSize for fileSize, filepath in fileSizes[:maxSampledFiles])
+    if (sampledSize == 0):
+        return 1.0
+
+    estimatedCompressedSize = sum(fileSize * estimateCompressionRatio(filepath) for fileSize, filepath in fileSizes[:maxSampledFiles])
+    return estimatedCompressedSize / sampledSize
@@ -4,6 +4,10 @@ com.nwrobel.display
 This module contains functionality related to displaying text or other UI functions (print, etc).
 '''
 
+import sys
+import threading
+import time
+
 # Print iterations progress
 # Taken from StackOverflow
 def printProgressBar (iteration, total, prefix = '', suffix = '', decimals = 1, length = 100, fill = '█', printEnd = "\r"):
@@ -20,11 +24,212 @@ def printProgressBar (iteration, total, prefix = '', suffix = '', decimals = 1,
         length      - Optional  : character length of bar (Int)
         fill        - Optional  : bar fill character (Str)
         printEnd    - Optional  : end character (e.g. "\r", "\r\n") (Str)
+
+    @notes
+    This prints on every call: for loops over many items, use the ProgressBar class instead, which
+    only redraws when the displayed progress changes.
     '''
-    percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
-    filledLength = int(length * iteration // total)
-    bar = fill * filledLength + '-' * (length - filledLength)
+    percent = _formatPercent(iteration, total, decimals)
+    bar = _formatBar(iteration, total, length, fill)
     print('\r%s |%s| %s%% %s' % (prefix, bar, percent, suffix), end = printEnd)
     # Print New Line on Complete
     if iteration == total: 
-        print()
\ No newline at end of file
+        print()
+
+class ProgressBar:
+    '''
+    Progress bar for long running loops, which is cheap to update on every iteration: it redraws
+    only when the displayed percentage changes, and at most once every minIntervalSeconds. Shows the
+    throughput (items per second) and the estimated time remaining.
+
+    When the output stream is not a terminal (ex: redirected to a file), a plain progress line is 
+    written every logIntervalSeconds instead, through the given logger if there is one.
+
+    Updating is thread-safe, so one progress bar can be shared by multiple worker threads.
+
+    @params
+    total: (int) total number of items/iterations
+    prefix: (optional) text shown before the bar
+    suffix: (optional) text shown after the percentage
+    decimals: (optional) number of decimals in the percent complete
+    length: (optional) character length of the bar
+    fill: (optional) bar fill character
+    minIntervalSeconds: (optional) minimum time between redraws of the bar on a terminal
+    logIntervalSeconds: (optional) time between progress lines when not writing to a terminal
+    stream: (optional) stream to draw the bar to, default is stdout
+    logger: (optional) CommonLogger (or logging.Logger) to write the progress lines to, when not
+        writing to a terminal
+
+    @example
+    with ProgressBar(len(paths), prefix='Hashing') as progressBar:
+        for path in paths:
+            hashFile(path)
+            progressBar.update()
+    '''
+    def __init__(self, total: int, prefix: str = '', suffix: str = '', decimals: int = 1, length: int = 50, fill: str = '█', 
+                 minIntervalSeconds: float = 0.1, logIntervalSeconds: float = 10.0, stream = None, logger = None):
+        if (total <= 0):
+            raise ValueError("total must be greater than 0")
+
+        self.total = total
+        self.prefix = prefix
+        self.suffix = suffix
+        self.decimals = decimals
+        self.length = length
+        self.fill = fill
+        self.minIntervalSeconds = minIntervalSeconds
+        self.logIntervalSeconds = logIntervalSeconds
+
+        self._stream = stream if (stream is not None) else sys.stdout
+        self._logger = _getLoggingLogger(logger)
+        self._isTerminal = _streamIsTerminal(self._stream)
+
+        self._lock = threading.Lock()
+        self._iteration = 0
+        self._startTime = time.monotonic()
+        self._lastDrawTime = None
+        self._lastDrawTick = -1
+        self._lastDrawIteration = None
+        self._finished = False
+
+        # the progress is redrawn only when this "tick" (the displayed percentage) changes
+        self._ticksPerTotal = 100 * (10 ** decimals)
+
+    @property
+    def iteration(self) -> int:
+        return self._iteration
+
+    def update(self, count: int = 1):
+        '''
+        Advances the progress by the given number of items.
+        '''
+        with self._lock:
+            self._iteration += count
+            self._drawIfNeeded()
+
+    def setProgress(self, iteration: int):
+        '''
+        Sets the current progress to the given number of completed items.
+        '''
+        with self._lock:
+            self._iteration = iteration
+            self._drawIfNeeded()
+
+    def finish(self):
+        '''
+        Draws the final state of the progress bar and ends its line. Called automatically when the
+        progress bar is used as a context manager.
+        '''
+        with self._lock:
+            if (self._finished):
+                return
+            self._finished = True
+            # a progress line already written for this progress (like the 100% line) isn't repeated
+            if (self._isTerminal or self._lastDrawIteration != min(self._iteration, self.total)):
+                self._draw(time.monotonic())
+
+            if (self._isTerminal):
+                self._stream.write('\n')
+                self._stream.flush()
+
+    def getThroughput(self) -> float:
+        '''
+        Returns the average number of items completed per second so far.
+        '''
+        elapsedSeconds = time.monotonic() - self._startTime
+        if (elapsedSeconds <= 0):
+            return 0.0
+        return self._iteration / elapsedSeconds
+
+    def getEtaSeconds(self) -> float:
+        '''
+        Returns the estimated number of seconds until all the items are complete, or None if it
+        cannot be estimated yet.
+        '''
+        throughput = self.getThroughput()
+        if (throughput <= 0):
+            return None
+        return max(0, self.total - self._iteration) / throughput
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.finish()
+        return False
+
+    def _drawIfNeeded(self):
+        tick = (min(self._iteration, self.total) * self._ticksPerTotal) // self.total
+        if (tick == self._lastDrawTick):
+            return
+
+        now = time.monotonic()
+        if (self._lastDrawTime is not None):
+            if (self._isTerminal):
+                minInterval = self.minIntervalSeconds
+            else:
+                minInterval = self.logIntervalSeconds
+
+            if ((now - self._lastDrawTime) < minInterval and self._iteration < self.total):
+                return
+
+        self._lastDrawTick = tick
+        self._draw(now)
+
+    def _draw(self, now):
+        self._lastDrawTime = now
+        iteration = min(self._iteration, self.total)
+        self._lastDrawIteration = iteration
+        percent = _formatPercent(iteration, self.total, self.decimals)
+
+        elapsedSeconds = now - self._startTime
+        throughput = (self._iteration / elapsedSeconds) if (elapsedSeconds > 0) else 0.0
+        if (throughput > 0):
+            eta = _formatDuration((self.total - iteration) / throughput)
+        else:
+            eta = '?'
+        stats = "{}/{} [{:.1f}/s, ETA {}]".format(iteration, self.total, throughput, eta)
+
+        if (self._isTerminal):
+            bar = _formatBar(iteration, self.total, self.length, self.fill)
+            self._stream.write('\r%s |%s| %s%% %s %s' % (self.prefix, bar, percent, self.suffix, stats))
+            self._stream.flush()
+        else:
+            line = ' '.join(part for part in [self.prefix, "{}%".format(percent), self.suffix, stats] if part)
+            if (self._logger is not None):
+                self._logger.info(line)
+            else:
+                self._stream.write(line + '\n')
+                self._stream.flush()
+
+# -------------------------------- Private module helper functions ---------------------------------
+#
+def _formatPercent(iteration, total, decimals):
+    return ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
+
+def _formatBar(iteration, total, length, fill):
+    filledLength = int(length * iteration // total)
+    return fill * filledLength + '-' * (length - filledLength)
+
+def _formatDuration(seconds):
+    '''
+    Formats the given number of seconds as H:MM:SS
+    '''
+    seconds = int(round(seconds))
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return "{}:{:02d}:{:02d}".format(hours, minutes, seconds)
+
+def _streamIsTerminal(stream):
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+def _getLoggingLogger(logger):
+    '''
+    Returns the logging.Logger of the given CommonLogger, or the given logger itself otherwise.
+    '''
+    if (logger is not None and hasattr(logger, 'getLogger')):
+        return logger.getLogger()
+    return logger
@@ -5,19 +5,27 @@ This module contains functionality related to performing file/directory operatio
 writing, renaming, deleting, and moving.
 '''
 
-import re
 import os
-from pathlib import Path
-import shutil
-import inspect
-import csv
-import json
-import subprocess
+import stat
 from typing import Literal, List
 
 from com.nwrobel import mypycommons
 import com.nwrobel.mypycommons.utils
 
+# Modules only needed by some of the functions (pathlib, shutil, csv, json, inspect) are imported
+# inside those functions, so that importing this module stays cheap for scripts that only need the
+# simple path functions
+
+# The pure path functions (getFilename, getParentDirectoryPath, etc) use string operations giving the
+# same results as pathlib on POSIX systems. On Windows, pathlib is used for its drive/UNC handling.
+_USE_STRING_PATH_FUNCTIONS = (os.name != 'nt')
+
+# first bytes of the files of each supported compression format -> compression name. bz2 files start
+# with "BZh", the block size digit and then the magic of the first block (or of the end of the stream)
+_COMPRESSION_MAGIC_BYTES = [(b'\x1f\x8b\x08', 'gzip'), (b'\xfd7zXZ\x00', 'xz')]
+_BZ2_BLOCK_MAGIC_BYTES = (b'1AY&SY', b'\x17rE8P\x90')
+_COMPRESSION_FILE_EXTENSIONS = { '.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz' }
+
 
 def getThisScriptCurrentDirectory():
     '''
@@ -33,6 +41,8 @@ def isFile(path):
     @params
     path: (str) the path to check
     '''
+    from pathlib import Path
+
     pathObj = Path(path)
     return _isFile(pathObj)
 
@@ -43,6 +53,8 @@ def isDirectory(path):
     @params
     path: (str) the path  to check
     '''
+    from pathlib import Path
+
     pathObj = Path(path)
     return _isDir(pathObj)
 
@@ -53,6 +65,8 @@ def pathExists(path):
     @params
     path: (str) the path to check
     '''
+    from pathlib import Path
+
     if (not path):
         return False
 
@@ -85,6 +99,20 @@ def joinPaths(path1, path2):
     joined = os.path.join(path1, path2)
     return os.path.abspath(joined)
 
+def joinChildPaths(rootPath, childPaths) -> List[str]:
+    '''
+    Batch version of joinPaths: joins each of the given child paths to the same root path. Gives the
+    same results as calling joinPaths for each child path, but resolves the root path only once.
+
+    @params
+    rootPath: (str) the first part of the paths, an absolute path
+    childPaths: (list or iterable) the second parts of the paths, relative/child paths
+    '''
+    rootPath = os.path.abspath(rootPath)
+    join = os.path.join
+    normpath = os.path.normpath
+    return [normpath(join(rootPath, childPath)) for childPath in childPaths]
+
 def getPathParts(path):
     '''
     Returns a list of items, each one a piece of the split path
@@ -111,6 +139,8 @@ def getChildPathsRecursive(rootDir: str, pathType: Literal['file', 'dir'] = None
     useWindowsExtendedPaths: makes all paths returned use the Windows extended path syntax, to avoid
        problems with long filepaths 
     '''
+    from pathlib import Path
+
     pathRootObj = Path(rootDir)
     childrenObjs = [pathObj for pathObj in pathRootObj.glob('**/*')]
     
@@ -183,6 +213,8 @@ def createDirectory(path):
     @params
     path: (str) path of the new directory to create
     '''
+    from pathlib import Path
+
     folderPathObject = Path(path)
     folderPathObject.mkdir(parents=True)
 
@@ -195,6 +227,8 @@ def moveToDirectory(path, destDir):
     path: (str) the path (file or folder) to move to the dir
     destDir: path of the target directory to move to
     '''
+    import shutil
+
     shutil.move(path, destDir) 
 
 def copyToDirectory(path, destDir):
@@ -206,6 +240,8 @@ def copyToDirectory(path, destDir):
     path: (str) the path (file or folder) to copy to the dir
     destDir: (str) path of the target directory to copy to
     '''
+    import shutil
+
     if (isFile(path)):
         shutil.copy2(path, destDir)
     elif (isDirectory(path)):
@@ -222,6 +258,9 @@ def deletePath(path):
     @params
     path: (str) the path (file or folder) to delete
     '''
+    from pathlib import Path
+    import shutil
+
     pathObj = Path(path)
 
     if (_isFile(pathObj)):
@@ -239,6 +278,8 @@ def renamePath(path, newName):
     path: (str) the path (file or folder) to rename
     newName: (str) the new name to give to the file or folder
     '''
+    from pathlib import Path
+
     pathObj = Path(path)
     pathObj.rename(Path(pathObj.parent, newName))
 
@@ -252,16 +293,30 @@ def getParentDirectoryPath(path, useWindowsExtendedPaths=False):
     useWindowsExtendedPaths: (optional) makes path returned use the Windows extended path 
         syntax, to avoid problems with long filepaths 
     '''
-    filePathObject = Path(path)
+    if (_USE_STRING_PATH_FUNCTIONS):
+        parentDirPath = _getPosixPathParent(os.fspath(path))
+    else:
+        from pathlib import Path
+        parentDirPath = str(Path(path).parent)
 
     if (useWindowsExtendedPaths):
-        parentDirPath = '\\\\?\\' + str(filePathObject.parent)
-    else:
-        parentDirPath = str(filePathObject.parent)
+        parentDirPath = '\\\\?\\' + parentDirPath
 
     parentDirPath = removeTrailingSlashFromPath(parentDirPath)
     return parentDirPath
 
+def getParentDirectoryPaths(paths, useWindowsExtendedPaths=False) -> List[str]:
+    '''
+    Batch version of getParentDirectoryPath: returns the parent directory path of each of the given
+    paths.
+
+    @params
+    paths: (list or iterable) the paths (files or folders) to find the parents of
+    useWindowsExtendedPaths: (optional) makes the paths returned use the Windows extended path 
+        syntax, to avoid problems with long filepaths 
+    '''
+    return [getParentDirectoryPath(path, useWindowsExtendedPaths) for path in paths]
+
 def getFilename(filepath):
     '''
     Given a filepath, returns only the filename part, without the parent folders and containing its 
@@ -270,8 +325,20 @@ def getFilename(filepath):
     @params:
     filepath: path to the file 
     '''
-    filePathObject = Path(filepath)
-    return filePathObject.name
+    if (_USE_STRING_PATH_FUNCTIONS):
+        return _getPosixPathName(os.fspath(filepath))
+
+    from pathlib import Path
+    return Path(filepath).name
+
+def getFilenames(filepaths) -> List[str]:
+    '''
+    Batch version of getFilename: returns the filename part of each of the given filepaths.
+
+    @params:
+    filepaths: (list or iterable) paths to the files 
+    '''
+    return [getFilename(filepath) for filepath in filepaths]
 
 def getFileExtension(filepath):
     '''
@@ -282,8 +349,21 @@ def getFileExtension(filepath):
     @params:
     filepath: path to the file 
     '''
-    filePathObject = Path(filepath)
-    return filePathObject.suffix
+    filename = getFilename(filepath)
+    dotIndex = filename.rfind('.')
+    if (0 < dotIndex < len(filename) - 1):
+        return filename[dotIndex:]
+    else:
+        return ''
+
+def getFileExtensions(filepaths) -> List[str]:
+    '''
+    Batch version of getFileExtension: returns the file extension of each of the given filepaths.
+
+    @params:
+    filepaths: (list or iterable) paths to the files 
+    '''
+    return [getFileExtension(filepath) for filepath in filepaths]
 
 def getFileBaseName(filepath):
     '''
@@ -297,8 +377,21 @@ def getFileBaseName(filepath):
     C:\data\playlist.m3u.tar --> playlist.m3u
     C:\prog\connect.log --> connect
     '''
-    filePathObject = Path(filepath)
-    return filePathObject.stem
+    filename = getFilename(filepath)
+    dotIndex = filename.rfind('.')
+    if (0 < dotIndex < len(filename) - 1):
+        return filename[:dotIndex]
+    else:
+        return filename
+
+def getFileBaseNames(filepaths) -> List[str]:
+    '''
+    Batch version of getFileBaseName: returns the base name of each of the given filepaths.
+
+    @params:
+    filepaths: (list or iterable) paths to the files 
+    '''
+    return [getFileBaseName(filepath) for filepath in filepaths]
 
 def getPartialPath(rootDir: str, path: str) -> str:
     ''' 
@@ -334,6 +427,8 @@ def applyPermissionToPathOwnerGroup(path, owner, group):
     This only works on Linux machines. 
     This may require root (sudo) permissions to work
     '''
+    import shutil
+
     shutil.chown(path, user=owner, group=group)
 
 def clearFileContents(filepath):
@@ -346,7 +441,7 @@ def clearFileContents(filepath):
     '''
     open(filepath, 'wb').close()
 
-def writeToFile(filepath, content, append=False):
+def writeToFile(filepath, content, append=False, compression=None, atomic=False, durability='none', batch=None):
     '''
     Writes the given data/content to the given file.
 
@@ -356,6 +451,15 @@ def writeToFile(filepath, content, append=False):
         are written to the file with one string list item per line
     append: add the content to the end of the existing file, instead of replacing file contents on
         write if data exists
+    compression: (optional) compress the file as it is written: "gzip", "bz2", "xz", or "auto" to 
+        choose from the file extension (.gz, .bz2, .xz; no compression otherwise). Default is no
+        compression
+    atomic: (optional) write the file atomically (see AtomicFileWriter), so a crash mid-write can't
+        leave a torn file. Can't be used with append
+    durability: (optional) how much syncing is done before returning: "none", "file" (the file data
+        is synced to disk) or "full" (the directory is also synced). Default is "none"
+    batch: (optional) an AtomicWriteBatch to add this (atomic) write to, to amortize the syncing of
+        many small files. The file is replaced when the batch is committed
     '''
     if (isinstance(content, str)):
         content = [content]
@@ -364,20 +468,33 @@ def writeToFile(filepath, content, append=False):
     if (append):
         writeMode = "a"
 
-    with open(filepath, writeMode, encoding='utf-8') as outputFile:
+    if (atomic or batch is not None):
+        if (append):
+            raise ValueError("Atomic writes replace the whole file, so they can't be used with append")
+        outputFileWriter = AtomicFileWriter(filepath, 'w', 'utf-8', durability, compression=compression, batch=batch)
+    else:
+        outputFileWriter = _openTextFileForWrite(filepath, writeMode, 'utf-8', compression)
+
+    with outputFileWriter as outputFile:
         for item in content:
             outputFile.write("{}\n".format(item))
 
+    if (not atomic and batch is None):
+        _syncWrittenFile(filepath, durability)
+
 def readFile(filepath, encoding='utf-8'):
     '''
     Reads the data from the given file and returns a list of strings representing each
     line of the file. Newline characters are removed from result strings.
 
+    Files compressed with gzip, bz2 or xz are detected (by their first bytes) and decompressed as 
+    they are read.
+
     @params:
     filepath: path to the file  
     encoding: (optional) the encoding to use to read the text of the file as, default is utf-8 
     '''
-    with open(filepath, 'r', encoding=encoding) as infile:
+    with _openTextFileForRead(filepath, encoding) as infile:
         fileLines = infile.readlines()
     
     fileLines = [x.replace('\n', '') for x in fileLines]
@@ -387,38 +504,69 @@ def readJsonFile(filepath):
     '''
     Reads the given Json file and returns a dict or a Json array representing the data.
 
+    Files compressed with gzip, bz2 or xz are detected (by their first bytes) and decompressed as 
+    they are read.
+
     @params:
     filepath: path to the file  
     '''
-    with open(filepath) as f:
+    import json
+
+    with _openTextFileForRead(filepath, None) as f:
         data = json.load(f)
 
     return data
 
-def writeJsonFile(filepath, contents):
+def writeJsonFile(filepath, contents, compression=None, atomic=False, durability='none', batch=None):
     '''
-    Writes the given content to a Json file. Throws an exception if the filepath already exists.
+    Writes the given content to a Json file. Throws an exception (ValueError) if the filepath already
+    exists.
 
     @params:
     filepath: path of the json file to be written
     contents: dict or a list containing objects that are json serializable (like another dict)  
-    '''
-    if (pathExists(filepath)):
+    compression: (optional) compress the file as it is written: "gzip", "bz2", "xz", or "auto" to 
+        choose from the file extension (.gz, .bz2, .xz; no compression otherwise). Default is no
+        compression
+    atomic: (optional) write the file atomically (see AtomicFileWriter), so a crash mid-write can't
+        leave a torn file
+    durability: (optional) how much syncing is done before returning: "none", "file" (the file data
+        is synced to disk) or "full" (the directory is also synced). Default is "none"
+    batch: (optional) an AtomicWriteBatch to add this (atomic) write to. The file is created when the
+        batch is committed, and the commit raises FileExistsError if the file exists by then
+    '''
+    import json
+
+    # the file is created exclusively, which checks that it doesn't exist in the same step
+    try:
+        if (atomic or batch is not None):
+            outputFileWriter = AtomicFileWriter(filepath, 'w', 'utf-8', durability, overwrite=False, compression=compression, batch=batch)
+        else:
+            outputFileWriter = _openTextFileForWrite(filepath, 'x', 'utf-8', compression)
+
+        with outputFileWriter as f:
+            json.dump(contents, f, indent=4)
+    except FileExistsError:
         raise ValueError("The given filepath of the json file to write already exists")
 
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(contents, f, indent=4)
+    if (not atomic and batch is None):
+        _syncWrittenFile(filepath, durability)
 
 def readCSVFile(filepath):
     '''
     Reads the given CSV file and returns a list of arrays, each of which represent a row in the
     CSV file with the line split by the comma delimiter to get the data in each column.
 
+    Files compressed with gzip, bz2 or xz are detected (by their first bytes) and decompressed as 
+    they are read.
+
     @params:
     filepath: path to the file  
     '''
+    import csv
+
     csvLines = []
-    with open(filepath, mode='r') as csvFile:
+    with _openTextFileForRead(filepath, None) as csvFile:
         iterCleanLines = _filterCSVLinesForIterator(csvFile)
         csvReader = csv.DictReader(iterCleanLines)
 
@@ -427,6 +575,256 @@ def readCSVFile(filepath):
 
     return csvLines
 
+class CSVFileWriter:
+    '''
+    Streaming CSV file writer, the complement of readCSVFile. Rows can be given as dicts (by field
+    name), tuples/lists (in field order) or as batches of columns (dict of field name -> list of
+    values), and are written in large buffered chunks. Use as a context manager; the file is written
+    with a header row, or appended to (keeping the header of the existing file).
+
+    The files round-trip with readCSVFile, which skips blank lines and lines starting with "#"
+    (comments, see writeComment): a first value starting with "#", or a row of a single blank value,
+    is quoted so it is not taken for a comment or blank line. Values with line breaks followed by "#"
+    or blank lines don't round-trip, as readCSVFile filters the lines before parsing them.
+
+    @example
+    with CSVFileWriter("sizes.csv", ['name', 'size']) as writer:
+        writer.writeComment("generated by the size scan")
+        writer.writeRow({'name': 'a.txt', 'size': 10})
+        writer.writeRow(('b.txt', 20))
+        writer.writeColumns({'name': ['c.txt', 'd.txt'], 'size': [30, 40]})
+    '''
+    def __init__(self, filepath, fieldNames=None, append: bool = False, encoding: str = 'utf-8', compression: str = None,
+                 bufferSizeBytes: int = 1024 * 1024, atomic: bool = False, durability: str = 'none'):
+        '''
+        @params
+        filepath: path to the output file
+        fieldNames: (optional) list of the field (column) names, in order. If not given, they are taken
+            from the existing file when appending, or else from the keys of the first dict row (or
+            columns batch) written
+        append: (optional) add the rows to the end of the existing file instead of replacing it. The
+            header row is only written if the file is new or empty, and the field names must match the
+            existing header
+        encoding: (optional) the encoding to write the text of the file as, default is utf-8
+        compression: (optional) compress the file as it is written: "gzip", "bz2", "xz", or "auto" to
+            choose from the file extension (see writeToFile). When appending to an existing file, the
+            compression of the file is used (a different compression given raises ValueError)
+        bufferSizeBytes: (optional) size of the chunks the rows are buffered into before writing
+        atomic: (optional) write the file atomically (see AtomicFileWriter): the file is only replaced
+            when the writer is closed without an error, so a failed write can't leave a half-written
+            file. Can't be used with append
+        durability: (optional) how much syncing is done when the writer is closed: "none", "file" or
+            "full" (see writeToFile). Default is "none"
+        '''
+        import csv
+        import io
+
+        if (atomic and append):
+            raise ValueError("Atomic writes replace the whole file, so they can't be used with append")
+
+        self.filepath = filepath
+        self.fieldNames = list(fieldNames) if (fieldNames is not None) else None
+        self.bufferSizeBytes = bufferSizeBytes
+        self.durability = durability
+        self._outputFile = None
+        self._atomicWriter = None
+        self._headerWritten = False
+        # the existing file doesn't end with a line break, so the first appended row must start with one
+        needsLineBreak = False
+
+        if (append):
+            compression = _getAppendedFileCompression(filepath, compression)
+            existingFieldNames = _readCSVFileFieldNames(filepath)
+            if (existingFieldNames is not None):
+                if (self.fieldNames is not None and self.fieldNames != existingFieldNames):
+                    raise ValueError("The given field names {} don't match the header of the existing file {}".format(self.fieldNames, existingFieldNames))
+                self.fieldNames = existingFieldNames
+                self._headerWritten = True
+                needsLineBreak = not _textFileEndsWithLineBreak(filepath)
+
+        self._buffer = io.StringIO()
+        if (needsLineBreak):
+            self._buffer.write('\n')
+        self._csvWriter = csv.writer(self._buffer, lineterminator='\n')
+        self._quotingCsvWriter = csv.writer(self._buffer, lineterminator='\n', quoting=csv.QUOTE_ALL)
+        if (atomic):
+            self._atomicWriter = AtomicFileWriter(filepath, 'w', encoding, durability, compression=compression)
+            self._outputFile = self._atomicWriter.__enter__()
+        else:
+            self._outputFile = _openTextFileForWrite(filepath, 'a' if (append) else 'w', encoding, compression)
+
+    def writeRow(self, row):
+        '''
+        Writes a row, given as a dict (missing fields are written empty) or as a tuple/list of values in
+        field order. None values are written empty.
+        '''
+        if (isinstance(row, dict)):
+            self._writeHeaderIfNeeded(list(row.keys()))
+            row = self._getDictRowValues(row)
+        else:
+            self._writeHeaderIfNeeded(None)
+            if (len(row) != len(self.fieldNames)):
+                raise ValueError("The row has {} values, but the file has {} fields".format(len(row), len(self.fieldNames)))
+
+        self._writeRowValues(row)
+
+    def writeRows(self, rows):
+        '''
+        Writes the given rows (iterable of dicts or tuples/lists, see writeRow).
+        '''
+        for row in rows:
+            self.writeRow(row)
+
+    def writeColumns(self, columns):
+        '''
+        Writes a batch of rows given as columns: a dict of field name -> list of values, all of the same
+        length. Fields missing from the dict are written empty.
+        '''
+        self._writeHeaderIfNeeded(list(columns.keys()))
+
+        unknownFieldNames = [fieldName for fieldName in columns if (fieldName not in self.fieldNames)]
+        if (unknownFieldNames):
+            raise ValueError("The columns have fields that are not in the file: {}".format(unknownFieldNames))
+
+        columnLengths = set(len(values) for values in columns.values())
+        if (len(columnLengths) > 1):
+            raise ValueError("The columns must all have the same number of values")
+
+        numRows = columnLengths.pop() if (columnLengths) else 0
+        emptyColumn = [None] * numRows
+        for row in zip(*[columns.get(fieldName, emptyColumn) for fieldName in self.fieldNames]):
+            self._writeRowValues(row)
+
+    def writeComment(self, text):
+        '''
+        Writes a comment line ("# text"), which readCSVFile skips. Multi-line text gives one comment
+        line per line.
+        '''
+        self._writeHeaderIfNeeded(None, allowMissingFieldNames=True)
+        for line in str(text).splitlines() or ['']:
+            self._buffer.write('# {}\n'.format(line))
+        self._flushBufferIfFull()
+
+    def flush(self):
+        '''
+        Writes the buffered rows to the file.
+        '''
+        if (self._outputFile is None):
+            return
+
+        self._outputFile.write(self._buffer.getvalue())
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._outputFile.flush()
+
+    def close(self):
+        '''
+        Writes the buffered rows and closes the file. If no rows were written but the field names are
+        known, the file gets just the header row.
+        '''
+        self._close(None, None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self._close(excType, excValue, traceback)
+        return False
+
+    def _close(self, excType, excValue, traceback):
+        '''
+        Writes the buffered rows and closes the file. After an error, an atomic write is discarded (the
+        file is left unchanged).
+        '''
+        if (self._outputFile is None):
+            return
+
+        try:
+            if (excType is None or self._atomicWriter is None):
+                if (self.fieldNames is not None):
+                    self._writeHeaderIfNeeded(None)
+                self.flush()
+        except BaseException as exception:
+            self._closeOutputFile(type(exception), exception, exception.__traceback__)
+            raise
+
+        self._closeOutputFile(excType, excValue, traceback)
+
+    def _closeOutputFile(self, excType, excValue, traceback):
+        outputFile = self._outputFile
+        self._outputFile = None
+
+        if (self._atomicWriter is not None):
+            self._atomicWriter.__exit__(excType, excValue, traceback)
+        else:
+            outputFile.close()
+            if (excType is None):
+                _syncWrittenFile(self.filepath, self.durability)
+
+    def _writeHeaderIfNeeded(self, rowFieldNames, allowMissingFieldNames=False):
+        if (self._headerWritten):
+            return
+
+        if (self.fieldNames is None):
+            if (rowFieldNames is None):
+                if (allowMissingFieldNames):
+                    return
+                raise ValueError("The field names must be given to write rows as tuples (or rows to an empty file)")
+            self.fieldNames = rowFieldNames
+
+        self._writeRowValues(self.fieldNames)
+        self._headerWritten = True
+
+    def _getDictRowValues(self, row):
+        if (len(row) > len(self.fieldNames) or any(fieldName not in self.fieldNames for fieldName in row)):
+            raise ValueError("The row has fields that are not in the file: {}".format([fieldName for fieldName in row if (fieldName not in self.fieldNames)]))
+
+        return [row.get(fieldName) for fieldName in self.fieldNames]
+
+    def _writeRowValues(self, values):
+        firstValue = values[0] if (values) else None
+        if (isinstance(firstValue, str) and (firstValue.startswith('#') or (len(values) == 1 and not firstValue.strip()))):
+            # quoted, so readCSVFile doesn't skip it as a comment or blank line
+            self._quotingCsvWriter.writerow(values)
+        else:
+            self._csvWriter.writerow(values)
+
+        self._flushBufferIfFull()
+
+    def _flushBufferIfFull(self):
+        if (self._buffer.tell() >= self.bufferSizeBytes):
+            self.flush()
+
+def writeCSVFile(filepath, rows, fieldNames=None, append: bool = False, encoding: str = 'utf-8', compression: str = None,
+                 atomic: bool = False, durability: str = 'none'):
+    '''
+    Writes the given rows to a CSV file (with a header row), which can be read back with readCSVFile.
+    See CSVFileWriter for writing rows incrementally.
+
+    @params
+    filepath: path to the output file
+    rows: the rows to write: an iterable of dicts (by field name) or of tuples/lists (in field order),
+        or a dict of field name -> list of values (columns)
+    fieldNames: (optional) list of the field names, in order. Required for tuple rows, unless appending
+        to an existing file. Default is the keys of the first dict row or of the columns
+    append: (optional) add the rows to the end of the existing file instead of replacing it
+    encoding: (optional) the encoding to write the text of the file as, default is utf-8
+    compression: (optional) compress the file as it is written: "gzip", "bz2", "xz", or "auto" to
+        choose from the file extension (see writeToFile)
+    atomic: (optional) write the file atomically (see AtomicFileWriter), so a failed write (ex: an
+        invalid row) leaves the existing file unchanged. Can't be used with append
+    durability: (optional) how much syncing is done before returning: "none", "file" or "full" (see
+        writeToFile). Default is "none"
+
+    @example
+    writeCSVFile("sizes.csv", [{'name': 'a.txt', 'size': 10}, {'name': 'b.txt', 'size': 20}])
+    '''
+    with CSVFileWriter(filepath, fieldNames, append, encoding, compression, atomic=atomic, durability=durability) as writer:
+        if (isinstance(rows, dict)):
+            writer.writeColumns(rows)
+        else:
+            writer.writeRows(rows)
+
 def getFileLineCount(filepath):
     '''
     Returns the line count of the given file. Useful for text (non-binary) files.
@@ -465,7 +863,7 @@ def getFileSizeBytes(filepath):
     @params:
     filepath: path to the file
     '''
-    return Path(filepath).stat().st_size
+    return os.stat(filepath).st_size
 
 def getFileDateModifiedTimestamp(filepath):
     '''
@@ -474,7 +872,7 @@ def getFileDateModifiedTimestamp(filepath):
     @params:
     filepath: path to the file
     '''
-    return Path(filepath).stat().st_mtime
+    return os.stat(filepath).st_mtime
 
 def removeTrailingSlashFromPath(path):
     '''
@@ -491,13 +889,763 @@ def removeTrailingSlashFromPath(path):
     if (com.nwrobel.mypycommons.utils.stringIsNullOrEmpty(path)):
         raise ValueError('path is null or empty string')
 
-    while (path[-1] == '/' or path[-1] == '\\'):
-        if (len(path) == 1):
-            return path
+    strippedPath = path.rstrip('/\\')
+    if (not strippedPath):
+        # path is only slashes: keep the first one
+        return path[0]
+
+    return strippedPath
+
+class FileChangeEvent:
+    '''
+    A change to a path detected by watchDirectory.
+
+    eventType is one of: FileChangeEvent.CREATED, MODIFIED, DELETED, or OVERFLOW (some changes were
+    missed because too many happened at once: the watched directory should be rescanned).
+    '''
+    CREATED = 'created'
+    MODIFIED = 'modified'
+    DELETED = 'deleted'
+    OVERFLOW = 'overflow'
+
+    def __init__(self, eventType: str, path: str, isDirectory: bool = False):
+        self.eventType = eventType
+        self.path = path
+        self.isDirectory = isDirectory
+
+    def __eq__(self, other):
+        if (not isinstance(other, FileChangeEvent)):
+            return NotImplemented
+        return (self.eventType, self.path, self.isDirectory) == (other.eventType, other.path, other.isDirectory)
+
+    def __hash__(self):
+        return hash((self.eventType, self.path, self.isDirectory))
+
+    def __repr__(self):
+        return "FileChangeEvent({!r}, {!r}, isDirectory={})".format(self.eventType, self.path, self.isDirectory)
+
+class DirectoryWatcher:
+    '''
+    Watches a directory for created, modified and deleted files/directories. Created by 
+    watchDirectory: see that function for the details.
+
+    Changes are returned in batches: after the first change is seen, the watcher waits until no
+    more changes happen for debounceSeconds (up to maxBatchSeconds), and merges the changes to the
+    same path into one event (ex: created then modified is reported as created).
+    '''
+    def __init__(self, rootDir: str, recursive: bool = True, debounceSeconds: float = 0.2, maxBatchSeconds: float = 2.0,
+                 pollIntervalSeconds: float = 1.0, usePolling: bool = False):
+        import threading
+
+        if (not isDirectory(rootDir)):
+            raise ValueError("The given rootDir is not an existing directory: {}".format(rootDir))
+
+        self.rootDir = os.path.abspath(rootDir)
+        self.recursive = recursive
+        self.debounceSeconds = debounceSeconds
+        self.maxBatchSeconds = maxBatchSeconds
+
+        self._closedEvent = threading.Event()
+        self._callbackThread = None
+        self._backend = None
+
+        if (not usePolling and _inotifyIsSupported()):
+            try:
+                self._backend = _InotifyWatchBackend(self.rootDir, recursive)
+            except OSError:
+                self._backend = None
+
+        if (self._backend is None):
+            self._backend = _PollingWatchBackend(self.rootDir, recursive, pollIntervalSeconds, self._closedEvent)
+
+    @property
+    def backendName(self) -> str:
+        '''
+        Name of the backend used to detect changes: "inotify" or "polling"
+        '''
+        return self._backend.name
+
+    @property
+    def closed(self) -> bool:
+        return self._closedEvent.is_set()
+
+    def getEvents(self, timeoutSeconds: float = None) -> List[FileChangeEvent]:
+        '''
+        Waits for the next batch of changes and returns it as a list of FileChangeEvents. Returns an
+        empty list if there were no changes within timeoutSeconds (None to wait until there are
+        changes or the watcher is closed).
+        '''
+        import time
+
+        rawEvents = []
+        while (not rawEvents and not self.closed):
+            rawEvents = self._backend.readEvents(timeoutSeconds)
+            if (timeoutSeconds is not None):
+                break
+
+        if (not rawEvents):
+            return []
+
+        batchDeadline = time.monotonic() + self.maxBatchSeconds
+        while (not self.closed and time.monotonic() < batchDeadline):
+            moreRawEvents = self._backend.readEvents(self.debounceSeconds)
+            if (not moreRawEvents):
+                break
+            rawEvents.extend(moreRawEvents)
+
+        return _coalesceFileChangeEvents(rawEvents)
+
+    def close(self):
+        '''
+        Stops watching. Any getEvents call waiting for changes returns an empty list.
+        '''
+        if (self.closed):
+            return
+
+        import threading
+
+        self._closedEvent.set()
+        self._backend.stop()
+
+        if (self._callbackThread is not None and self._callbackThread is not threading.current_thread()):
+            self._callbackThread.join()
+
+        self._backend.close()
+
+    def __iter__(self):
+        '''
+        Yields each batch of changes (list of FileChangeEvents) until the watcher is closed.
+        '''
+        while (not self.closed):
+            events = self.getEvents()
+            if (events):
+                yield events
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+        return False
+
+    def _startCallbackThread(self, callback):
+        import threading
+
+        def callbackLoop():
+            while (not self.closed):
+                events = self.getEvents(timeoutSeconds=0.5)
+                if (events and not self.closed):
+                    callback(events)
+
+        self._callbackThread = threading.Thread(target=callbackLoop, name="DirectoryWatcher({})".format(self.rootDir), daemon=True)
+        self._callbackThread.start()
+
+def watchDirectory(rootDir: str, callback=None, recursive: bool = True, debounceSeconds: float = 0.2, maxBatchSeconds: float = 2.0,
+                   pollIntervalSeconds: float = 1.0, usePolling: bool = False) -> DirectoryWatcher:
+    '''
+    Watches the given directory for created, modified and deleted files and directories, and returns
+    the DirectoryWatcher. Changes are delivered in batches (lists of FileChangeEvent), either to the
+    given callback function, which is called from a background thread, or by iterating over the
+    returned watcher / calling its getEvents method. Close the watcher to stop watching.
+
+    On Linux, changes are detected with inotify, so no time is spent scanning the directory. On other
+    systems (or with usePolling=True), the directory is scanned every pollIntervalSeconds and 
+    compared with the previous scan.
+
+    @params
+    rootDir: the directory to watch
+    callback: (optional) function called with each batch of events, from a background thread. If 
+        the callback raises an exception, the background thread stops
+    recursive: (optional) whether or not to watch all the subdirectories as well
+    debounceSeconds: (optional) a batch is delivered once no more changes happen for this long
+    maxBatchSeconds: (optional) maximum time to keep collecting changes into one batch
+    pollIntervalSeconds: (optional) time between directory scans, when polling is used
+    usePolling: (optional) use directory scans even when inotify is available
+
+    @example
+    with mypycommons.file.watchDirectory("/data/incoming") as watcher:
+        for events in watcher:
+            for event in events:
+                if (event.eventType == mypycommons.file.FileChangeEvent.CREATED):
+                    processFile(event.path)
+    '''
+    watcher = DirectoryWatcher(rootDir, recursive=recursive, debounceSeconds=debounceSeconds, maxBatchSeconds=maxBatchSeconds, 
+                               pollIntervalSeconds=pollIntervalSeconds, usePolling=usePolling)
+    if (callback is not None):
+        watcher._startCallbackThread(callback)
+
+    return watcher
+
+def followFile(filepath, fromStart: bool = False, checkpointFilepath: str = None, pollIntervalSeconds: float = 0.5, 
+               idleTimeoutSeconds: float = None, stopEvent = None, encoding: str = 'utf-8', checkpointEveryLines: int = 1000):
+    '''
+    Follows the given text file like "tail -F": yields each line of the file as it is appended, with
+    the newline characters removed (like readFile). By default, starts at the current end of the 
+    file. Only the newly appended data is read on each poll, not the whole file.
+
+    Handles log rotation: when the file is replaced by a new one (its inode changes), the rest of
+    the old file is read and then the new file is followed from its start. If the file is truncated,
+    it is followed from its new start.
+
+    If a checkpointFilepath is given, the position of the last consumed line is saved to it (every
+    checkpointEveryLines lines, whenever the end of the file is reached, and when the generator is
+    closed), and a later followFile call with the same checkpoint file resumes from that position. 
+    When the generator is closed, the last line it yielded is considered consumed.
+
+    @params
+    filepath: path of the file to follow
+    fromStart: (optional) start from the beginning of the file instead of the end, when there is no
+        checkpoint to resume from
+    checkpointFilepath: (optional) path of the file to save the followed position to / resume from
+    pollIntervalSeconds: (optional) time to wait for new data once the end of the file is reached
+    idleTimeoutSeconds: (optional) stop once no new lines have been appended for this long (0 to 
+        stop as soon as the end of the file is reached). By default, follows forever
+    stopEvent: (optional) threading.Event which stops the following when set
+    encoding: (optional) the encoding to read the text of the file as, default is utf-8
+    checkpointEveryLines: (optional) how many lines to yield between checkpoint saves
+
+    @example
+    for line in mypycommons.file.followFile(logFilepath, checkpointFilepath=logFilepath + '.offset'):
+        processLine(line)
+    '''
+    import time
+
+    checkpoint = _readFollowCheckpoint(checkpointFilepath)
+    followedFile = _openFileForFollow(filepath, pollIntervalSeconds, idleTimeoutSeconds, stopEvent)
+    if (followedFile is None):
+        return
+
+    fileStat = os.fstat(followedFile.fileno())
+    if (checkpoint is not None and checkpoint['inode'] == fileStat.st_ino and checkpoint['device'] == fileStat.st_dev 
+            and checkpoint['offset'] <= fileStat.st_size):
+        followedFile.seek(checkpoint['offset'])
+    elif (fromStart or checkpoint is not None):
+        # the checkpoint is from a file that has been rotated since: follow the new file from its start
+        followedFile.seek(0)
+    else:
+        followedFile.seek(0, os.SEEK_END)
+
+    buffer = b''
+    bufferOffset = followedFile.tell()
+    consumedOffset = bufferOffset
+    linesSinceCheckpoint = 0
+    lastDataTime = time.monotonic()
+
+    try:
+        while (True):
+            data = followedFile.read(64 * 1024)
+
+            if (data):
+                lastDataTime = time.monotonic()
+                buffer += data
+                lines = buffer.split(b'\n')
+                buffer = lines.pop()
+
+                for line in lines:
+                    bufferOffset += len(line) + 1
+                    linesSinceCheckpoint += 1
+                    if (checkpointFilepath and linesSinceCheckpoint >= checkpointEveryLines):
+                        _writeFollowCheckpoint(checkpointFilepath, fileStat, consumedOffset)
+                        linesSinceCheckpoint = 0
+
+                    yield line.rstrip(b'\r').decode(encoding)
+                    # getting here means the consumer asked for the next line: this one is consumed
+                    consumedOffset = bufferOffset
+                continue
+
+            # end of the file reached: every line so far has been consumed
+            if (checkpointFilepath and linesSinceCheckpoint):
+                _writeFollowCheckpoint(checkpointFilepath, fileStat, consumedOffset)
+                linesSinceCheckpoint = 0
+
+            try:
+                currentStat = os.stat(filepath)
+            except FileNotFoundError:
+                currentStat = None
+
+            if (currentStat is not None and (currentStat.st_ino, currentStat.st_dev) != (fileStat.st_ino, fileStat.st_dev)):
+                # rotated: the old file has been read to its end, so its last line is complete now
+                if (buffer):
+                    yield buffer.rstrip(b'\r').decode(encoding)
+                    buffer = b''
+
+                followedFile.close()
+                followedFile = open(filepath, 'rb')
+                fileStat = os.fstat(followedFile.fileno())
+                bufferOffset = consumedOffset = 0
+                linesSinceCheckpoint = 1
+                continue
+
+            if (os.fstat(followedFile.fileno()).st_size < bufferOffset + len(buffer)):
+                # truncated: follow from the new start of the file
+                followedFile.seek(0)
+                buffer = b''
+                bufferOffset = consumedOffset = 0
+                linesSinceCheckpoint = 1
+                continue
+
+            if (idleTimeoutSeconds is not None and (time.monotonic() - lastDataTime) >= idleTimeoutSeconds):
+                return
+
+            if (_waitForStop(stopEvent, pollIntervalSeconds)):
+                return
+    finally:
+        if (checkpointFilepath):
+            _writeFollowCheckpoint(checkpointFilepath, fileStat, bufferOffset)
+        followedFile.close()
+
+def sortFileLines(inputFilepath, outputFilepath, keyFunc=None, reverse: bool = False, unique: bool = False, maxRunBytes: int = 64 * 1024 * 1024,
+                  numProcesses: int = 1, compressSpillFiles: bool = False, tempDir: str = None, encoding: str = 'utf-8', maxMergeFiles: int = 256) -> int:
+    '''
+    Sorts the lines of a text file that may be much larger than the available memory (an external
+    merge sort), and writes the sorted lines to the output file. Returns the number of lines written.
+
+    The input is read in runs of about maxRunBytes of text, each run is sorted in memory and spilled
+    to a temp file, and the sorted runs are then merged together with heapq.merge. Only one run (per
+    process) is held in memory at a time. Compressed input files (gzip, bz2, xz) are supported. 
+    The sort is stable: lines with equal keys keep their input order.
+
+    @params
+    inputFilepath: path of the text file to sort
+    outputFilepath: path of the sorted output file (can be the same as the input file)
+    keyFunc: (optional) function called on each line (without its newline) to get the value to sort
+        by. Must be a module-level (picklable) function when numProcesses is more than 1
+    reverse: (optional) sort in descending order
+    unique: (optional) only keep the first of the lines that have equal keys (like "sort -u")
+    maxRunBytes: (optional) approximate amount of text held in memory for each sorted run
+    numProcesses: (optional) number of processes sorting runs in parallel
+    compressSpillFiles: (optional) gzip the temp run files, to use less temp disk space
+    tempDir: (optional) directory to create the temp run files in, default is the system temp dir
+    encoding: (optional) the encoding of the text of the files, default is utf-8
+    maxMergeFiles: (optional) maximum number of run files merged at once; when there are more runs,
+        they are merged in multiple passes
+    '''
+    import shutil
+    import tempfile
+
+    spillDir = tempfile.mkdtemp(prefix='sortFileLines-', dir=tempDir)
+    try:
+        runFilepaths = _createSortedRunFiles(inputFilepath, spillDir, keyFunc, reverse, unique, maxRunBytes, numProcesses, compressSpillFiles, encoding)
+
+        # merge in multiple passes when there are too many runs to keep all of them open at once
+        mergePass = 0
+        while (len(runFilepaths) > maxMergeFiles):
+            mergedRunFilepaths = []
+            for groupStart in range(0, len(runFilepaths), maxMergeFiles):
+                mergedRunFilepath = os.path.join(spillDir, "merge-{}-{}".format(mergePass, groupStart))
+                _mergeSortedRunFiles(runFilepaths[groupStart:groupStart + maxMergeFiles], compressSpillFiles, mergedRunFilepath, compressSpillFiles, keyFunc, reverse, unique, encoding)
+                mergedRunFilepaths.append(mergedRunFilepath)
+
+            for runFilepath in runFilepaths:
+                os.remove(runFilepath)
+            runFilepaths = mergedRunFilepaths
+            mergePass += 1
+
+        return _mergeSortedRunFiles(runFilepaths, compressSpillFiles, outputFilepath, False, keyFunc, reverse, unique, encoding)
+    finally:
+        shutil.rmtree(spillDir, ignore_errors=True)
+
+def searchFiles(rootDir: str, pattern, isRegex: bool = False, ignoreCase: bool = False, fileExt=None, numWorkers: int = None,
+                useProcesses: bool = False, skipBinaryFiles: bool = True, encoding: str = 'utf-8'):
+    '''
+    Searches the text of all files within the given directory (recursively) for the given pattern,
+    like "grep -rn". This is a generator: yields (filepath, line number, line) for each matching line,
+    as they are found. Line numbers start at 1 and the lines are given without their line ending.
+
+    Files are streamed from the directory walk into a pool of workers, so searching starts before the
+    walk is done. Each file is memory mapped and searched as bytes, so only the matching lines get
+    decoded. Results for a file are given in line order, but the files are given in the order their
+    searches finish. Files that can't be read (no permission, removed during the search) are skipped.
+
+    @params
+    rootDir: the parent directory to search for files within
+    pattern: (str or bytes) the text to search for, or a regular expression if isRegex is True
+    isRegex: (optional) treat the pattern as a regular expression (compiled with re.MULTILINE, so ^
+        and $ match at the start and end of each line)
+    ignoreCase: (optional) case insensitive search (only ASCII letters are folded)
+    fileExt: (optional) (str or list) only search files with the given file extension(s), with the dot
+    numWorkers: (optional) number of threads/processes searching files, default is based on the CPU
+        count. Use 1 to search in the calling thread
+    useProcesses: (optional) use a process pool instead of a thread pool, for CPU-heavy regex searches
+    skipBinaryFiles: (optional) skip files that look binary (a NUL byte in the first 8KB)
+    encoding: (optional) the encoding of the pattern and the text of the files, default is utf-8
+
+    @example
+    for filepath, lineNumber, line in searchFiles("/var/log", "error", ignoreCase=True, fileExt=".log"):
+        print("{}:{}: {}".format(filepath, lineNumber, line))
+    '''
+    if (isinstance(pattern, str)):
+        pattern = pattern.encode(encoding)
+    if (fileExt is not None and not isinstance(fileExt, list)):
+        fileExt = [fileExt]
+
+    filepaths = (path for path, isDir in _scanDirectoryPaths(rootDir, recursive=True) if (not isDir))
+    if (fileExt is not None):
+        filepaths = (filepath for filepath in filepaths if (getFileExtension(filepath) in fileExt))
+
+    searchArgs = (pattern, isRegex, ignoreCase, skipBinaryFiles, encoding)
+
+    if (numWorkers == 1):
+        for filepath in filepaths:
+            for lineNumber, line in _searchFileForPattern(filepath, *searchArgs):
+                yield (filepath, lineNumber, line)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+    if (useProcesses):
+        numWorkers = numWorkers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=numWorkers)
+    else:
+        numWorkers = numWorkers or min(32, (os.cpu_count() or 1) + 4)
+        executor = ThreadPoolExecutor(max_workers=numWorkers)
+
+    # keep a bounded number of files in flight, so a huge tree doesn't queue up all of its paths
+    maxPendingSearches = numWorkers * 4
+    pendingSearches = {}
+    try:
+        for filepath in filepaths:
+            pendingSearches[executor.submit(_searchFileForPattern, filepath, *searchArgs)] = filepath
+
+            if (len(pendingSearches) >= maxPendingSearches):
+                doneSearches, notDoneSearches = wait(pendingSearches, return_when=FIRST_COMPLETED)
+                for doneSearch in doneSearches:
+                    doneFilepath = pendingSearches.pop(doneSearch)
+                    for lineNumber, line in doneSearch.result():
+                        yield (doneFilepath, lineNumber, line)
+
+        while (pendingSearches):
+            doneSearches, notDoneSearches = wait(pendingSearches, return_when=FIRST_COMPLETED)
+            for doneSearch in doneSearches:
+                doneFilepath = pendingSearches.pop(doneSearch)
+                for lineNumber, line in doneSearch.result():
+                    yield (doneFilepath, lineNumber, line)
+    finally:
+        # when the caller stops iterating early, don't search the rest of the queued files
+        for pendingSearch in pendingSearches:
+            pendingSearch.cancel()
+        executor.shutdown()
+
+class AtomicFileWriter:
+    '''
+    Context manager for writing a file atomically: the data is written to a temp file in the same
+    directory, which then replaces the target file with os.replace. Readers see either the old or
+    the complete new file, never a torn one, even if the process crashes mid-write. If an exception
+    is raised within the "with" block, the target file is left untouched.
+
+    The durability level controls how much syncing is done, trading write speed for safety on power
+    loss / OS crash:
+        "none": no syncing - atomic against crashes of the process only
+        "file": the temp file is synced (fsync) before it replaces the target file, so the replaced
+            file never has missing data (but the replace itself may be lost on power loss)
+        "full": like "file", and the directory is also synced after the replace, so the new file is
+            on disk once the "with" block exits
+
+    The permissions of an existing target file are kept (its owner is not).
+
+    @params
+    filepath: path of the file to write
+    mode: (optional) "w" to write text, "wb" to write bytes
+    encoding: (optional) the encoding of the text, default is utf-8 (not used with "wb")
+    durability: (optional) "none", "file" or "full", see above. Default is "file"
+    overwrite: (optional) replace the file if it already exists. If False and the file exists,
+        FileExistsError is raised when the write finishes (the check and create happen atomically)
+    compression: (optional) compress the file as it is written: "gzip", "bz2", "xz", or "auto" to 
+        choose from the file extension. Default is no compression
+    batch: (optional) an AtomicWriteBatch: the file is replaced when the batch is committed, instead
+        of when the "with" block exits
+
+    @example
+    with AtomicFileWriter("settings.json") as settingsFile:
+        settingsFile.write(settingsText)
+    '''
+    def __init__(self, filepath, mode: str = 'w', encoding: str = 'utf-8', durability: str = 'file', overwrite: bool = True, 
+                 compression: str = None, batch=None):
+        if (mode not in ('w', 'wb')):
+            raise ValueError("Atomic writes replace the whole file, so the mode must be 'w' or 'wb', not '{}'".format(mode))
+        if (durability not in ('none', 'file', 'full')):
+            raise ValueError("Invalid durability '{}', must be 'none', 'file' or 'full'".format(durability))
+
+        if (compression == 'auto'):
+            compression = _COMPRESSION_FILE_EXTENSIONS.get(getFileExtension(filepath).lower())
+
+        self.filepath = filepath
+        self._mode = mode
+        self._encoding = encoding if (mode == 'w') else None
+        self.durability = durability
+        self.overwrite = overwrite
+        self._compression = compression
+        self._batch = batch
+        self.tempFilepath = None
+        self._tempFileDescriptor = None
+        self._rawFile = None
+        self._outputFile = None
+
+    def __enter__(self):
+        self.tempFilepath, self._tempFileDescriptor = _createTempFileForAtomicWrite(self.filepath)
+        try:
+            if (self._compression is None):
+                self._outputFile = open(self._tempFileDescriptor, self._mode, encoding=self._encoding, closefd=False)
+            else:
+                self._rawFile = open(self._tempFileDescriptor, 'wb', closefd=False)
+                compressionMode = 'wt' if (self._mode == 'w') else 'wb'
+                self._outputFile = _getCompressionModule(self._compression).open(self._rawFile, compressionMode, encoding=self._encoding)
+        except BaseException:
+            self._discardTempFile()
+            raise
+
+        return self._outputFile
+
+    def __exit__(self, excType, excValue, traceback):
+        try:
+            self._outputFile.close()
+            # the compressed file doesn't close a file object it was given: flush the end of the
+            # compressed data to the temp file here, so write errors are raised before it is synced
+            if (self._rawFile is not None):
+                self._rawFile.close()
+        except BaseException:
+            self._discardTempFile()
+            raise
+
+        if (excType is not None):
+            self._discardTempFile()
+            return False
+
+        if (self._batch is not None):
+            os.close(self._tempFileDescriptor)
+            self._tempFileDescriptor = None
+            self._batch._addFinishedWrite(self)
+            return False
+
+        try:
+            if (self.durability != 'none'):
+                os.fsync(self._tempFileDescriptor)
+            os.close(self._tempFileDescriptor)
+            self._tempFileDescriptor = None
+
+            _replaceWithTempFile(self.tempFilepath, self.filepath, self.overwrite)
+        except BaseException:
+            self._discardTempFile()
+            raise
+
+        if (self.durability == 'full'):
+            _syncDirectory(getParentDirectoryPath(os.path.abspath(self.filepath)))
+        return False
+
+    def _discardTempFile(self):
+        if (self._rawFile is not None):
+            try:
+                self._rawFile.close()
+            except OSError:
+                pass
+        if (self._tempFileDescriptor is not None):
+            os.close(self._tempFileDescriptor)
+            self._tempFileDescriptor = None
+        try:
+            os.remove(self.tempFilepath)
+        except FileNotFoundError:
+            pass
+
+class AtomicWriteBatch:
+    '''
+    Groups many small atomic writes, to amortize the cost of syncing them. Files written with this
+    batch (by passing it as the "batch" param of AtomicFileWriter, atomicWriteFile, writeToFile or
+    writeJsonFile) are kept as temp files until the batch is committed. On commit, all the temp files
+    are synced one after another (after all the data is written, so the file system can flush it
+    together), then they replace their target files, and then each directory is synced only once.
+    Each write keeps its own durability level.
+
+    Used as a context manager, the batch is committed when the "with" block exits, or discarded
+    (no target files are changed) if an exception was raised. Each file is replaced atomically, but
+    the batch as a whole is not: if a replace fails during the commit, the files replaced before it
+    stay replaced, and the rest of the temp files are removed.
+
+    @example
+    with AtomicWriteBatch() as batch:
+        for name, lines in reports.items():
+            writeToFile(joinPaths(outputDir, name), lines, durability='full', batch=batch)
+    '''
+    def __init__(self):
+        import threading
+
+        self._finishedWrites = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if (excType is None):
+            self.commit()
         else:
-            path = path[:-1] # remove last char. from string
-        
-    return path
+            self.discard()
+        return False
+
+    def commit(self):
+        '''
+        Syncs and replaces all the files written so far with this batch.
+        '''
+        with self._lock:
+            finishedWrites = self._finishedWrites
+            self._finishedWrites = []
+
+        try:
+            for finishedWrite in finishedWrites:
+                if (finishedWrite.durability != 'none'):
+                    _syncFilepath(finishedWrite.tempFilepath)
+
+            dirPathsToSync = set()
+            while (finishedWrites):
+                _replaceWithTempFile(finishedWrites[0].tempFilepath, finishedWrites[0].filepath, finishedWrites[0].overwrite)
+                finishedWrite = finishedWrites.pop(0)
+                if (finishedWrite.durability == 'full'):
+                    dirPathsToSync.add(getParentDirectoryPath(os.path.abspath(finishedWrite.filepath)))
+
+            for dirPath in dirPathsToSync:
+                _syncDirectory(dirPath)
+        finally:
+            for finishedWrite in finishedWrites:
+                finishedWrite._discardTempFile()
+
+    def discard(self):
+        '''
+        Removes the temp files of all the files written so far with this batch, without changing
+        their target files.
+        '''
+        with self._lock:
+            finishedWrites = self._finishedWrites
+            self._finishedWrites = []
+
+        for finishedWrite in finishedWrites:
+            finishedWrite._discardTempFile()
+
+    def _addFinishedWrite(self, atomicFileWriter):
+        with self._lock:
+            self._finishedWrites.append(atomicFileWriter)
+
+def atomicWriteFile(filepath, mode: str = 'w', encoding: str = 'utf-8', durability: str = 'file', overwrite: bool = True,
+                    compression: str = None, batch: AtomicWriteBatch = None) -> AtomicFileWriter:
+    '''
+    Opens the given file for an atomic write, returning a context manager (AtomicFileWriter) that
+    gives the file object to write to. The file is replaced once the "with" block exits without an
+    exception. See AtomicFileWriter for the params and the durability levels.
+
+    @example
+    with atomicWriteFile("state.json", durability="full") as stateFile:
+        json.dump(state, stateFile)
+    '''
+    return AtomicFileWriter(filepath, mode, encoding, durability, overwrite, compression, batch)
+
+class MovePlanError(Exception):
+    '''
+    Raised by movePaths when the move plan has conflicts or cycles. Nothing is moved in that case.
+    The problems attribute has the list of problems found (str).
+    '''
+    def __init__(self, problems):
+        super().__init__("The move plan has {} problem(s): {}".format(len(problems), '; '.join(problems[:10])))
+        self.problems = problems
+
+class MovePathsError(Exception):
+    '''
+    Raised by movePaths when some of the moves failed (the others are done). The failedMoves attribute
+    has the list of (source, destination, exception) of the failed moves, the result attribute the
+    MovePathsResult of the moves done.
+    '''
+    def __init__(self, failedMoves, result):
+        source, destination, exception = failedMoves[0]
+        super().__init__("{} move(s) failed, first: {} -> {}: {}".format(len(failedMoves), source, destination, exception))
+        self.failedMoves = failedMoves
+        self.result = result
+
+class MovePathsResult:
+    '''
+    Counts of the moves done by movePaths.
+
+    @attributes
+    renamedCount: moves done with a rename (same file system)
+    copiedCount: moves done by copying, verifying and deleting the source (across file systems)
+    skippedCount: moves with the same source and destination
+    '''
+    def __init__(self):
+        import threading
+
+        self.renamedCount = 0
+        self.copiedCount = 0
+        self.skippedCount = 0
+        self._lock = threading.Lock()
+
+def movePaths(plan, overwrite: bool = False, numWorkers: int = 4, verify: str = 'checksum') -> MovePathsResult:
+    '''
+    Moves many files and/or directories at once, given a plan of (source path, destination path)
+    pairs. The whole plan is checked before anything is moved, raising MovePlanError if it has
+    conflicts: missing sources, duplicate sources or destinations, existing destinations (files can be
+    overwritten with overwrite=True), paths moved into themselves, into a moved directory or into the
+    destination of another move, and cycles (ex: swapping two paths). Chains are fine: a -> b and b -> c moves b first.
+
+    Moves within a file system are a single rename. Moves across file systems copy the path to a temp
+    name next to the destination, verify the copy, rename it into place and only then delete the
+    source; these run in parallel. Parent directories of the destinations are created as needed.
+
+    Raises MovePathsError after all the moves were attempted if some of them failed.
+
+    @params
+    plan: list/iterable of (source path, destination path) pairs. The destination is the new path of
+        the source, not the directory to move it into
+    overwrite: (optional) replace destination files that exist (existing directories are never replaced)
+    numWorkers: (optional) number of moves across file systems done at the same time
+    verify: (optional) how copies across file systems are verified before deleting the source:
+        "checksum" (sha256 of the data) or "size"
+
+    @example
+    movePaths([("/media/in/a.mp3", "/media/music/a.mp3"), ("/media/in/b.jpg", "/backup/photos/b.jpg")])
+    '''
+    if (verify not in ('checksum', 'size')):
+        raise ValueError("Invalid verify '{}', must be 'checksum' or 'size'".format(verify))
+
+    moveChains, result = _getMoveChains(plan, overwrite)
+
+    destinationDevices = {}
+    for moveChain in moveChains:
+        for move in moveChain:
+            move.isSameDevice = (move.sourceDevice == _getDestinationDevice(move.destination, destinationDevices))
+
+    failedMoves = []
+    crossDeviceChains = []
+    for moveChain in moveChains:
+        if (all(move.isSameDevice for move in moveChain)):
+            _runMoveChain(moveChain, overwrite, verify, result, failedMoves)
+        else:
+            crossDeviceChains.append(moveChain)
+
+    if (crossDeviceChains):
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=max(1, numWorkers)) as executor:
+            for moveChain in crossDeviceChains:
+                executor.submit(_runMoveChain, moveChain, overwrite, verify, result, failedMoves)
+
+    if (failedMoves):
+        raise MovePathsError(failedMoves, result)
+
+    return result
+
+def renamePaths(renames, overwrite: bool = False) -> MovePathsResult:
+    '''
+    Renames many files and/or directories at once, given a list of (path, new name) pairs, like
+    renamePath but with the whole batch checked for conflicts first (see movePaths).
+
+    @params
+    renames: list/iterable of (path, new name) pairs. The new name is the full name (base name and
+        file extension) of the path
+    overwrite: (optional) replace files that already have the new names
+    '''
+    plan = []
+    for path, newName in renames:
+        if (os.sep in newName or (os.altsep and os.altsep in newName)):
+            raise ValueError("The new name must not contain path separators: {}".format(newName))
+        plan.append((path, joinPaths(getParentDirectoryPath(os.path.abspath(path)), newName)))
+
+    return movePaths(plan, overwrite=overwrite)
 
 # -------------------------------- Private module helper functions ---------------------------------
 #
@@ -508,6 +1656,8 @@ def _isFile(pathObj):
     if (pathObj.is_file()):
         return True
     else:
+        from pathlib import Path
+
         extendedFilepath = "\\\\?\\" + str(pathObj)
         extendedPathObj = Path(extendedFilepath)
 
@@ -523,6 +1673,8 @@ def _isDir(pathObj):
     if (pathObj.is_dir()):
         return True
     else:
+        from pathlib import Path
+
         extendedFilepath = "\\\\?\\" + str(pathObj)
         extendedPathObj = Path(extendedFilepath)
 
@@ -531,11 +1683,49 @@ def _isDir(pathObj):
         else:
             return False
 
+def _getPosixPathName(path):
+    '''
+    Returns the final component of the given POSIX path string, the same as pathlib's PurePath.name:
+    empty and "." components are ignored.
+    '''
+    path = path.rstrip('/')
+    while (True):
+        sepIndex = path.rfind('/')
+        name = path[sepIndex + 1:]
+        if (name != '.'):
+            return name
+
+        if (sepIndex < 0):
+            return ''
+        path = path[:sepIndex].rstrip('/')
+
+def _getPosixPathParent(path):
+    '''
+    Returns the parent of the given POSIX path string, the same as str(pathlib.PurePath(path).parent):
+    empty and "." components are ignored and 2 leading slashes are kept as the root.
+    '''
+    if (path[:2] == '//' and path[2:3] != '/'):
+        root = '//'
+    elif (path[:1] == '/'):
+        root = '/'
+    else:
+        root = ''
+
+    parts = [part for part in path.split('/') if (part and part != '.')]
+    parentParts = parts[:-1]
+
+    if (parentParts):
+        return root + '/'.join(parentParts)
+    else:
+        return root or '.'
+
 def _getCallerModuleName():
     '''
     Returns the name of the caller (of the caller) module. Used by the getThisScriptCurrentDirectory
     function.
     '''
+    import inspect
+
     frm = inspect.stack()[2]
     module = inspect.getmodule(frm[0])
     return module.__file__
@@ -555,13 +1745,44 @@ def _filterCSVLinesForIterator(inFileIterator):
         if (not _CSVLineIsComment(line) and not _CSVLineIsEmpty(line)):
             yield line
 
+def _readCSVFileFieldNames(filepath):
+    '''
+    Returns the list of field names (the header row) of the given CSV file, or None if the file doesn't
+    exist or has no rows.
+    '''
+    import csv
+
+    if (not os.path.exists(filepath) or os.path.getsize(filepath) == 0):
+        return None
+
+    with _openTextFileForRead(filepath, None) as csvFile:
+        for row in csv.reader(_filterCSVLinesForIterator(csvFile)):
+            return row
+
+    return None
+
+def _textFileEndsWithLineBreak(filepath):
+    '''
+    Returns whether or not the (non-empty) text of the given file ends with a line break. Compressed
+    files are decompressed to find their last character.
+    '''
+    with open(filepath, 'rb') as inputFile:
+        compression = _getCompressionFromMagicBytes(inputFile.read(10))
+        if (compression is None):
+            inputFile.seek(-1, os.SEEK_END)
+            return (inputFile.read(1) in (b'\n', b'\r'))
+
+    lastChunk = b''
+    with _getCompressionModule(compression).open(filepath, 'rb') as compressedFile:
+        for chunk in iter(lambda: compressedFile.read(1024 * 1024), b''):
+            lastChunk = chunk
+    return (lastChunk[-1:] in (b'\n', b'\r'))
+
 def _filterChildPaths(rootDir: str, childPaths: List[str], containsStr: str):
     ''' 
     Returns the list of paths that contain the given string. The partial path (relative to root
     dir) is checked for a match, not the whole path.
     ''' 
-    #regexStringFmt = re.compile(regexStr)
-
     partialPaths = []
     for path in childPaths:
         partialPaths.append(getPartialPath(rootDir, path))
@@ -576,4 +1797,936 @@ def _filterChildPaths(rootDir: str, childPaths: List[str], containsStr: str):
         fullPath = joinPaths(rootDir, partialPath)
         matchingPaths.append(fullPath)
 
-    return matchingPaths
\ No newline at end of file
+    return matchingPaths
+
+def _coalesceFileChangeEvents(rawEvents):
+    '''
+    Merges the given list of (eventType, path, isDirectory) raw events into a list of 
+    FileChangeEvents with at most one event per path, in the order the paths were first changed.
+    '''
+    mergedEvents = {}
+    overflowEvents = []
+
+    for eventType, path, isDir in rawEvents:
+        if (eventType == FileChangeEvent.OVERFLOW):
+            if (not overflowEvents):
+                overflowEvents.append(FileChangeEvent(eventType, path, isDir))
+            continue
+
+        previousEvent = mergedEvents.get(path)
+        if (previousEvent is None):
+            mergedEvents[path] = FileChangeEvent(eventType, path, isDir)
+            continue
+
+        previousType = previousEvent.eventType
+        if (previousType == FileChangeEvent.CREATED and eventType == FileChangeEvent.DELETED):
+            # path only existed temporarily: nothing changed
+            del mergedEvents[path]
+        elif (previousType == FileChangeEvent.CREATED and eventType == FileChangeEvent.MODIFIED):
+            pass
+        elif (previousType == FileChangeEvent.DELETED and eventType == FileChangeEvent.CREATED):
+            mergedEvents[path] = FileChangeEvent(FileChangeEvent.MODIFIED, path, isDir)
+        else:
+            mergedEvents[path] = FileChangeEvent(eventType, path, isDir)
+
+    return overflowEvents + list(mergedEvents.values())
+
+def _inotifyIsSupported():
+    import sys
+    return sys.platform.startswith('linux')
+
+class _InotifyWatchBackend:
+    '''
+    Detects changes with the Linux inotify API, called through ctypes.
+    '''
+    name = 'inotify'
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+    def __init__(self, rootDir, recursive):
+        import ctypes
+
+        self._recursive = recursive
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._watchedDirs = {}
+        self._closed = False
+
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if (self._fd < 0):
+            errorNumber = ctypes.get_errno()
+            raise OSError(errorNumber, os.strerror(errorNumber))
+
+        # pipe used to wake up a select call waiting for events when the watcher is closed
+        self._wakeReadFd, self._wakeWriteFd = os.pipe()
+
+        try:
+            self._addWatch(rootDir, raiseErrors=True)
+            if (recursive):
+                for dirPath, isDir in _scanDirectoryPaths(rootDir, recursive=True):
+                    if (isDir):
+                        self._addWatch(dirPath)
+        except OSError:
+            self.stop()
+            self.close()
+            raise
+
+    def readEvents(self, timeoutSeconds):
+        import select
+
+        if (self._closed):
+            return []
+
+        try:
+            readableFds, _, _ = select.select([self._fd, self._wakeReadFd], [], [], timeoutSeconds)
+        except (OSError, ValueError):
+            # the watcher was closed by another thread
+            return []
+
+        if (self._closed or self._fd not in readableFds):
+            return []
+
+        try:
+            data = os.read(self._fd, 256 * 1024)
+        except (BlockingIOError, OSError):
+            return []
+
+        return self._parseEvents(data)
+
+    def stop(self):
+        '''
+        Wakes up any readEvents call waiting for events, and makes it return no events.
+        '''
+        if (self._closed):
+            return
+        self._closed = True
+        os.write(self._wakeWriteFd, b'x')
+
+    def close(self):
+        for fd in (self._fd, self._wakeReadFd, self._wakeWriteFd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._fd = self._wakeReadFd = self._wakeWriteFd = -1
+
+    def _addWatch(self, dirPath, raiseErrors=False):
+        import ctypes
+
+        watchDescriptor = self._libc.inotify_add_watch(self._fd, os.fsencode(dirPath), self.WATCH_MASK)
+        if (watchDescriptor < 0):
+            errorNumber = ctypes.get_errno()
+            if (raiseErrors):
+                raise OSError(errorNumber, os.strerror(errorNumber), dirPath)
+            # the directory was removed (or is not readable) before it could be watched: ignore it
+            return
+
+        self._watchedDirs[watchDescriptor] = dirPath
+
+    def _removeWatches(self, dirPath):
+        '''
+        Removes the watches of the given directory and of all the directories within it. Events still
+        queued for these watches are ignored.
+        '''
+        childPathPrefix = os.path.join(dirPath, '')
+        for watchDescriptor, watchedDirPath in list(self._watchedDirs.items()):
+            if (watchedDirPath == dirPath or watchedDirPath.startswith(childPathPrefix)):
+                del self._watchedDirs[watchDescriptor]
+                # fails if the kernel already removed the watch (directory deleted): nothing to do then
+                self._libc.inotify_rm_watch(self._fd, watchDescriptor)
+
+    def _parseEvents(self, data):
+        import struct
+
+        rawEvents = []
+        headerSize = struct.calcsize('iIII')
+        offset = 0
+
+        while (offset + headerSize <= len(data)):
+            watchDescriptor, mask, cookie, nameLength = struct.unpack_from('iIII', data, offset)
+            name = data[offset + headerSize:offset + headerSize + nameLength].rstrip(b'\0')
+            offset += headerSize + nameLength
+
+            if (mask & self.IN_Q_OVERFLOW):
+                rawEvents.append((FileChangeEvent.OVERFLOW, '', False))
+                continue
+
+            if (mask & self.IN_IGNORED):
+                self._watchedDirs.pop(watchDescriptor, None)
+                continue
+
+            dirPath = self._watchedDirs.get(watchDescriptor)
+            if (dirPath is None or not name):
+                # events about the watched directory itself (deleted/moved) are reported by its parent
+                continue
+
+            path = os.path.join(dirPath, os.fsdecode(name))
+            isDir = bool(mask & self.IN_ISDIR)
+
+            if (mask & (self.IN_CREATE | self.IN_MOVED_TO)):
+                rawEvents.append((FileChangeEvent.CREATED, path, isDir))
+
+                if (isDir and self._recursive):
+                    # watch the new directory, and report what was created in it before it was watched
+                    self._addWatch(path)
+                    for childPath, childIsDir in _scanDirectoryPaths(path, recursive=True):
+                        if (childIsDir):
+                            self._addWatch(childPath)
+                        rawEvents.append((FileChangeEvent.CREATED, childPath, childIsDir))
+
+            elif (mask & (self.IN_DELETE | self.IN_MOVED_FROM)):
+                rawEvents.append((FileChangeEvent.DELETED, path, isDir))
+
+                if (isDir):
+                    # the directory is gone from this path: stop watching it (if it was moved within the
+                    # root, it is watched again under its new path by the IN_MOVED_TO event)
+                    self._removeWatches(path)
+
+            elif (mask & (self.IN_MODIFY | self.IN_ATTRIB) and not isDir):
+                rawEvents.append((FileChangeEvent.MODIFIED, path, isDir))
+
+        return rawEvents
+
+class _PollingWatchBackend:
+    '''
+    Detects changes by scanning the directory every poll interval and comparing each scan (path ->
+    type, size and modified time) with the previous one.
+    '''
+    name = 'polling'
+
+    def __init__(self, rootDir, recursive, pollIntervalSeconds, closedEvent):
+        import time
+
+        self._rootDir = rootDir
+        self._recursive = recursive
+        self._pollIntervalSeconds = pollIntervalSeconds
+        self._closedEvent = closedEvent
+        self._snapshot = self._takeSnapshot()
+        self._nextPollTime = time.monotonic() + pollIntervalSeconds
+
+    def readEvents(self, timeoutSeconds):
+        import time
+
+        waitSeconds = max(0, self._nextPollTime - time.monotonic())
+        if (timeoutSeconds is not None and timeoutSeconds < waitSeconds):
+            self._closedEvent.wait(timeoutSeconds)
+            return []
+
+        if (self._closedEvent.wait(waitSeconds)):
+            return []
+
+        newSnapshot = self._takeSnapshot()
+        self._nextPollTime = time.monotonic() + self._pollIntervalSeconds
+
+        rawEvents = []
+        for path, (isDir, size, modifiedTime) in newSnapshot.items():
+            previous = self._snapshot.get(path)
+            if (previous is None):
+                rawEvents.append((FileChangeEvent.CREATED, path, isDir))
+            elif (previous[0] != isDir):
+                rawEvents.append((FileChangeEvent.DELETED, path, previous[0]))
+                rawEvents.append((FileChangeEvent.CREATED, path, isDir))
+            elif (not isDir and (previous[1] != size or previous[2] != modifiedTime)):
+                rawEvents.append((FileChangeEvent.MODIFIED, path, isDir))
+
+        for path, (isDir, size, modifiedTime) in self._snapshot.items():
+            if (path not in newSnapshot):
+                rawEvents.append((FileChangeEvent.DELETED, path, isDir))
+
+        self._snapshot = newSnapshot
+        return rawEvents
+
+    def stop(self):
+        # readEvents waits on the closed event of the watcher, which is set already
+        pass
+
+    def close(self):
+        pass
+
+    def _takeSnapshot(self):
+        snapshot = {}
+        for path, isDir, statResult in _scanDirectoryStats(self._rootDir, self._recursive):
+            snapshot[path] = (isDir, statResult.st_size, statResult.st_mtime_ns)
+        return snapshot
+
+def _scanDirectoryStats(rootDir, recursive, includeStats=True):
+    '''
+    Yields (path, isDirectory, stat result) for each child path of the given directory, without
+    following symlinks. Paths removed while scanning are skipped. If includeStats is False, the stat
+    result is None (saves a stat call per file).
+    '''
+    dirsToScan = [rootDir]
+    while (dirsToScan):
+        dirPath = dirsToScan.pop()
+        try:
+            dirEntries = list(os.scandir(dirPath))
+        except OSError:
+            continue
+
+        for dirEntry in dirEntries:
+            try:
+                isDir = dirEntry.is_dir(follow_symlinks=False)
+                statResult = dirEntry.stat(follow_symlinks=False) if (includeStats) else None
+            except OSError:
+                continue
+
+            yield (dirEntry.path, isDir, statResult)
+            if (isDir and recursive):
+                dirsToScan.append(dirEntry.path)
+
+def _scanDirectoryPaths(rootDir, recursive):
+    '''
+    Yields (path, isDirectory) for each child path of the given directory, without following symlinks.
+    '''
+    for path, isDir, statResult in _scanDirectoryStats(rootDir, recursive, includeStats=False):
+        yield (path, isDir)
+
+def _waitForStop(stopEvent, seconds):
+    '''
+    Waits for the given number of seconds, returning early with True if the stop event gets set.
+    '''
+    import time
+
+    if (stopEvent is not None):
+        return stopEvent.wait(seconds)
+
+    time.sleep(seconds)
+    return False
+
+def _openFileForFollow(filepath, pollIntervalSeconds, idleTimeoutSeconds, stopEvent):
+    '''
+    Opens the file to follow in binary mode, waiting for it to be created if it does not exist yet.
+    Returns None if following was stopped (idle timeout or stop event) before the file existed.
+    '''
+    import time
+
+    startTime = time.monotonic()
+    while (True):
+        try:
+            return open(filepath, 'rb')
+        except FileNotFoundError:
+            pass
+
+        if (idleTimeoutSeconds is not None and (time.monotonic() - startTime) >= idleTimeoutSeconds):
+            return None
+        if (_waitForStop(stopEvent, pollIntervalSeconds)):
+            return None
+
+def _readFollowCheckpoint(checkpointFilepath):
+    '''
+    Returns the checkpoint dict (inode, device, offset) saved by followFile, or None if there is none.
+    '''
+    import json
+
+    if (not checkpointFilepath):
+        return None
+
+    try:
+        with open(checkpointFilepath, 'r', encoding='utf-8') as checkpointFile:
+            return json.load(checkpointFile)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _writeFollowCheckpoint(checkpointFilepath, fileStat, offset):
+    '''
+    Saves the followFile checkpoint, replacing the old one atomically so that a crash cannot leave a
+    torn checkpoint file.
+    '''
+    import json
+
+    checkpoint = { 'inode': fileStat.st_ino, 'device': fileStat.st_dev, 'offset': offset }
+    with AtomicFileWriter(checkpointFilepath, durability='none') as checkpointFile:
+        json.dump(checkpoint, checkpointFile)
+
+def _getCompressionModule(compression):
+    '''
+    Returns the module (gzip, bz2 or lzma) implementing the given compression name.
+    '''
+    if (compression == 'gzip'):
+        import gzip
+        return gzip
+    elif (compression == 'bz2'):
+        import bz2
+        return bz2
+    elif (compression == 'xz'):
+        import lzma
+        return lzma
+    else:
+        raise ValueError("Invalid compression given: '{}' (must be 'gzip', 'bz2', 'xz' or 'auto')".format(compression))
+
+def _openTextFileForRead(filepath, encoding):
+    '''
+    Opens the given file for reading text, decompressing it on the fly if it is compressed with one
+    of the supported formats (detected from its first bytes, not its extension). A file that only
+    looks compressed (its data can't be decompressed) is read as plain text.
+    '''
+    import io
+
+    binaryFile = open(filepath, 'rb')
+    try:
+        # peek does not move the read position, so uncompressed files are read from this same file
+        compression = _getCompressionFromMagicBytes(binaryFile.peek(10)[:10])
+    except Exception:
+        binaryFile.close()
+        raise
+
+    if (compression is not None):
+        compressedFile = _getCompressionModule(compression).open(filepath, 'rb')
+        try:
+            compressedFile.peek(1)
+        except Exception:
+            compressedFile.close()
+        else:
+            binaryFile.close()
+            return io.TextIOWrapper(compressedFile, encoding=encoding)
+
+    return io.TextIOWrapper(binaryFile, encoding=encoding)
+
+def _getCompressionFromMagicBytes(magicBytes):
+    '''
+    Returns the compression name of the format with the given first bytes of a file, or None.
+    '''
+    for compressionMagicBytes, compression in _COMPRESSION_MAGIC_BYTES:
+        if (magicBytes.startswith(compressionMagicBytes)):
+            return compression
+
+    if (len(magicBytes) == 10 and magicBytes.startswith(b'BZh') and magicBytes[3] in b'123456789' and magicBytes[4:10] in _BZ2_BLOCK_MAGIC_BYTES):
+        return 'bz2'
+
+    return None
+
+def _getAppendedFileCompression(filepath, compression):
+    '''
+    Returns the compression to append to the given file with: the compression of the existing file
+    (from its first bytes), or the given compression if the file doesn't exist or is empty. Raises
+    ValueError if a compression other than the one of the existing file is given ("auto" and None
+    take the one of the file).
+    '''
+    try:
+        with open(filepath, 'rb') as inputFile:
+            magicBytes = inputFile.read(10)
+    except FileNotFoundError:
+        return compression
+    if (not magicBytes):
+        return compression
+
+    fileCompression = _getCompressionFromMagicBytes(magicBytes)
+    if (compression not in (None, 'auto') and compression != fileCompression):
+        raise ValueError("Unable to append with {} compression to the file {}, which has {} compression".format(compression, filepath, fileCompression))
+
+    return fileCompression
+
+def _openTextFileForWrite(filepath, mode, encoding, compression):
+    '''
+    Opens the given file for writing text ("w", "a" or "x" mode), compressing it on the fly with the given
+    compression ("gzip", "bz2", "xz", "auto" for choosing by file extension, or None).
+    '''
+    if (compression == 'auto'):
+        compression = _COMPRESSION_FILE_EXTENSIONS.get(getFileExtension(filepath).lower())
+
+    if (compression is None):
+        return open(filepath, mode, encoding=encoding)
+
+    return _getCompressionModule(compression).open(filepath, mode + 't', encoding=encoding)
+
+def _createSortedRunFiles(inputFilepath, spillDir, keyFunc, reverse, unique, maxRunBytes, numProcesses, compressSpillFiles, encoding):
+    '''
+    Reads the input file in runs of about maxRunBytes of text, and writes each run sorted to its own
+    file in the spill dir (sorted in a process pool when numProcesses is more than 1). Returns the
+    list of run filepaths, in input order.
+    '''
+    runFilepaths = []
+    pendingRuns = []
+    executor = None
+    if (numProcesses > 1):
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=numProcesses)
+
+    def spillRun(runLines):
+        runFilepath = os.path.join(spillDir, "run-{}".format(len(runFilepaths)))
+        runFilepaths.append(runFilepath)
+
+        if (executor is None):
+            _sortAndWriteRun(runLines, runFilepath, keyFunc, reverse, unique, compressSpillFiles, encoding)
+            return
+
+        # keep at most one pending run per process, so memory use stays bounded
+        while (len(pendingRuns) >= numProcesses):
+            pendingRuns.pop(0).result()
+        pendingRuns.append(executor.submit(_sortAndWriteRun, runLines, runFilepath, keyFunc, reverse, unique, compressSpillFiles, encoding))
+
+    try:
+        with _openTextFileForRead(inputFilepath, encoding) as inputFile:
+            runLines = []
+            runBytes = 0
+            for line in inputFile:
+                if (line.endswith('\n')):
+                    line = line[:-1]
+                runLines.append(line)
+                # account for the memory overhead of each str object as well as its text
+                runBytes += len(line) + 50
+
+                if (runBytes >= maxRunBytes):
+                    spillRun(runLines)
+                    runLines = []
+                    runBytes = 0
+
+            if (runLines or not runFilepaths):
+                spillRun(runLines)
+
+        for pendingRun in pendingRuns:
+            pendingRun.result()
+    finally:
+        if (executor is not None):
+            executor.shutdown()
+
+    return runFilepaths
+
+def _sortAndWriteRun(runLines, runFilepath, keyFunc, reverse, unique, compress, encoding):
+    '''
+    Sorts the given lines and writes them to the run file. Module-level so it can run in a process pool.
+    '''
+    runLines.sort(key=keyFunc, reverse=reverse)
+    if (unique):
+        runLines = _iterateUniqueSortedLines(runLines, keyFunc)
+
+    with _openSortRunFile(runFilepath, 'w', compress, encoding) as runFile:
+        for line in runLines:
+            runFile.write(line)
+            runFile.write('\n')
+
+def _mergeSortedRunFiles(runFilepaths, runFilesCompressed, outputFilepath, compressOutput, keyFunc, reverse, unique, encoding):
+    '''
+    Merges the given sorted run files into one sorted output file, and returns the number of lines
+    written.
+    '''
+    import heapq
+    import contextlib
+
+    with contextlib.ExitStack() as exitStack:
+        runIterators = []
+        for runFilepath in runFilepaths:
+            runFile = exitStack.enter_context(_openSortRunFile(runFilepath, 'r', runFilesCompressed, encoding))
+            runIterators.append(line[:-1] for line in runFile)
+
+        mergedLines = heapq.merge(*runIterators, key=keyFunc, reverse=reverse)
+        if (unique):
+            mergedLines = _iterateUniqueSortedLines(mergedLines, keyFunc)
+
+        lineCount = 0
+        with _openSortRunFile(outputFilepath, 'w', compressOutput, encoding) as outputFile:
+            for line in mergedLines:
+                outputFile.write(line)
+                outputFile.write('\n')
+                lineCount += 1
+
+    return lineCount
+
+def _iterateUniqueSortedLines(sortedLines, keyFunc):
+    '''
+    Yields the first line of each group of consecutive lines with equal keys.
+    '''
+    noPreviousKey = object()
+    previousKey = noPreviousKey
+    for line in sortedLines:
+        lineKey = keyFunc(line) if (keyFunc is not None) else line
+        if (lineKey != previousKey):
+            previousKey = lineKey
+            yield line
+
+def _openSortRunFile(filepath, mode, compress, encoding):
+    if (compress):
+        import gzip
+        return gzip.open(filepath, mode + 't', encoding=encoding, compresslevel=1, newline='\n')
+
+    return open(filepath, mode, encoding=encoding, newline='\n')
+
+def _searchFileForPattern(filepath, pattern, isRegex, ignoreCase, skipBinaryFiles, encoding):
+    '''
+    Searches the given file for the pattern (bytes) and returns a list of (line number, line) for each
+    matching line. Module-level so it can run in a process pool.
+    '''
+    import mmap
+    import re
+
+    try:
+        with open(filepath, 'rb') as searchFile:
+            fileSize = os.fstat(searchFile.fileno()).st_size
+            if (fileSize == 0):
+                return []
+            if (skipBinaryFiles and b'\0' in searchFile.read(8192)):
+                return []
+
+            with mmap.mmap(searchFile.fileno(), 0, access=mmap.ACCESS_READ) as fileData:
+                if (isRegex or ignoreCase):
+                    if (not isRegex):
+                        pattern = re.escape(pattern)
+                    # re caches compiled patterns, so this is only compiled once per worker
+                    compiledPattern = re.compile(pattern, (re.MULTILINE | re.IGNORECASE) if (ignoreCase) else re.MULTILINE)
+
+                    def findMatch(position):
+                        match = compiledPattern.search(fileData, position)
+                        return match.start() if (match) else -1
+                else:
+                    def findMatch(position):
+                        return fileData.find(pattern, position)
+
+                matchingLines = []
+                lineNumber = 1
+                countedPosition = 0
+                position = 0
+                while (position < fileSize):
+                    matchPosition = findMatch(position)
+                    if (matchPosition == -1 or matchPosition >= fileSize):
+                        break
+
+                    lineStart = fileData.rfind(b'\n', 0, matchPosition) + 1
+                    lineEnd = fileData.find(b'\n', matchPosition)
+                    if (lineEnd == -1):
+                        lineEnd = fileSize
+
+                    lineNumber += fileData[countedPosition:lineStart].count(b'\n')
+                    countedPosition = lineStart
+                    line = fileData[lineStart:lineEnd].decode(encoding, errors='replace')
+                    if (line.endswith('\r')):
+                        line = line[:-1]
+                    matchingLines.append((lineNumber, line))
+
+                    # only report each line once, even if it has several matches
+                    position = lineEnd + 1
+
+                return matchingLines
+    except (OSError, ValueError):
+        return []
+
+def _createTempFileForAtomicWrite(filepath):
+    '''
+    Creates a new temp file next to the given file (same directory, so os.replace can't cross file 
+    systems), and returns its path and open file descriptor. The temp file gets the permissions of
+    the existing file, or the default permissions for new files (following the umask).
+    '''
+    dirPath, filename = os.path.split(os.path.abspath(filepath))
+    while (True):
+        tempFilepath = os.path.join(dirPath, '.{}.{}.tmp'.format(filename, os.urandom(4).hex()))
+        try:
+            fileDescriptor = os.open(tempFilepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+            break
+        except FileExistsError:
+            continue
+
+    try:
+        os.chmod(tempFilepath, os.stat(filepath).st_mode & 0o7777)
+    except FileNotFoundError:
+        pass
+
+    return (tempFilepath, fileDescriptor)
+
+def _replaceWithTempFile(tempFilepath, filepath, overwrite):
+    '''
+    Moves the temp file to the target filepath. If overwrite is False, raises FileExistsError if the
+    target file exists, using a hard link so that the check and the create are one atomic step.
+    '''
+    if (overwrite):
+        os.replace(tempFilepath, filepath)
+        return
+
+    try:
+        os.link(tempFilepath, filepath)
+    except FileExistsError:
+        raise
+    except OSError:
+        # the file system doesn't support hard links: check first, which is not atomic
+        if (os.path.lexists(filepath)):
+            raise FileExistsError("The file to write already exists: {}".format(filepath))
+        os.replace(tempFilepath, filepath)
+        return
+
+    os.remove(tempFilepath)
+
+def _syncFilepath(filepath):
+    '''
+    Flushes the data of the given file to disk (fsync).
+    '''
+    # Windows can only flush files opened for writing
+    fileDescriptor = os.open(filepath, os.O_RDWR if (os.name == 'nt') else os.O_RDONLY)
+    try:
+        os.fsync(fileDescriptor)
+    finally:
+        os.close(fileDescriptor)
+
+def _syncDirectory(dirPath):
+    '''
+    Flushes the directory entries of the given directory to disk (fsync), so that files created or
+    renamed in it persist. Not possible (and not needed) on Windows.
+    '''
+    if (os.name == 'nt'):
+        return
+
+    _syncFilepath(dirPath)
+
+def _syncWrittenFile(filepath, durability):
+    '''
+    Syncs a file written in place (not atomically) to disk, for the given durability level.
+    '''
+    if (durability == 'none'):
+        return
+    if (durability not in ('file', 'full')):
+        raise ValueError("Invalid durability '{}', must be 'none', 'file' or 'full'".format(durability))
+
+    _syncFilepath(filepath)
+    if (durability == 'full'):
+        _syncDirectory(getParentDirectoryPath(os.path.abspath(filepath)))
+
+class _PlannedMove:
+    '''
+    One (source, destination) move of a movePaths plan, with the stat info found while checking it.
+    '''
+    def __init__(self, source, destination, sourceStat):
+        self.source = source
+        self.destination = destination
+        self.sourceDevice = sourceStat.st_dev
+        self.sourceIsDir = stat.S_ISDIR(sourceStat.st_mode)
+        self.isSameDevice = True
+
+def _getMoveChains(plan, overwrite):
+    '''
+    Checks the given move plan and returns (list of move chains, MovePathsResult with the skipped
+    moves counted). Each chain is a list of moves that must be done in order (the destination of a
+    move is the source of the next one, which is moved first), and the chains are independent. Raises
+    MovePlanError with all the problems found.
+    '''
+    result = MovePathsResult()
+    problems = []
+    movesBySource = {}
+    destinations = set()
+
+    for source, destination in plan:
+        source = os.path.abspath(source)
+        destination = os.path.abspath(destination)
+
+        if (source == destination):
+            result.skippedCount += 1
+            continue
+        if (source in movesBySource):
+            problems.append("{} is moved more than once".format(source))
+            continue
+        if (destination in destinations):
+            problems.append("{} is the destination of more than one move".format(destination))
+            continue
+
+        try:
+            sourceStat = os.lstat(source)
+        except FileNotFoundError:
+            problems.append("{} does not exist".format(source))
+            continue
+
+        if (destination.startswith(source + os.sep)):
+            problems.append("{} can't be moved into itself ({})".format(source, destination))
+            continue
+
+        movesBySource[source] = _PlannedMove(source, destination, sourceStat)
+        destinations.add(destination)
+
+    for move in movesBySource.values():
+        movedAncestor = _getMovedAncestorPath(move.source, movesBySource)
+        if (movedAncestor is not None):
+            problems.append("{} is inside {}, which is moved too".format(move.source, movedAncestor))
+        movedAncestor = _getMovedAncestorPath(move.destination, movesBySource)
+        if (movedAncestor is not None):
+            problems.append("the destination {} is inside {}, which is moved".format(move.destination, movedAncestor))
+        destinationAncestor = _getMovedAncestorPath(move.destination, destinations)
+        if (destinationAncestor is not None):
+            problems.append("the destination {} is inside {}, the destination of another move".format(move.destination, destinationAncestor))
+
+        # a destination that is the source of another move is freed by that move first
+        if (move.destination not in movesBySource):
+            try:
+                destinationStat = os.lstat(move.destination)
+            except FileNotFoundError:
+                continue
+            if (not overwrite or move.sourceIsDir or stat.S_ISDIR(destinationStat.st_mode)):
+                problems.append("the destination {} already exists".format(move.destination))
+
+    moveChains = []
+    chainedSources = set()
+    # moves whose source is not the destination of another move start the chains (in reverse order)
+    for move in movesBySource.values():
+        if (move.source in destinations):
+            continue
+
+        moveChain = [move]
+        while (moveChain[-1].destination in movesBySource):
+            moveChain.append(movesBySource[moveChain[-1].destination])
+        moveChain.reverse()
+        moveChains.append(moveChain)
+        chainedSources.update(chainedMove.source for chainedMove in moveChain)
+
+    # the moves not in any chain form cycles
+    for move in movesBySource.values():
+        if (move.source not in chainedSources):
+            cyclePaths = [move.source]
+            while (movesBySource[cyclePaths[-1]].destination != move.source):
+                cyclePaths.append(movesBySource[cyclePaths[-1]].destination)
+            chainedSources.update(cyclePaths)
+            problems.append("the moves of {} form a cycle".format(' -> '.join(cyclePaths + [move.source])))
+
+    if (problems):
+        raise MovePlanError(problems)
+
+    return (moveChains, result)
+
+def _getMovedAncestorPath(path, movedPaths):
+    '''
+    Returns the closest parent directory of the given path that is in the given moved paths (the
+    sources, or the destinations, of the moves), or None.
+    '''
+    parentPath = os.path.dirname(path)
+    while (parentPath != path):
+        if (parentPath in movedPaths):
+            return parentPath
+        path = parentPath
+        parentPath = os.path.dirname(path)
+    return None
+
+def _getDestinationDevice(destination, destinationDevices):
+    '''
+    Returns the device id of the parent directory of the given destination, from its closest existing
+    ancestor directory (nothing is created while planning, the parent directories are created when
+    the move runs). The device ids are cached per directory in the given dict.
+    '''
+    parentDir = os.path.dirname(destination)
+    device = destinationDevices.get(parentDir)
+    if (device is None):
+        existingDir = parentDir
+        while (not os.path.isdir(existingDir) and os.path.dirname(existingDir) != existingDir):
+            existingDir = os.path.dirname(existingDir)
+        device = os.stat(existingDir).st_dev
+        destinationDevices[parentDir] = device
+    return device
+
+def _runMoveChain(moveChain, overwrite, verify, result, failedMoves):
+    '''
+    Does the moves of the given chain in order, adding them to the result. A failed move is added to
+    the failed moves, and the rest of the chain (which depends on it) is not done.
+    '''
+    for move in moveChain:
+        try:
+            os.makedirs(os.path.dirname(move.destination), exist_ok=True)
+            if (move.isSameDevice):
+                if (overwrite):
+                    os.replace(move.source, move.destination)
+                else:
+                    _renameWithoutReplacing(move.source, move.destination, move.sourceIsDir)
+            else:
+                _moveAcrossDevices(move, overwrite, verify)
+        except Exception as exception:
+            failedMoves.append((move.source, move.destination, exception))
+            return
+
+        with result._lock:
+            if (move.isSameDevice):
+                result.renamedCount += 1
+            else:
+                result.copiedCount += 1
+
+def _renameWithoutReplacing(source, destination, sourceIsDir):
+    '''
+    Renames the source to the destination, raising FileExistsError if the destination exists. Files
+    are hard linked then unlinked so that the check and the rename are one atomic step.
+    '''
+    if (not sourceIsDir):
+        try:
+            os.link(source, destination, follow_symlinks=False)
+        except FileExistsError:
+            raise
+        except (OSError, NotImplementedError):
+            pass
+        else:
+            os.remove(source)
+            return
+
+    if (os.path.lexists(destination)):
+        raise FileExistsError("The destination already exists: {}".format(destination))
+    os.rename(source, destination)
+
+def _moveAcrossDevices(move, overwrite, verify):
+    '''
+    Moves the source to the destination on another file system: copies it to a temp name next to the
+    destination, verifies the copy, renames it into place and then deletes the source.
+    '''
+    import shutil
+
+    tempPath = os.path.join(os.path.dirname(move.destination), '.{}.{}.tmp'.format(os.path.basename(move.destination), os.urandom(4).hex()))
+    try:
+        if (move.sourceIsDir):
+            shutil.copytree(move.source, tempPath, symlinks=True)
+        else:
+            shutil.copy2(move.source, tempPath, follow_symlinks=False)
+
+        _verifyMovedCopy(move.source, tempPath, verify)
+
+        if (move.sourceIsDir):
+            _renameWithoutReplacing(tempPath, move.destination, True)
+        else:
+            _replaceWithTempFile(tempPath, move.destination, overwrite)
+    except BaseException:
+        if (os.path.isdir(tempPath) and not os.path.islink(tempPath)):
+            shutil.rmtree(tempPath, ignore_errors=True)
+        elif (os.path.lexists(tempPath)):
+            os.remove(tempPath)
+        raise
+
+    if (move.sourceIsDir):
+        shutil.rmtree(move.source)
+    else:
+        os.remove(move.source)
+
+def _verifyMovedCopy(source, copyPath, verify):
+    '''
+    Checks that the copy of the source (file or directory tree) has the same files, and the same
+    sizes (and data, for "checksum" verification). Raises OSError if not.
+    '''
+    if (os.path.isdir(copyPath) and not os.path.islink(copyPath)):
+        filePairs = []
+        for dirPath, dirNames, filenames in os.walk(source):
+            copyDirPath = os.path.join(copyPath, os.path.relpath(dirPath, source))
+            for filename in filenames:
+                filePairs.append((os.path.join(dirPath, filename), os.path.join(copyDirPath, filename)))
+    else:
+        filePairs = [(source, copyPath)]
+
+    for sourceFilepath, copyFilepath in filePairs:
+        sourceStat = os.lstat(sourceFilepath)
+        copyStat = os.lstat(copyFilepath)
+        if (stat.S_ISLNK(sourceStat.st_mode)):
+            if (os.readlink(sourceFilepath) != os.readlink(copyFilepath)):
+                raise OSError("The copy of the link {} does not match the source".format(sourceFilepath))
+            continue
+
+        if (sourceStat.st_size != copyStat.st_size):
+            raise OSError("The copy of {} has a different size than the source".format(sourceFilepath))
+        if (verify == 'checksum' and _getFileSha256(sourceFilepath) != _getFileSha256(copyFilepath)):
+            raise OSError("The copy of {} has different data than the source".format(sourceFilepath))
+
+def _getFileSha256(filepath):
+    import hashlib
+
+    fileHash = hashlib.sha256()
+    with open(filepath, 'rb') as inputFile:
+        for chunk in iter(lambda: inputFile.read(1024 * 1024), b''):
+            fileHash.update(chunk)
+    return fileHash.digest()
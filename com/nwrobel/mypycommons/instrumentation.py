@@ -0,0 +1,420 @@
+'''
+com.nwrobel.instrumentation
+
+Opt-in I/O instrumentation of the public functions of the file and archive modules (and of the
+private path probing helpers of the file module): for each function, records the number of calls, the wall time taken, the bytes read and written and the
+number of open and stat calls made (including by the functions it calls).
+
+While instrumentation is disabled nothing is patched, so it costs nothing. Enabling it replaces the
+public functions of the modules with recording wrappers, and (for the whole process) open, os.open,
+os.stat and os.lstat with counting wrappers, until it is disabled again.
+
+The bytes read and written are taken from the I/O counters of the calling thread (Linux only, they
+stay 0 elsewhere), so work a function hands off to other threads or to child processes (like tar or
+7z) is not counted in its bytes.
+'''
+
+import os
+import threading
+from time import perf_counter_ns
+
+from com.nwrobel import mypycommons
+
+_instrumentationEnabled = False
+_instrumentationLock = threading.Lock()
+# (module, function name) -> original function, for the functions replaced by wrappers
+_instrumentedFunctions = {}
+# (owner object, attribute name) -> original function, for the patched open/stat functions
+_patchedSyscallFunctions = {}
+# function label (ex: "file.readFile") -> _FunctionStats
+_functionStats = {}
+_functionStatsLock = threading.Lock()
+_threadState = threading.local()
+
+_THREAD_IO_FILEPATH = '/proc/thread-self/io'
+_threadIoAvailable = False
+# kept unpatched for reading the thread I/O counters
+_rawOsOpen = os.open
+_rawOsRead = os.read
+_rawOsClose = os.close
+
+# private helpers also instrumented, as they do the per-path probing of the public functions
+_INSTRUMENTED_PRIVATE_FUNCTIONS = {
+    'file': ('_isFile', '_isDir', '_scanDirectoryPaths')
+}
+
+_loggingThread = None
+_loggingStopEvent = None
+
+def enableInstrumentation(moduleNames=('file', 'archive')):
+    '''
+    Enables recording of the I/O stats of the public functions of the given mypycommons modules, and
+    of the path probing helpers of the file module (file._isFile, file._isDir and
+    file._scanDirectoryPaths). Only calls made through the module (ex: mypycommons.file.readFile(...)) are recorded, which is how
+    the modules call each other.
+
+    @params
+    moduleNames: (optional) names of the mypycommons modules to instrument, default is file and archive
+
+    @example
+    mypycommons.instrumentation.enableInstrumentation()
+    runJob()
+    mypycommons.instrumentation.logInstrumentationStats(logger)
+    '''
+    global _instrumentationEnabled, _threadIoAvailable
+
+    import importlib
+    import inspect
+
+    with _instrumentationLock:
+        for moduleName in moduleNames:
+            module = importlib.import_module('com.nwrobel.mypycommons.' + moduleName)
+            privateNames = _INSTRUMENTED_PRIVATE_FUNCTIONS.get(moduleName, ())
+
+            for name, func in list(vars(module).items()):
+                if ((name.startswith('_') and name not in privateNames) or not inspect.isfunction(func) or func.__module__ != module.__name__
+                        or (module, name) in _instrumentedFunctions):
+                    continue
+
+                stats = _getFunctionStats("{}.{}".format(moduleName, name))
+                if (inspect.isgeneratorfunction(func)):
+                    wrapper = _createInstrumentedGeneratorFunction(func, stats)
+                else:
+                    wrapper = _createInstrumentedFunction(func, stats)
+
+                _instrumentedFunctions[(module, name)] = func
+                setattr(module, name, wrapper)
+
+        if (not _patchedSyscallFunctions):
+            _threadIoAvailable = os.path.exists(_THREAD_IO_FILEPATH)
+            _patchSyscallFunctions()
+
+        _instrumentationEnabled = True
+
+def disableInstrumentation():
+    '''
+    Disables recording of the I/O stats, restoring the original functions. Already recorded stats
+    are kept.
+    '''
+    global _instrumentationEnabled
+
+    with _instrumentationLock:
+        for (module, name), func in _instrumentedFunctions.items():
+            if (getattr(getattr(module, name), '__wrapped__', None) is func):
+                setattr(module, name, func)
+        _instrumentedFunctions.clear()
+
+        for (owner, name), func in _patchedSyscallFunctions.items():
+            if (getattr(getattr(owner, name), '__wrapped__', None) is func):
+                setattr(owner, name, func)
+        _patchedSyscallFunctions.clear()
+
+        _instrumentationEnabled = False
+
+def isInstrumentationEnabled() -> bool:
+    '''
+    Returns whether or not recording of the I/O stats is enabled.
+    '''
+    return _instrumentationEnabled
+
+def resetInstrumentationStats():
+    '''
+    Sets all the recorded I/O stats back to 0.
+    '''
+    with _functionStatsLock:
+        for stats in _functionStats.values():
+            stats.reset()
+
+def getInstrumentationStats() -> dict:
+    '''
+    Returns a snapshot of the recorded I/O stats, as a dict of function label (ex: "file.readFile")
+    -> dict of stats for that function: calls, errors, totalSeconds, meanSeconds, maxSeconds,
+    bytesRead, bytesWritten, openCalls and statCalls. Only functions called at least once are included.
+
+    The stats of a function include the work of the instrumented functions it calls; when a function
+    calls itself, only the outermost call is timed.
+    '''
+    report = {}
+    with _functionStatsLock:
+        for label, stats in _functionStats.items():
+            if (stats.calls == 0):
+                continue
+
+            report[label] = {
+                'calls': stats.calls,
+                'errors': stats.errors,
+                'totalSeconds': stats.totalNs / 1e9,
+                'meanSeconds': (stats.totalNs / stats.calls) / 1e9,
+                'maxSeconds': stats.maxNs / 1e9,
+                'bytesRead': stats.bytesRead,
+                'bytesWritten': stats.bytesWritten,
+                'openCalls': stats.openCalls,
+                'statCalls': stats.statCalls
+            }
+
+    return report
+
+def getInstrumentationStatsJson() -> str:
+    '''
+    Returns the recorded I/O stats (see getInstrumentationStats) as a JSON string.
+    '''
+    import json
+
+    return json.dumps(getInstrumentationStats(), indent=4, sort_keys=True)
+
+def logInstrumentationStats(logger):
+    '''
+    Logs the recorded I/O stats (see getInstrumentationStats) at info level, one line per function,
+    sorted by the total time taken.
+
+    @params
+    logger: the CommonLogger (or logging.Logger) to log the stats with
+    '''
+    import com.nwrobel.mypycommons.logger
+
+    if (isinstance(logger, mypycommons.logger.CommonLogger)):
+        logger = logger.getLogger()
+
+    instrumentationStats = getInstrumentationStats()
+    for label, stats in sorted(instrumentationStats.items(), key=lambda item: item[1]['totalSeconds'], reverse=True):
+        logger.info("I/O [{}]: calls={}, errors={}, total={:.6f}s, mean={:.6f}s, max={:.6f}s, read={}B, written={}B, opens={}, stats={}".format(
+            label, stats['calls'], stats['errors'], stats['totalSeconds'], stats['meanSeconds'], stats['maxSeconds'],
+            stats['bytesRead'], stats['bytesWritten'], stats['openCalls'], stats['statCalls']
+        ))
+
+def startInstrumentationLogging(logger, intervalSeconds: float = 60.0, resetAfterLogging: bool = False):
+    '''
+    Starts a background thread logging the recorded I/O stats (see logInstrumentationStats) every
+    interval, until stopInstrumentationLogging is called. Instrumentation itself must be enabled
+    separately.
+
+    @params
+    logger: the CommonLogger (or logging.Logger) to log the stats with
+    intervalSeconds: (optional) time between logging the stats
+    resetAfterLogging: (optional) reset the stats after logging them, so each dump covers one interval
+    '''
+    global _loggingThread, _loggingStopEvent
+
+    stopInstrumentationLogging()
+
+    stopEvent = threading.Event()
+
+    def logPeriodically():
+        while (not stopEvent.wait(intervalSeconds)):
+            logInstrumentationStats(logger)
+            if (resetAfterLogging):
+                resetInstrumentationStats()
+
+    _loggingStopEvent = stopEvent
+    _loggingThread = threading.Thread(target=logPeriodically, name='mypycommons-instrumentation', daemon=True)
+    _loggingThread.start()
+
+def stopInstrumentationLogging():
+    '''
+    Stops the background logging of the I/O stats started with startInstrumentationLogging, if any.
+    '''
+    global _loggingThread, _loggingStopEvent
+
+    if (_loggingThread is not None):
+        _loggingStopEvent.set()
+        _loggingThread.join()
+        _loggingThread = None
+        _loggingStopEvent = None
+
+# -------------------------------- Private module helper functions ---------------------------------
+#
+class _FunctionStats:
+    '''
+    The recorded I/O stats of one function.
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.errors = 0
+        self.totalNs = 0
+        self.maxNs = 0
+        self.bytesRead = 0
+        self.bytesWritten = 0
+        self.openCalls = 0
+        self.statCalls = 0
+
+class _InstrumentedCall:
+    '''
+    The counters of one running call of an instrumented function, owned by the calling thread.
+    '''
+    __slots__ = ('stats', 'startNs', 'startReadBytes', 'startWrittenBytes', 'startCounterReadBytes', 'openCalls', 'statCalls')
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.openCalls = 0
+        self.statCalls = 0
+
+def _getFunctionStats(label):
+    with _functionStatsLock:
+        stats = _functionStats.get(label)
+        if (stats is None):
+            stats = _FunctionStats()
+            _functionStats[label] = stats
+        return stats
+
+def _getActiveCalls():
+    '''
+    Returns the dict of _FunctionStats -> _InstrumentedCall of the instrumented calls running in the
+    current thread.
+    '''
+    activeCalls = getattr(_threadState, 'activeCalls', None)
+    if (activeCalls is None):
+        activeCalls = {}
+        _threadState.activeCalls = activeCalls
+        _threadState.counterReadBytes = 0
+    return activeCalls
+
+def _readThreadIoCounters():
+    '''
+    Returns the (bytes read, bytes written) I/O counters of the current thread, or (0, 0) if they are
+    not available. Reading the counters counts as reading bytes too, so the bytes read here are
+    added up, to be subtracted from the measured bytes.
+    '''
+    if (not _threadIoAvailable):
+        return (0, 0)
+
+    fd = _rawOsOpen(_THREAD_IO_FILEPATH, os.O_RDONLY)
+    try:
+        content = _rawOsRead(fd, 4096)
+    finally:
+        _rawOsClose(fd)
+
+    _threadState.counterReadBytes += len(content)
+    lines = content.split(b'\n', 2)
+    return (int(lines[0].split()[1]), int(lines[1].split()[1]))
+
+def _beginCall(stats, countCall=True):
+    '''
+    Starts recording a call of the function with the given stats. Returns the _InstrumentedCall, or
+    None if the function is already running in this thread (a recursive call, only counted).
+    '''
+    activeCalls = _getActiveCalls()
+    if (stats in activeCalls):
+        if (countCall):
+            with _functionStatsLock:
+                stats.calls += 1
+        return None
+
+    call = _InstrumentedCall(stats)
+    call.startCounterReadBytes = _threadState.counterReadBytes
+    call.startReadBytes, call.startWrittenBytes = _readThreadIoCounters()
+    call.startNs = perf_counter_ns()
+    activeCalls[stats] = call
+
+    if (countCall):
+        with _functionStatsLock:
+            stats.calls += 1
+
+    return call
+
+def _endCall(call, failed):
+    '''
+    Finishes recording the given call (from _beginCall), adding its counters to the function stats.
+    '''
+    if (call is None):
+        return
+
+    elapsedNs = perf_counter_ns() - call.startNs
+    del _getActiveCalls()[call.stats]
+
+    counterReadBytes = _threadState.counterReadBytes - call.startCounterReadBytes
+    readBytes, writtenBytes = _readThreadIoCounters()
+
+    stats = call.stats
+    with _functionStatsLock:
+        stats.totalNs += elapsedNs
+        stats.maxNs = max(stats.maxNs, elapsedNs)
+        stats.bytesRead += max(0, readBytes - call.startReadBytes - counterReadBytes)
+        stats.bytesWritten += writtenBytes - call.startWrittenBytes
+        stats.openCalls += call.openCalls
+        stats.statCalls += call.statCalls
+        if (failed):
+            stats.errors += 1
+
+def _createInstrumentedFunction(func, stats):
+    import functools
+
+    @functools.wraps(func)
+    def instrumentedFunction(*args, **kwargs):
+        call = _beginCall(stats)
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            _endCall(call, failed)
+
+    return instrumentedFunction
+
+def _createInstrumentedGeneratorFunction(func, stats):
+    '''
+    Generator functions do their work while they are iterated, so each step of the generator is
+    recorded (as part of a single call), not the time the caller spends between the steps.
+    '''
+    import functools
+
+    @functools.wraps(func)
+    def instrumentedGeneratorFunction(*args, **kwargs):
+        generator = func(*args, **kwargs)
+        countCall = True
+        try:
+            while (True):
+                call = _beginCall(stats, countCall)
+                countCall = False
+                failed = True
+                try:
+                    item = next(generator)
+                    failed = False
+                except StopIteration:
+                    failed = False
+                    return
+                finally:
+                    _endCall(call, failed)
+
+                yield item
+        finally:
+            generator.close()
+
+    return instrumentedGeneratorFunction
+
+def _countOpenCall():
+    activeCalls = getattr(_threadState, 'activeCalls', None)
+    if (activeCalls):
+        for call in activeCalls.values():
+            call.openCalls += 1
+
+def _countStatCall():
+    activeCalls = getattr(_threadState, 'activeCalls', None)
+    if (activeCalls):
+        for call in activeCalls.values():
+            call.statCalls += 1
+
+def _patchSyscallFunctions():
+    '''
+    Replaces open, os.open, os.stat and os.lstat with wrappers counting the calls made by the
+    running instrumented functions.
+    '''
+    import builtins
+    import functools
+
+    for owner, name, countFunc in [(builtins, 'open', _countOpenCall), (os, 'open', _countOpenCall),
+                                   (os, 'stat', _countStatCall), (os, 'lstat', _countStatCall)]:
+        func = getattr(owner, name)
+
+        def createCountingFunction(func, countFunc):
+            @functools.wraps(func)
+            def countingFunction(*args, **kwargs):
+                countFunc()
+                return func(*args, **kwargs)
+            return countingFunction
+
+        _patchedSyscallFunctions[(owner, name)] = func
+        setattr(owner, name, createCountingFunction(func, countFunc))
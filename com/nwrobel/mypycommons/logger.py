@@ -6,8 +6,10 @@ as a better alternative to print statements for debugging, info, error, etc purp
 
 '''
 
+import abc
 import logging
-import inspect
+import threading
+import time
 
 from com.nwrobel import mypycommons
 import com.nwrobel.mypycommons.file
@@ -44,9 +46,8 @@ class CommonLogger:
         '''
         level = self._getLoggerLevel(logLevel)
 
-        for handler in self._loggerObj.handlers:
-            if (handler.__class__.__name__ == 'StreamHandler'):
-                handler.setLevel(level)
+        for handler in self._getHandlersByClassName('StreamHandler'):
+            handler.setLevel(level)
 
     def setFileOutputLogLevel(self, logLevel: LogLevel):
         '''
@@ -55,9 +56,91 @@ class CommonLogger:
         '''
         level = self._getLoggerLevel(logLevel)
 
+        for handler in self._getHandlersByClassName('FileHandler'):
+            handler.setLevel(level)
+
+    def setConsoleOutputRateLimit(self, maxMessages: int, perSeconds: float = 1.0, summaryIntervalSeconds: float = 10.0):
+        '''
+        Limits the number of log messages written to the console to at most maxMessages per
+        perSeconds time window. Messages over the limit are dropped and a summary of how many were
+        suppressed is logged at most once every summaryIntervalSeconds.
+        '''
+        for handler in self._getHandlersByClassName('StreamHandler'):
+            self._replaceHandlerFilter(handler, RateLimitFilter(handler, maxMessages, perSeconds, summaryIntervalSeconds))
+
+    def setFileOutputRateLimit(self, maxMessages: int, perSeconds: float = 1.0, summaryIntervalSeconds: float = 10.0):
+        '''
+        Limits the number of log messages written to the log file to at most maxMessages per
+        perSeconds time window. Messages over the limit are dropped and a summary of how many were
+        suppressed is logged at most once every summaryIntervalSeconds.
+        '''
+        for handler in self._getHandlersByClassName('FileHandler'):
+            self._replaceHandlerFilter(handler, RateLimitFilter(handler, maxMessages, perSeconds, summaryIntervalSeconds))
+
+    def setConsoleOutputDuplicateSuppression(self, summaryIntervalSeconds: float = 10.0):
+        '''
+        Suppresses repeats of the same log message (same level and text) written to the console.
+        The first occurrence is logged, and a "repeated N times" summary is logged for the
+        suppressed repeats at most once every summaryIntervalSeconds.
+        '''
+        for handler in self._getHandlersByClassName('StreamHandler'):
+            self._replaceHandlerFilter(handler, DuplicateFilter(handler, summaryIntervalSeconds))
+
+    def setFileOutputDuplicateSuppression(self, summaryIntervalSeconds: float = 10.0):
+        '''
+        Suppresses repeats of the same log message (same level and text) written to the log file.
+        The first occurrence is logged, and a "repeated N times" summary is logged for the
+        suppressed repeats at most once every summaryIntervalSeconds.
+        '''
+        for handler in self._getHandlersByClassName('FileHandler'):
+            self._replaceHandlerFilter(handler, DuplicateFilter(handler, summaryIntervalSeconds))
+
+    def setConsoleOutputSampling(self, sampleRates: dict, summaryIntervalSeconds: float = 10.0):
+        '''
+        Randomly samples the log messages written to the console, per log level. 
+
+        @params
+        sampleRates: dict of LogLevel -> fraction (0.0 to 1.0) of the messages of that level to 
+            keep, ex: { LogLevel.DEBUG: 0.01, LogLevel.INFO: 0.1 }. Levels not given are not sampled.
+        summaryIntervalSeconds: how often a summary of the dropped message count is logged
+        '''
+        levelSampleRates = self._getLevelSampleRates(sampleRates)
+        for handler in self._getHandlersByClassName('StreamHandler'):
+            self._replaceHandlerFilter(handler, SamplingFilter(handler, levelSampleRates, summaryIntervalSeconds))
+
+    def setFileOutputSampling(self, sampleRates: dict, summaryIntervalSeconds: float = 10.0):
+        '''
+        Randomly samples the log messages written to the log file, per log level. 
+
+        @params
+        sampleRates: dict of LogLevel -> fraction (0.0 to 1.0) of the messages of that level to 
+            keep, ex: { LogLevel.DEBUG: 0.01, LogLevel.INFO: 0.1 }. Levels not given are not sampled.
+        summaryIntervalSeconds: how often a summary of the dropped message count is logged
+        '''
+        levelSampleRates = self._getLevelSampleRates(sampleRates)
+        for handler in self._getHandlersByClassName('FileHandler'):
+            self._replaceHandlerFilter(handler, SamplingFilter(handler, levelSampleRates, summaryIntervalSeconds))
+
+    def clearOutputFilters(self):
+        '''
+        Removes all rate limiting, duplicate suppression and sampling from the console and file
+        output, logging any pending suppressed message summaries first.
+        '''
+        for handler in self._loggerObj.handlers:
+            for existingFilter in list(handler.filters):
+                if (isinstance(existingFilter, SuppressingFilter)):
+                    existingFilter.close()
+                    handler.removeFilter(existingFilter)
+
+    def flushSuppressedSummaries(self):
+        '''
+        Immediately logs the summaries of any messages suppressed by rate limiting, duplicate
+        suppression or sampling, instead of waiting for the summary interval to pass.
+        '''
         for handler in self._loggerObj.handlers:
-            if (handler.__class__.__name__ == 'FileHandler'):
-                handler.setLevel(level)
+            for existingFilter in handler.filters:
+                if (isinstance(existingFilter, SuppressingFilter)):
+                    existingFilter.flushSummary()
 
     def _configureWithBasicSettings(self):
         '''
@@ -93,6 +176,35 @@ class CommonLogger:
         self._loggerObj.addHandler(fh)
         self._loggerObj.addHandler(ch)
 
+    def _getHandlersByClassName(self, className: str):
+        '''
+        Returns the handlers of the logger instance that are exactly of the given class name.
+        '''
+        return [handler for handler in self._loggerObj.handlers if (handler.__class__.__name__ == className)]
+
+    def _replaceHandlerFilter(self, handler: logging.Handler, newFilter: 'SuppressingFilter'):
+        '''
+        Adds the given filter to the handler, replacing any existing filter of the same type.
+        '''
+        for existingFilter in list(handler.filters):
+            if (existingFilter.__class__ == newFilter.__class__):
+                existingFilter.close()
+                handler.removeFilter(existingFilter)
+
+        handler.addFilter(newFilter)
+
+    def _getLevelSampleRates(self, sampleRates: dict):
+        '''
+        Converts the given dict of LogLevel -> sample rate into a dict of logging level -> sample rate
+        '''
+        levelSampleRates = {}
+        for logLevel, sampleRate in sampleRates.items():
+            if (not (0.0 <= sampleRate <= 1.0)):
+                raise ValueError("Invalid sample rate given for log level {}: it must be between 0.0 and 1.0".format(logLevel))
+            levelSampleRates[self._getLoggerLevel(logLevel)] = sampleRate
+
+        return levelSampleRates
+
     def _getLoggerLevel(self, logLevel: LogLevel):
         '''
         Get the actual log level from the logging class, given the LogLevel type param
@@ -110,4 +222,218 @@ class CommonLogger:
             return logging.ERROR
 
         else:
-            raise TypeError("Invalid value given for parameter 'logLevel': it must be a value of the com.nwrobel.mypycommons.logger2.LogLevel enum class")
\ No newline at end of file
+            raise TypeError("Invalid value given for parameter 'logLevel': it must be a value of the com.nwrobel.mypycommons.logger2.LogLevel enum class")
+
+# the filters with a summary thread, whose last summaries are logged at process exit
+_openSuppressingFilters = set()
+_exitHandlerRegistered = False
+
+def _flushSuppressingFiltersAtExit():
+    for suppressingFilter in list(_openSuppressingFilters):
+        suppressingFilter.close()
+
+class SuppressingFilter(logging.Filter, abc.ABC):
+    '''
+    Base class for the handler filters that drop log records (rate limiting, duplicate suppression,
+    sampling). Keeps a count of the dropped records and logs a summary record of them through the
+    handler the filter is attached to once per summary interval: from a background thread (started
+    when the first record is dropped), so the summary is logged even if no more records come, and
+    at process exit for the records dropped since the last summary.
+    '''
+    SUMMARY_RECORD_ATTR = '_mypycommonsSuppressionSummary'
+
+    def __init__(self, handler: logging.Handler, summaryIntervalSeconds: float):
+        super().__init__()
+        self._handler = handler
+        self._summaryIntervalSeconds = summaryIntervalSeconds
+        self._lock = threading.Lock()
+        self._lastSummaryTime = time.monotonic()
+        self._summaryThread = None
+        self._closedEvent = threading.Event()
+
+    def filter(self, record):
+        if (getattr(record, self.SUMMARY_RECORD_ATTR, False)):
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            allowed = self._shouldLog(record, now)
+
+            summaryRecords = []
+            if ((now - self._lastSummaryTime) >= self._summaryIntervalSeconds):
+                summaryRecords = self._popSummaryRecords()
+                self._lastSummaryTime = now
+
+            if (not allowed and self._summaryThread is None and not self._closedEvent.is_set()):
+                self._startSummaryThread()
+
+        for summaryRecord in summaryRecords:
+            self._handler.handle(summaryRecord)
+
+        return allowed
+
+    def flushSummary(self):
+        '''
+        Logs the summary of any suppressed records right away.
+        '''
+        with self._lock:
+            summaryRecords = self._popSummaryRecords()
+            self._lastSummaryTime = time.monotonic()
+
+        for summaryRecord in summaryRecords:
+            self._handler.handle(summaryRecord)
+
+    def close(self):
+        '''
+        Stops the periodic summaries, logging the summary of any suppressed records first.
+        '''
+        self._closedEvent.set()
+        with self._lock:
+            summaryThread = self._summaryThread
+            self._summaryThread = None
+        if (summaryThread is not None and summaryThread is not threading.current_thread()):
+            summaryThread.join()
+
+        _openSuppressingFilters.discard(self)
+        self.flushSummary()
+
+    @abc.abstractmethod
+    def _shouldLog(self, record, now):
+        '''
+        Returns whether or not the given record is logged, counting it for the summary if not.
+        '''
+
+    @abc.abstractmethod
+    def _popSummaryRecords(self):
+        '''
+        Returns the list of summary records of the records suppressed since the last summary, and
+        resets the counts.
+        '''
+
+    def _startSummaryThread(self):
+        global _exitHandlerRegistered
+
+        if (not _exitHandlerRegistered):
+            import atexit
+
+            atexit.register(_flushSuppressingFiltersAtExit)
+            _exitHandlerRegistered = True
+
+        _openSuppressingFilters.add(self)
+        self._summaryThread = threading.Thread(target=self._logSummariesPeriodically, name='mypycommons-log-summaries', daemon=True)
+        self._summaryThread.start()
+
+    def _logSummariesPeriodically(self):
+        while (True):
+            with self._lock:
+                waitSeconds = self._lastSummaryTime + self._summaryIntervalSeconds - time.monotonic()
+            if (self._closedEvent.wait(max(0.0, waitSeconds))):
+                return
+
+            with self._lock:
+                if ((time.monotonic() - self._lastSummaryTime) < self._summaryIntervalSeconds):
+                    continue
+            self.flushSummary()
+
+    def _createSummaryRecord(self, name, level, message):
+        summaryRecord = logging.LogRecord(name=name, level=level, pathname=__file__, lineno=0, msg=message, args=None, exc_info=None, func=self.__class__.__name__)
+        setattr(summaryRecord, self.SUMMARY_RECORD_ATTR, True)
+        return summaryRecord
+
+class RateLimitFilter(SuppressingFilter):
+    '''
+    Handler filter allowing at most maxMessages log records per fixed time window of perSeconds.
+    '''
+    def __init__(self, handler: logging.Handler, maxMessages: int, perSeconds: float, summaryIntervalSeconds: float):
+        super().__init__(handler, summaryIntervalSeconds)
+        if (maxMessages < 1 or perSeconds <= 0):
+            raise ValueError("maxMessages must be at least 1 and perSeconds must be greater than 0")
+
+        self._maxMessages = maxMessages
+        self._perSeconds = perSeconds
+        self._windowStart = time.monotonic()
+        self._windowCount = 0
+        self._suppressedCount = 0
+        self._lastRecordName = ''
+
+    def _shouldLog(self, record, now):
+        if ((now - self._windowStart) >= self._perSeconds):
+            self._windowStart = now
+            self._windowCount = 0
+
+        if (self._windowCount < self._maxMessages):
+            self._windowCount += 1
+            return True
+
+        self._suppressedCount += 1
+        self._lastRecordName = record.name
+        return False
+
+    def _popSummaryRecords(self):
+        if (not self._suppressedCount):
+            return []
+
+        message = "Rate limit reached: {} log messages were suppressed (limit is {} per {}s)".format(self._suppressedCount, self._maxMessages, self._perSeconds)
+        self._suppressedCount = 0
+        return [self._createSummaryRecord(self._lastRecordName, logging.WARNING, message)]
+
+class DuplicateFilter(SuppressingFilter):
+    '''
+    Handler filter that drops repeats of an already logged message (same level and message text)
+    until the summary interval passes, keeping a count of the repeats per message.
+    '''
+    def __init__(self, handler: logging.Handler, summaryIntervalSeconds: float):
+        super().__init__(handler, summaryIntervalSeconds)
+        self._repeatCounts = {}
+
+    def _shouldLog(self, record, now):
+        messageKey = (record.name, record.levelno, record.getMessage())
+
+        if (messageKey in self._repeatCounts):
+            self._repeatCounts[messageKey] += 1
+            return False
+
+        self._repeatCounts[messageKey] = 0
+        return True
+
+    def _popSummaryRecords(self):
+        summaryRecords = []
+        for (name, levelno, message), repeatCount in self._repeatCounts.items():
+            if (repeatCount):
+                summaryMessage = "Previous message repeated {} more times: {}".format(repeatCount, message)
+                summaryRecords.append(self._createSummaryRecord(name, levelno, summaryMessage))
+
+        # the next occurrence of each message is logged again after the summary
+        self._repeatCounts = {}
+        return summaryRecords
+
+class SamplingFilter(SuppressingFilter):
+    '''
+    Handler filter that keeps only a random fraction of the log records, per logging level.
+    '''
+    def __init__(self, handler: logging.Handler, levelSampleRates: dict, summaryIntervalSeconds: float):
+        import random
+
+        super().__init__(handler, summaryIntervalSeconds)
+        self._levelSampleRates = levelSampleRates
+        self._droppedCounts = {}
+        self._lastRecordName = ''
+        self._random = random.Random()
+
+    def _shouldLog(self, record, now):
+        sampleRate = self._levelSampleRates.get(record.levelno, 1.0)
+        if (sampleRate >= 1.0 or self._random.random() < sampleRate):
+            return True
+
+        self._droppedCounts[record.levelno] = self._droppedCounts.get(record.levelno, 0) + 1
+        self._lastRecordName = record.name
+        return False
+
+    def _popSummaryRecords(self):
+        summaryRecords = []
+        for levelno, droppedCount in self._droppedCounts.items():
+            message = "Sampling dropped {} {} log messages (sample rate is {})".format(droppedCount, logging.getLevelName(levelno), self._levelSampleRates[levelno])
+            summaryRecords.append(self._createSummaryRecord(self._lastRecordName, levelno, message))
+
+        self._droppedCounts = {}
+        return summaryRecords
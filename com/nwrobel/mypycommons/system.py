@@ -4,8 +4,8 @@ com.nwrobel.system
 This module contains functionality related to operating systems and their operations.
 '''
 
-import socket
 import os
+import threading
 
 def thisMachineIsWindowsOS():
     '''
@@ -17,4 +17,343 @@ def thisMachineIsWindowsOS():
         return False
 
 def getThisMachineName():
-    return socket.gethostname()
\ No newline at end of file
+    import socket
+
+    return socket.gethostname()
+
+class ResourceSample:
+    '''
+    One sample of the resource usage of this process (and the load of the system), taken by a
+    ResourceSampler. Values that can't be read on this OS are None.
+
+    @attributes
+    timestamp: (float) epoch time the sample was taken at
+    phase: (str) the phase of the job set on the sampler when the sample was taken, or None
+    rssBytes: (int) resident memory of the process
+    cpuSeconds: (float) total user + system CPU time used by the process so far
+    cpuPercent: (float) CPU usage since the previous sample (100 is one fully used core)
+    readBytes, writtenBytes: (int) total bytes read and written by the process so far (all I/O
+        calls, including cached reads and sockets)
+    openFds: (int) number of open file descriptors of the process
+    loadAverage: (float) 1 minute load average of the system
+    '''
+    def __init__(self, timestamp, phase, rssBytes, cpuSeconds, cpuPercent, readBytes, writtenBytes, openFds, loadAverage):
+        self.timestamp = timestamp
+        self.phase = phase
+        self.rssBytes = rssBytes
+        self.cpuSeconds = cpuSeconds
+        self.cpuPercent = cpuPercent
+        self.readBytes = readBytes
+        self.writtenBytes = writtenBytes
+        self.openFds = openFds
+        self.loadAverage = loadAverage
+
+    def toDict(self) -> dict:
+        return dict(vars(self))
+
+class ResourceSampler:
+    '''
+    Samples the resource usage of this process (memory, CPU, I/O, open file descriptors) and the
+    system load on a background thread, keeping the latest samples in a fixed-size ring buffer. The
+    values are read directly from /proc, so this works (fully) on Linux only, and costs a few small
+    file reads per sample.
+
+    Samples are tagged with the current phase (see setPhase/phase), so summaries can be given per
+    phase of a job.
+
+    @example
+    with ResourceSampler(intervalSeconds=0.5) as sampler:
+        with sampler.phase('load'):
+            loadData()
+        with sampler.phase('process'):
+            processData()
+    sampler.logSummary(logger)
+    '''
+    def __init__(self, intervalSeconds: float = 1.0, maxSamples: int = 3600):
+        '''
+        @params
+        intervalSeconds: (optional) time between the samples
+        maxSamples: (optional) number of samples kept, older samples are dropped
+        '''
+        import collections
+
+        if (intervalSeconds <= 0):
+            raise ValueError("intervalSeconds must be greater than 0")
+
+        self.intervalSeconds = intervalSeconds
+        self._samples = collections.deque(maxlen=maxSamples)
+        self._samplesLock = threading.Lock()
+        self._phase = None
+        self._previousCpu = None
+        self._thread = None
+        self._stopEvent = None
+
+    def start(self):
+        '''
+        Starts sampling on a background thread (a first sample is taken right away). Does nothing if
+        the sampler is already running.
+        '''
+        if (self._thread is not None):
+            return self
+
+        self.sampleNow()
+        self._stopEvent = threading.Event()
+        self._thread = threading.Thread(target=self._sampleUntilStopped, args=(self._stopEvent,), name='mypycommons-resource-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        '''
+        Stops sampling, taking a last sample.
+        '''
+        if (self._thread is None):
+            return
+
+        self._stopEvent.set()
+        self._thread.join()
+        self._thread = None
+        self._stopEvent = None
+        self.sampleNow()
+
+    def isRunning(self) -> bool:
+        return (self._thread is not None)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+        return False
+
+    def setPhase(self, phase: str):
+        '''
+        Sets the phase of the job that the following samples are tagged with (None for no phase). If
+        the sampler is running, a sample is taken at the switch, so short phases get samples too.
+        '''
+        if (self._thread is not None):
+            self.sampleNow()
+        self._phase = phase
+        if (self._thread is not None):
+            self.sampleNow()
+
+    def phase(self, phase: str):
+        '''
+        Returns a context manager setting the given phase for the with block, and setting the previous
+        phase back after it.
+        '''
+        import contextlib
+
+        @contextlib.contextmanager
+        def phaseContext():
+            previousPhase = self._phase
+            self.setPhase(phase)
+            try:
+                yield self
+            finally:
+                self.setPhase(previousPhase)
+
+        return phaseContext()
+
+    def sampleNow(self) -> ResourceSample:
+        '''
+        Takes a sample right away, adds it to the samples and returns it.
+        '''
+        import time
+
+        timestamp = time.time()
+        monotonicTime = time.monotonic()
+        cpuSeconds = _getProcessCpuSeconds()
+        readBytes, writtenBytes = _getProcessIoBytes()
+
+        with self._samplesLock:
+            cpuPercent = None
+            if (self._previousCpu is not None and cpuSeconds is not None):
+                # monotonic times, so clock changes don't skew the interval
+                previousMonotonicTime, previousCpuSeconds = self._previousCpu
+                if (monotonicTime > previousMonotonicTime):
+                    cpuPercent = (cpuSeconds - previousCpuSeconds) / (monotonicTime - previousMonotonicTime) * 100
+            if (cpuSeconds is not None):
+                self._previousCpu = (monotonicTime, cpuSeconds)
+
+            sample = ResourceSample(timestamp, self._phase, _getProcessRssBytes(), cpuSeconds, cpuPercent, readBytes, writtenBytes,
+                                    _getProcessOpenFdCount(), _getSystemLoadAverage())
+            self._samples.append(sample)
+
+        return sample
+
+    def getSamples(self):
+        '''
+        Returns the list of the kept samples, oldest first.
+        '''
+        with self._samplesLock:
+            return list(self._samples)
+
+    def clearSamples(self):
+        with self._samplesLock:
+            self._samples.clear()
+
+    def getSummary(self) -> dict:
+        '''
+        Returns a summary of the kept samples: the sample count, the time covered, the mean and peak
+        (with the time of the peak) of the memory, CPU, open fds and load, and the bytes read and
+        written over the time covered. The summary of the samples of each phase is under "phases".
+        '''
+        samples = self.getSamples()
+        summary = _getResourceSamplesSummary(samples)
+
+        phaseSamples = {}
+        for sample in samples:
+            if (sample.phase is not None):
+                phaseSamples.setdefault(sample.phase, []).append(sample)
+        summary['phases'] = { phase: _getResourceSamplesSummary(samples) for phase, samples in phaseSamples.items() }
+
+        return summary
+
+    def getSummaryJson(self) -> str:
+        '''
+        Returns the summary of the kept samples (see getSummary) as a JSON string.
+        '''
+        import json
+
+        return json.dumps(self.getSummary(), indent=4, sort_keys=True)
+
+    def getSamplesJson(self) -> str:
+        '''
+        Returns the kept samples as a JSON string (a list of the sample values).
+        '''
+        import json
+
+        return json.dumps([sample.toDict() for sample in self.getSamples()], indent=4)
+
+    def logSummary(self, logger):
+        '''
+        Logs the summary of the kept samples (see getSummary) at info level: one line for all the
+        samples, then one line per phase.
+
+        @params
+        logger: the CommonLogger (or logging.Logger) to log the summary with
+        '''
+        from com.nwrobel import mypycommons
+        import com.nwrobel.mypycommons.logger
+
+        if (isinstance(logger, mypycommons.logger.CommonLogger)):
+            logger = logger.getLogger()
+
+        summary = self.getSummary()
+        logger.info(_formatResourceSummary('all', summary))
+        for phase, phaseSummary in summary['phases'].items():
+            logger.info(_formatResourceSummary(phase, phaseSummary))
+
+    def _sampleUntilStopped(self, stopEvent):
+        while (not stopEvent.wait(self.intervalSeconds)):
+            self.sampleNow()
+
+# -------------------------------- Private module helper functions ---------------------------------
+#
+def _readProcFile(filepath):
+    '''
+    Returns the content (bytes) of the given /proc file, or None if it can't be read.
+    '''
+    try:
+        fd = os.open(filepath, os.O_RDONLY)
+    except OSError:
+        return None
+
+    try:
+        return os.read(fd, 65536)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+def _getProcessRssBytes():
+    content = _readProcFile('/proc/self/status')
+    if (content is None):
+        return None
+
+    for line in content.splitlines():
+        if (line.startswith(b'VmRSS:')):
+            return int(line.split()[1]) * 1024
+    return None
+
+def _getProcessCpuSeconds():
+    content = _readProcFile('/proc/self/stat')
+    if (content is None):
+        processTimes = os.times()
+        return processTimes.user + processTimes.system
+
+    # the fields after the (parenthesized, possibly space containing) command name: utime and stime
+    # are the 14th and 15th fields of the whole line
+    fields = content[content.rindex(b')') + 2:].split()
+    return (int(fields[11]) + int(fields[12])) / _getClockTicksPerSecond()
+
+def _getClockTicksPerSecond():
+    try:
+        return os.sysconf('SC_CLK_TCK')
+    except (ValueError, OSError, AttributeError):
+        return 100
+
+def _getProcessIoBytes():
+    content = _readProcFile('/proc/self/io')
+    if (content is None):
+        return (None, None)
+
+    ioCounters = {}
+    for line in content.splitlines():
+        name, separator, value = line.partition(b':')
+        ioCounters[name] = int(value)
+    return (ioCounters.get(b'rchar'), ioCounters.get(b'wchar'))
+
+def _getProcessOpenFdCount():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return None
+
+def _getSystemLoadAverage():
+    content = _readProcFile('/proc/loadavg')
+    if (content is not None):
+        return float(content.split()[0])
+
+    try:
+        return os.getloadavg()[0]
+    except (OSError, AttributeError):
+        return None
+
+def _getResourceSamplesSummary(samples):
+    summary = {
+        'sampleCount': len(samples),
+        'startTime': samples[0].timestamp if (samples) else None,
+        'durationSeconds': (samples[-1].timestamp - samples[0].timestamp) if (samples) else 0.0
+    }
+
+    for name in ['rssBytes', 'cpuPercent', 'openFds', 'loadAverage']:
+        valueSamples = [sample for sample in samples if (getattr(sample, name) is not None)]
+        if (not valueSamples):
+            summary[name] = None
+            continue
+
+        peakSample = max(valueSamples, key=lambda sample: getattr(sample, name))
+        summary[name] = {
+            'mean': sum(getattr(sample, name) for sample in valueSamples) / len(valueSamples),
+            'peak': getattr(peakSample, name),
+            'peakTime': peakSample.timestamp
+        }
+
+    for name in ['readBytes', 'writtenBytes']:
+        values = [getattr(sample, name) for sample in samples if (getattr(sample, name) is not None)]
+        summary[name] = (values[-1] - values[0]) if (values) else None
+
+    return summary
+
+def _formatResourceSummary(label, summary):
+    def formatStat(name, valueFormat, divisor=1):
+        if (summary[name] is None):
+            return "n/a"
+        return "mean {} / peak {}".format(valueFormat.format(summary[name]['mean'] / divisor), valueFormat.format(summary[name]['peak'] / divisor))
+
+    return "Resources [{}]: samples={}, duration={:.1f}s, rss MiB={}, cpu %={}, fds={}, load={}, read={}B, written={}B".format(
+        label, summary['sampleCount'], summary['durationSeconds'], formatStat('rssBytes', '{:.1f}', 1024 * 1024),
+        formatStat('cpuPercent', '{:.1f}'), formatStat('openFds', '{:.0f}'), formatStat('loadAverage', '{:.2f}'),
+        summary['readBytes'], summary['writtenBytes']
+    )
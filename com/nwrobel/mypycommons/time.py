@@ -5,7 +5,21 @@ Module containing "common" functionality related to time and timestamp logic.
 '''
 
 from datetime import datetime, timedelta
-from pytimeparse.timeparse import timeparse
+from array import array
+from typing import List
+from time import perf_counter_ns
+import functools
+import threading
+
+_DISPLAY_FORMAT = "%Y-%m-%d %H:%M:%S"
+_DISPLAY_FORMAT_TEMPLATE = "%04d-%02d-%02d %02d:%02d:%02d"
+_numpyModule = None
+_numpyImportAttempted = False
+
+_timingEnabled = False
+_timingStats = {}
+_timingStatsLock = threading.Lock()
+_TIMING_MAX_SAMPLES = 10000
 
 def isValidTimestamp(timestamp):
     '''
@@ -14,6 +28,8 @@ def isValidTimestamp(timestamp):
     - After or equal to 1900-01-01 00:00:00
     - Less than or equal to the current date/time
 
+    Timestamps out of the range of datetime (or NaN) are not valid.
+
     @params
     timestamp: (int or float) the epoch timestamp
     '''
@@ -22,11 +38,41 @@ def isValidTimestamp(timestamp):
 
     lowerThresholdDatetime = datetime(year=1900, month=1, day=1)
     upperThresholdDatetime = datetime.now()
-    testValueDatetime = datetime.fromtimestamp(timestamp)
+    try:
+        testValueDatetime = datetime.fromtimestamp(timestamp)
+    except (OverflowError, OSError, ValueError):
+        return False
 
     isValid = (lowerThresholdDatetime <= testValueDatetime <= upperThresholdDatetime)
     return isValid
 
+def areValidTimestamps(timestamps):
+    '''
+    Batch version of isValidTimestamp: checks whether or not each of the given epoch timestamps
+    represents a valid time. The valid time bounds are computed once for the whole batch. Gives the
+    same results as isValidTimestamp, including False for timestamps out of the range of datetime.
+
+    Returns a numpy bool array if a numpy array is given, otherwise a list of bools. If numpy is
+    installed, it is used to speed up the checks for numpy arrays and array('d') arrays.
+
+    @params
+    timestamps: (list, iterable, array('d') or numpy array) the epoch timestamps to check
+    '''
+    lowerThresholdTimestamp, upperThresholdTimestamp = _getValidTimestampBounds()
+    numpy = _getNumpyModule()
+
+    if (numpy is not None):
+        if (isinstance(timestamps, numpy.ndarray)):
+            return (timestamps >= lowerThresholdTimestamp) & (timestamps <= upperThresholdTimestamp)
+        elif (isinstance(timestamps, array) and timestamps.typecode == 'd'):
+            timestampsArray = numpy.frombuffer(timestamps, dtype=numpy.float64)
+            return ((timestampsArray >= lowerThresholdTimestamp) & (timestampsArray <= upperThresholdTimestamp)).tolist()
+
+    return [
+        ((isinstance(timestamp, int) or isinstance(timestamp, float)) and (lowerThresholdTimestamp <= timestamp <= upperThresholdTimestamp))
+        for timestamp in timestamps
+    ]
+
 def convertDateTimeToTimestamp(dateTime: datetime) -> float:
     '''
     Converts a datetime object into an epoch timestamp (float)
@@ -38,7 +84,38 @@ def formatDatetimeForDisplay(datetime: datetime) -> str:
     Converts a datetime object into a human-readable string.
     Format is: YYYY-MM-DD HH-MM-SS (ex: "2012-01-27 02:29:33")
     ''' 
-    return datetime.strftime("%Y-%m-%d %H:%M:%S")
+    # Fast path: plain integer formatting gives the same result as strftime for 4 digit years,
+    # without the overhead of parsing the format string on every call
+    if (datetime.year >= 1000):
+        return _DISPLAY_FORMAT_TEMPLATE % (datetime.year, datetime.month, datetime.day, datetime.hour, datetime.minute, datetime.second)
+
+    return datetime.strftime(_DISPLAY_FORMAT)
+
+def formatDatetimesForDisplay(datetimes) -> List[str]:
+    '''
+    Converts each datetime object in the given list/iterable into a human-readable string, in the
+    same format as formatDatetimeForDisplay.
+
+    @params
+    datetimes: (list or iterable) the datetime objects to convert
+    '''
+    return [formatDatetimeForDisplay(dt) for dt in datetimes]
+
+def formatTimestampsForDisplay(timestamps) -> List[str]:
+    '''
+    Converts each of the given epoch timestamps into a human-readable string of the local time, in
+    the same format as formatDatetimeForDisplay (ex: "2012-01-27 02:29:33"). Fractional seconds
+    are dropped.
+
+    @params
+    timestamps: (list, iterable, array('d') or numpy array) the epoch timestamps to convert
+    '''
+    numpy = _getNumpyModule()
+    if (numpy is not None and isinstance(timestamps, numpy.ndarray)):
+        timestamps = timestamps.tolist()
+
+    fromtimestamp = datetime.fromtimestamp
+    return [formatDatetimeForDisplay(fromtimestamp(timestamp)) for timestamp in timestamps]
 
 def getDateTimeFromFormattedTime(formattedTime: str) -> datetime:
     '''
@@ -48,13 +125,36 @@ def getDateTimeFromFormattedTime(formattedTime: str) -> datetime:
     @params
     formattedTime: (str) the pretty formatted time string to convert
     '''
-    dateTime = datetime.strptime(formattedTime, "%Y-%m-%d %H:%M:%S")
+    # Fast path: strings of exactly the expected shape are handed to the (C implemented) ISO format
+    # parser, anything else (or invalid field values) goes through strptime so the results and errors
+    # are the same as before
+    if (len(formattedTime) == 19 and formattedTime[4] == '-' and formattedTime[7] == '-' and formattedTime[10] == ' ' 
+            and formattedTime[13] == ':' and formattedTime[16] == ':'
+            and (formattedTime[0:4] + formattedTime[5:7] + formattedTime[8:10] + formattedTime[11:13] + formattedTime[14:16] + formattedTime[17:19]).isdigit()):
+        try:
+            return datetime.fromisoformat(formattedTime)
+        except ValueError:
+            pass
+
+    dateTime = datetime.strptime(formattedTime, _DISPLAY_FORMAT)
     return dateTime
 
+def getDateTimesFromFormattedTimes(formattedTimes) -> List[datetime]:
+    '''
+    Converts each formatted time string in the given list/iterable into a datetime, in the same
+    way as getDateTimeFromFormattedTime.
+
+    @params
+    formattedTimes: (list or iterable) the pretty formatted time strings to convert
+    '''
+    return [getDateTimeFromFormattedTime(formattedTime) for formattedTime in formattedTimes]
+
 def getTimedeltaFromFormattedDuration(formattedTime: str) -> timedelta:
     '''
     Given a duration formatted like "0:03:01" create a timedelta object
     '''
+    from pytimeparse.timeparse import timeparse
+
     seconds = timeparse(formattedTime)
     return timedelta(seconds=seconds)
 
@@ -84,12 +184,38 @@ def applyDeltaSecondsToTimestamp(startTimestamp, seconds):
     startTimestamp: (int or float) the starting epoch timestamp
     seconds: (int) number of seconds time to add
     '''
-    startDt = datetime.fromtimestamp(startTimestamp)
-    newDt = startDt + datetime.timedelta(seconds=seconds)
-    newTimestamp = datetime.timestamp(newDt)
-
+    # epoch timestamps are in seconds already, so no datetime conversion is needed
+    newTimestamp = startTimestamp + seconds
     return newTimestamp
 
+def applyDeltaSecondsToTimestamps(startTimestamps, seconds):
+    '''
+    Batch version of applyDeltaSecondsToTimestamp: adds the given number of seconds to each of the
+    given epoch timestamps. 
+
+    Returns the same kind of container that was given for numpy arrays and array('d') arrays, 
+    otherwise a list. If numpy is installed, it is used to speed up the shift for these arrays.
+
+    @params
+    startTimestamps: (list, iterable, array('d') or numpy array) the starting epoch timestamps
+    seconds: (int or float) number of seconds time to add (negative to subtract)
+    '''
+    numpy = _getNumpyModule()
+
+    if (isinstance(startTimestamps, array) and startTimestamps.typecode == 'd'):
+        if (numpy is not None):
+            shiftedArray = numpy.frombuffer(startTimestamps, dtype=numpy.float64) + seconds
+            newTimestamps = array('d')
+            newTimestamps.frombytes(shiftedArray.tobytes())
+            return newTimestamps
+        else:
+            return array('d', [timestamp + seconds for timestamp in startTimestamps])
+
+    if (numpy is not None and isinstance(startTimestamps, numpy.ndarray)):
+        return startTimestamps + seconds
+
+    return [timestamp + seconds for timestamp in startTimestamps]
+
 def convertDurationToTimestamp(seconds):
     '''
     Converts the given duration, represented in seconds, into the duration represented as epoch 
@@ -147,7 +273,270 @@ def getCurrentTimestampForFilename():
     timeFilename = "{}".format(timeFmt)
     return timeFilename
 
+class Stopwatch:
+    '''
+    Measures elapsed time with the monotonic, high resolution perf_counter_ns clock (not affected
+    by system clock changes), for timing hot code paths. Can be used as a context manager. 
+
+    If a label is given, each measured interval is also recorded in the timing stats for that label
+    when timing is enabled (see enableTiming and getTimingStats).
+    '''
+    def __init__(self, label: str = None):
+        self.label = label
+        self._startNs = None
+        self._elapsedNs = 0
 
+    def start(self):
+        '''
+        Starts (or restarts) the stopwatch.
+        '''
+        self._startNs = perf_counter_ns()
+        return self
 
+    def stop(self) -> int:
+        '''
+        Stops the stopwatch and returns the elapsed time of the interval in nanoseconds.
+        '''
+        if (self._startNs is None):
+            raise RuntimeError("Stopwatch was stopped without being started")
 
-    
+        self._elapsedNs = perf_counter_ns() - self._startNs
+        self._startNs = None
+
+        if (self.label is not None and _timingEnabled):
+            _recordTiming(self.label, self._elapsedNs)
+
+        return self._elapsedNs
+
+    @property
+    def elapsedNanoseconds(self) -> int:
+        '''
+        Elapsed time in nanoseconds: the time since start if running, otherwise of the last interval.
+        '''
+        if (self._startNs is not None):
+            return perf_counter_ns() - self._startNs
+        return self._elapsedNs
+
+    @property
+    def elapsedSeconds(self) -> float:
+        '''
+        Elapsed time in seconds: the time since start if running, otherwise of the last interval.
+        '''
+        return self.elapsedNanoseconds / 1e9
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+        return False
+
+class _Timed:
+    '''
+    Object returned by timed(): records the time taken by a with block or a decorated function.
+    '''
+    def __init__(self, label: str):
+        self.label = label
+        self._startNs = None
+
+    def __enter__(self):
+        self._startNs = perf_counter_ns()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        _recordTiming(self.label, perf_counter_ns() - self._startNs)
+        return False
+
+    def __call__(self, func):
+        label = self.label
+
+        @functools.wraps(func)
+        def timedWrapper(*args, **kwargs):
+            if (not _timingEnabled):
+                return func(*args, **kwargs)
+
+            startNs = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _recordTiming(label, perf_counter_ns() - startNs)
+
+        return timedWrapper
+
+class _DisabledTimed:
+    '''
+    Object returned by timed() while timing is disabled: the with block is not timed, but it can
+    still be used as a decorator, since the decorated function checks whether timing is enabled on
+    each call.
+    '''
+    def __init__(self, label: str):
+        self.label = label
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+    def __call__(self, func):
+        return _Timed(self.label)(func)
+
+def timed(label: str):
+    '''
+    Records the time taken by a block of code or a function under the given label, when timing is
+    enabled (see enableTiming). While timing is disabled this costs only a flag check.
+
+    @params
+    label: (str) name to record the timings under, in the timing stats
+
+    @example
+    with mypycommons.time.timed('parse'):
+        parseLines(lines)
+
+    @mypycommons.time.timed('load')
+    def loadData(): ...
+    '''
+    if (not _timingEnabled):
+        return _DisabledTimed(label)
+    return _Timed(label)
+
+def enableTiming():
+    '''
+    Enables recording of timings from timed() blocks/functions and labeled Stopwatches.
+    '''
+    global _timingEnabled
+    _timingEnabled = True
+
+def disableTiming():
+    '''
+    Disables recording of timings. Already recorded stats are kept.
+    '''
+    global _timingEnabled
+    _timingEnabled = False
+
+def isTimingEnabled() -> bool:
+    '''
+    Returns whether or not recording of timings is enabled.
+    '''
+    return _timingEnabled
+
+def resetTimingStats():
+    '''
+    Removes all the recorded timing stats.
+    '''
+    global _timingStats
+    with _timingStatsLock:
+        _timingStats = {}
+
+def getTimingStats() -> dict:
+    '''
+    Returns the recorded timing stats, as a dict of label -> dict of stats for that label: count,
+    totalSeconds, meanSeconds, p50Seconds, p95Seconds and maxSeconds. Percentiles are computed from
+    a random sample of at most 10000 timings per label.
+    '''
+    with _timingStatsLock:
+        statsSnapshot = {label: (stat['count'], stat['totalNs'], stat['maxNs'], list(stat['samples'])) for label, stat in _timingStats.items()}
+
+    report = {}
+    for label, (count, totalNs, maxNs, samples) in statsSnapshot.items():
+        samples.sort()
+        report[label] = {
+            'count': count,
+            'totalSeconds': totalNs / 1e9,
+            'meanSeconds': (totalNs / count) / 1e9,
+            'p50Seconds': _getPercentile(samples, 50) / 1e9,
+            'p95Seconds': _getPercentile(samples, 95) / 1e9,
+            'maxSeconds': maxNs / 1e9
+        }
+
+    return report
+
+def getTimingStatsJson() -> str:
+    '''
+    Returns the recorded timing stats (see getTimingStats) as a JSON string.
+    '''
+    import json
+
+    return json.dumps(getTimingStats(), indent=4, sort_keys=True)
+
+def logTimingStats(logger):
+    '''
+    Logs the recorded timing stats (see getTimingStats) at info level, one line per label, sorted by
+    the total time taken.
+
+    @params
+    logger: the CommonLogger (or logging.Logger) to log the stats with
+    '''
+    from com.nwrobel import mypycommons
+    import com.nwrobel.mypycommons.logger
+
+    if (isinstance(logger, mypycommons.logger.CommonLogger)):
+        logger = logger.getLogger()
+
+    timingStats = getTimingStats()
+    for label, stats in sorted(timingStats.items(), key=lambda item: item[1]['totalSeconds'], reverse=True):
+        logger.info("Timing [{}]: count={}, total={:.6f}s, mean={:.6f}s, p50={:.6f}s, p95={:.6f}s, max={:.6f}s".format(
+            label, stats['count'], stats['totalSeconds'], stats['meanSeconds'], stats['p50Seconds'], stats['p95Seconds'], stats['maxSeconds']
+        ))
+
+# -------------------------------- Private module helper functions ---------------------------------
+#
+def _getValidTimestampBounds():
+    '''
+    Returns the (lower, upper) epoch timestamp bounds used to check for valid timestamps: see
+    isValidTimestamp.
+    '''
+    lowerThresholdTimestamp = convertDateTimeToTimestamp(datetime(year=1900, month=1, day=1))
+    upperThresholdTimestamp = getCurrentTimestamp()
+    return (lowerThresholdTimestamp, upperThresholdTimestamp)
+
+def _getNumpyModule():
+    '''
+    Returns the numpy module if it is installed, otherwise None. Numpy is an optional dependency
+    used only to speed up the batch timestamp functions.
+    '''
+    global _numpyModule, _numpyImportAttempted
+
+    if (not _numpyImportAttempted):
+        _numpyImportAttempted = True
+        try:
+            import numpy
+            _numpyModule = numpy
+        except ImportError:
+            _numpyModule = None
+
+    return _numpyModule
+
+def _recordTiming(label, elapsedNs):
+    '''
+    Adds the given elapsed time to the timing stats of the label. Keeps a random sample (reservoir)
+    of the timings for computing percentiles, so memory use stays bounded.
+    '''
+    with _timingStatsLock:
+        stat = _timingStats.get(label)
+        if (stat is None):
+            stat = {'count': 0, 'totalNs': 0, 'maxNs': 0, 'samples': []}
+            _timingStats[label] = stat
+
+        stat['count'] += 1
+        stat['totalNs'] += elapsedNs
+        if (elapsedNs > stat['maxNs']):
+            stat['maxNs'] = elapsedNs
+
+        if (len(stat['samples']) < _TIMING_MAX_SAMPLES):
+            stat['samples'].append(elapsedNs)
+        else:
+            import random
+            sampleIndex = random.randrange(stat['count'])
+            if (sampleIndex < _TIMING_MAX_SAMPLES):
+                stat['samples'][sampleIndex] = elapsedNs
+
+def _getPercentile(sortedValues, percent):
+    '''
+    Returns the nearest-rank percentile of the given sorted list of values.
+    '''
+    if (not sortedValues):
+        return 0
+
+    rank = max(1, -(-len(sortedValues) * percent // 100))
+    return sortedValues[int(rank) - 1]
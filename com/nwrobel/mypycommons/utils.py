@@ -2,7 +2,9 @@
 This module contains functionality for things that fall under no simple category: general 'utils'.
 '''
 
-from typing import List
+import os
+from typing import List, Callable, Iterable
+from collections import Counter, OrderedDict
 
 def stringStartsWith(inputString, startsWith):
     '''
@@ -47,5 +49,605 @@ def getListDupes(inputList):
     '''
     Returns a set of the items in the list that are duplicates
     '''
-    return set([x for x in inputList if inputList.count(x) > 1])
+    try:
+        itemCounts = Counter(inputList)
+    except TypeError:
+        # unhashable items can't be counted: compare them one by one (slow), as before
+        return set([x for x in inputList if inputList.count(x) > 1])
 
+    return set([x for x, count in itemCounts.items() if count > 1])
+
+def getDuplicateCounts(items: Iterable, keyFunc: Callable = None) -> dict:
+    '''
+    Finds the duplicates in the given items in a single pass, and returns a dict of each duplicated
+    item (or key) -> the number of times it occurs. Only items occurring more than once are returned,
+    in the order they first occur.
+
+    @params
+    items: (list or any iterable, including generators) the items to find duplicates in. Items (or
+        their keys) must be hashable
+    keyFunc: (optional) function called on each item to get the value to compare items by, ex:
+        mypycommons.file.getFilename to find files with the same name in a list of paths
+    '''
+    if (keyFunc is not None):
+        items = map(keyFunc, items)
+
+    itemCounts = Counter(items)
+    return {key: count for key, count in itemCounts.items() if count > 1}
+
+def getDuplicateIndexes(items: Iterable, keyFunc: Callable = None) -> dict:
+    '''
+    Finds the duplicates in the given items in a single pass, and returns a dict of each duplicated
+    item (or key) -> the list of the (0-based) positions it occurs at. Only items occurring more than
+    once are returned, in the order they first occur.
+
+    @params
+    items: (list or any iterable, including generators) the items to find duplicates in. Items (or
+        their keys) must be hashable
+    keyFunc: (optional) function called on each item to get the value to compare items by
+    '''
+    if (keyFunc is not None):
+        items = map(keyFunc, items)
+
+    keyIndexes = {}
+    for index, key in enumerate(items):
+        indexes = keyIndexes.get(key)
+        if (indexes is None):
+            keyIndexes[key] = [index]
+        else:
+            indexes.append(index)
+
+    return {key: indexes for key, indexes in keyIndexes.items() if len(indexes) > 1}
+
+def getDuplicatesByKey(items: Iterable, keyFunc: Callable) -> dict:
+    '''
+    Groups the given items by the key computed for each one in a single pass, and returns a dict of
+    each key shared by more than one item -> the list of those items, in the order they first occur.
+
+    @params
+    items: (list or any iterable, including generators) the items to find duplicates in
+    keyFunc: function called on each item to get the (hashable) value to compare items by, ex:
+        mypycommons.file.getFileSizeBytes to find files of the same size in a list of paths
+
+    @example
+    getDuplicatesByKey(["/a/x.txt", "/b/x.txt", "/b/y.txt"], mypycommons.file.getFilename) 
+        --> { "x.txt": ["/a/x.txt", "/b/x.txt"] }
+    '''
+    keyItems = {}
+    for item in items:
+        key = keyFunc(item)
+        groupItems = keyItems.get(key)
+        if (groupItems is None):
+            keyItems[key] = [item]
+        else:
+            groupItems.append(item)
+
+    return {key: groupItems for key, groupItems in keyItems.items() if len(groupItems) > 1}
+
+
+def memoize(maxSize: int = 1024, ttlSeconds: float = None, diskCacheFilepath: str = None, maxDiskEntries: int = 100000,
+            fileDependencyArgs: List = None):
+    '''
+    Decorator caching the results of the decorated function, keyed on its argument values, so that
+    calls with the same arguments return the cached result instead of recomputing it. Results are
+    kept in an in-memory LRU cache, and optionally also in a persistent on-disk cache (a SQLite 
+    database file) that is shared across process runs.
+
+    The decorated function gets two extra methods: getCacheStats() returning a dict of the hit/miss
+    counts (for tuning the cache sizes: memoryEvictions and diskEvictions count the results dropped
+    to stay within maxSize and maxDiskEntries), and clearCache() removing all its cached results
+    (memory and disk). Exceptions raised by the function are not cached.
+
+    @params
+    maxSize: (optional) max number of results kept in memory, the least recently used are evicted
+    ttlSeconds: (optional) max age of a cached result in seconds, older results are recomputed. 
+        Default is no expiry
+    diskCacheFilepath: (optional) path of the SQLite database file for the on-disk cache. Several 
+        functions can share the same file. Results must be picklable to be cached on disk
+    maxDiskEntries: (optional) max number of results of this function kept in the on-disk cache,
+        the least recently used are evicted
+    fileDependencyArgs: (optional) list of the names of arguments that are filepaths the result
+        depends on: a cached result is recomputed when the size or modified time of any of those
+        files changed
+
+    @notes
+    Arguments are matched to the function parameters (with defaults filled in), so f(1) and f(x=1)
+    share a cached result. Arguments are compared by their pickled data, so equal arguments that
+    pickle differently (like dicts with keys in a different order) are cached separately. Sets and
+    frozensets (also inside tuples, lists and dicts) are compared by their sorted items, as their
+    pickled data changes from one process to the next. Calls with arguments that can't be pickled
+    (like locks) are not cached: the function is just called, and the call is counted in the
+    uncacheableCalls stat. Calls with sets of items that can't be sorted are cached in memory only
+    (and counted in the uncacheableCalls stat too, when there is a disk cache).
+
+    @example
+    @memoize(diskCacheFilepath="~/.cache/line-counts.sqlite", fileDependencyArgs=["filepath"])
+    def getLineCount(filepath):
+        return mypycommons.file.getFileLineCount(filepath)
+    '''
+    def decorator(func):
+        import functools
+
+        cache = _MemoizeCache(func, maxSize, ttlSeconds, diskCacheFilepath, maxDiskEntries, fileDependencyArgs or [])
+
+        @functools.wraps(func)
+        def memoizedFunc(*args, **kwargs):
+            cacheKey, fileStamps, isStableKey = cache.getCacheKey(args, kwargs)
+            if (cacheKey is None):
+                cache.countUncacheableCall()
+                return func(*args, **kwargs)
+            if (not isStableKey and diskCacheFilepath):
+                cache.countUncacheableCall()
+
+            result = cache.get(cacheKey, fileStamps, useDisk=isStableKey)
+            if (result is _NOT_CACHED):
+                result = func(*args, **kwargs)
+                cache.put(cacheKey, result, fileStamps, useDisk=isStableKey)
+
+            return result
+
+        memoizedFunc.getCacheStats = cache.getStats
+        memoizedFunc.clearCache = cache.clear
+        return memoizedFunc
+
+    return decorator
+
+class ParallelMapItemError(Exception):
+    '''
+    Given by parallelMap (with captureErrors) in place of the result of an item whose function call
+    raised an exception.
+
+    @attributes
+    item: the input item
+    exception: the exception raised for the item
+    tracebackText: the formatted traceback of the exception (from the worker)
+    '''
+    def __init__(self, item, exception, tracebackText):
+        super().__init__("{!r} raised {}: {}".format(item, type(exception).__name__, exception))
+        self.item = item
+        self.exception = exception
+        self.tracebackText = tracebackText
+
+def parallelMap(func: Callable, items: Iterable, numWorkers: int = None, useThreads: bool = False, ordered: bool = True, 
+                chunkSize: int = None, maxPendingChunks: int = None, captureErrors: bool = False, progressBar=None):
+    '''
+    Calls the function on each of the given items in parallel, in a process pool (or a thread pool
+    for I/O bound functions), and yields the results as a generator.
+
+    Items are sent to the workers in chunks, to amortize the cost of sending work to a process. By
+    default the chunk size is tuned automatically, from how long the items of the completed chunks 
+    took (aiming for about 0.1s of work per chunk), and kept small enough that all the workers get
+    work. Only maxPendingChunks chunks are submitted at a time, so memory use stays bounded even for
+    a huge generator of items.
+
+    @params
+    func: the function to call on each item. With processes, it must be a module-level (picklable)
+        function, and the items and results must be picklable
+    items: (list or any iterable, including generators) the items to call the function on
+    numWorkers: (optional) number of processes/threads, default is based on the CPU count
+    useThreads: (optional) use a thread pool instead of a process pool, for I/O bound functions
+    ordered: (optional) if True, results are given in the order of the items. If False, (item, 
+        result) tuples are given as soon as each chunk completes
+    chunkSize: (optional) fixed number of items per chunk, instead of tuning it automatically
+    maxPendingChunks: (optional) max number of chunks submitted and not yet given, default is twice
+        the number of workers
+    captureErrors: (optional) if True, an item whose function call raises gets a ParallelMapItemError
+        in place of its result, and the other items carry on (with processes, an exception that 
+        can't be unpickled is given as a RuntimeError with its type name and message). If False, the
+        first exception is raised and the remaining items are cancelled
+    progressBar: (optional) a display.ProgressBar updated as items complete, or True to create one
+        (the items must have a length then)
+
+    @example
+    filepaths = mypycommons.file.getChildPathsRecursive(rootDir, pathType='file')
+    for filepath, lineCount in parallelMap(mypycommons.file.getFileLineCount, filepaths, ordered=False):
+        ...
+    '''
+    import itertools
+    import collections
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+    try:
+        numItems = len(items)
+    except TypeError:
+        numItems = None
+
+    createdProgressBar = (progressBar is True)
+    if (createdProgressBar):
+        from com.nwrobel import mypycommons
+        import com.nwrobel.mypycommons.display
+
+        if (numItems is None):
+            raise ValueError("A progress bar can only be created for items with a length, pass a ProgressBar instead")
+        progressBar = mypycommons.display.ProgressBar(max(numItems, 1), prefix='Progress')
+
+    if (useThreads):
+        numWorkers = numWorkers or min(32, (os.cpu_count() or 1) + 4)
+        executor = ThreadPoolExecutor(max_workers=numWorkers)
+    else:
+        numWorkers = numWorkers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=numWorkers)
+
+    maxPendingChunks = maxPendingChunks or (numWorkers * 2)
+    chunkSizer = _ParallelMapChunkSizer(chunkSize, numItems, numWorkers)
+    itemsIterator = iter(items)
+    # ordered: chunks in submit order; unordered: any order (the done ones are taken out by wait)
+    pendingChunks = collections.deque()
+
+    def submitChunks():
+        while (len(pendingChunks) < maxPendingChunks):
+            chunkItems = list(itertools.islice(itemsIterator, chunkSizer.getChunkSize()))
+            if (not chunkItems):
+                return
+
+            chunkFuture = executor.submit(_runParallelMapChunk, func, chunkItems, captureErrors, not useThreads)
+            if (progressBar is not None):
+                chunkFuture.add_done_callback(lambda doneFuture, count=len(chunkItems): progressBar.update(count))
+            pendingChunks.append((chunkItems, chunkFuture))
+
+    def getChunkResults(chunkItems, chunkFuture):
+        chunkResults, chunkSeconds = chunkFuture.result()
+        chunkSizer.addChunkTiming(len(chunkItems), chunkSeconds)
+
+        for item, (succeeded, result) in zip(chunkItems, chunkResults):
+            if (not succeeded):
+                result = ParallelMapItemError(item, result[0], result[1])
+            yield (item, result)
+
+    try:
+        submitChunks()
+        while (pendingChunks):
+            if (ordered):
+                chunkItems, chunkFuture = pendingChunks.popleft()
+                for item, result in getChunkResults(chunkItems, chunkFuture):
+                    yield result
+            else:
+                doneFutures, notDoneFutures = wait([chunkFuture for chunkItems, chunkFuture in pendingChunks], return_when=FIRST_COMPLETED)
+                doneChunks = [pendingChunk for pendingChunk in pendingChunks if (pendingChunk[1] in doneFutures)]
+                for doneChunk in doneChunks:
+                    pendingChunks.remove(doneChunk)
+                for chunkItems, chunkFuture in doneChunks:
+                    yield from getChunkResults(chunkItems, chunkFuture)
+
+            submitChunks()
+    finally:
+        # when the caller stops early or an item raised, don't run the rest of the submitted chunks
+        for chunkItems, chunkFuture in pendingChunks:
+            chunkFuture.cancel()
+        executor.shutdown(wait=True)
+
+        if (createdProgressBar):
+            progressBar.finish()
+
+# -------------------------------- Private module helper functions ---------------------------------
+#
+# marks a cache lookup that found no (valid) cached result, since None can be a cached result
+_NOT_CACHED = object()
+
+class _SetCacheKey:
+    '''
+    Marks a set (or frozenset) turned into a tuple of its sorted items in a memoize cache key.
+    '''
+
+def _getStableCacheKeyValue(value):
+    '''
+    Returns the given memoize argument value with its sets and frozensets (also inside tuples, lists
+    and dicts) replaced by tuples of their sorted items, so it pickles to the same data in every
+    process (the iteration order of sets depends on the hash seed of the process). Raises TypeError
+    if the items of a set can't be sorted.
+    '''
+    if (isinstance(value, (set, frozenset))):
+        return (_SetCacheKey, type(value).__name__, tuple(sorted(_getStableCacheKeyValue(item) for item in value)))
+    elif (type(value) is tuple):
+        return tuple(_getStableCacheKeyValue(item) for item in value)
+    elif (type(value) is list):
+        return [_getStableCacheKeyValue(item) for item in value]
+    elif (type(value) is dict):
+        return { _getStableCacheKeyValue(key): _getStableCacheKeyValue(item) for key, item in value.items() }
+    return value
+
+class _MemoizeCache:
+    '''
+    The memory (LRU) and disk (SQLite) caches of one function decorated with memoize. Thread safe.
+    '''
+    def __init__(self, func, maxSize, ttlSeconds, diskCacheFilepath, maxDiskEntries, fileDependencyArgs):
+        import threading
+        import inspect
+
+        self._functionName = "{}.{}".format(func.__module__, func.__qualname__)
+        self._maxSize = maxSize
+        self._ttlSeconds = ttlSeconds
+        self._diskCacheFilepath = os.path.expanduser(diskCacheFilepath) if (diskCacheFilepath) else None
+        self._maxDiskEntries = maxDiskEntries
+        self._memoryEntries = OrderedDict()
+        self._lock = threading.RLock()
+        self._diskConnection = None
+        self._diskConnectionPid = None
+        self._diskEntryCount = None
+        self._stats = { 'memoryHits': 0, 'diskHits': 0, 'misses': 0, 'expirations': 0, 'invalidations': 0, 'memoryEvictions': 0,
+                        'diskEvictions': 0, 'uncacheableCalls': 0 }
+
+        self._signature = inspect.signature(func)
+        for argName in fileDependencyArgs:
+            if (argName not in self._signature.parameters):
+                raise ValueError("The function {} has no argument named {}".format(self._functionName, argName))
+        self._fileDependencyArgs = fileDependencyArgs
+
+    def getCacheKey(self, args, kwargs):
+        '''
+        Returns the cache key for the given call arguments, the (size, modified time) of each of its
+        file dependencies (None for a missing file), and whether or not the key is the same in every
+        process (so it can be used for the disk cache). The arguments are bound to the function
+        signature first, so f(1), f(x=1) and f(1, default) get the same key. Returns (None, None, False)
+        if the arguments can't be pickled.
+        '''
+        import pickle
+
+        boundArgs = self._signature.bind(*args, **kwargs)
+        boundArgs.apply_defaults()
+        keyArguments = tuple(boundArgs.arguments.items())
+        try:
+            keyArguments = _getStableCacheKeyValue(keyArguments)
+            isStableKey = True
+        except TypeError:
+            isStableKey = False
+
+        try:
+            cacheKey = pickle.dumps(keyArguments, protocol=4)
+        except Exception:
+            return (None, None, False)
+
+        fileStamps = []
+        for argName in self._fileDependencyArgs:
+            try:
+                fileStat = os.stat(boundArgs.arguments[argName])
+                fileStamps.append((fileStat.st_size, fileStat.st_mtime_ns))
+            except (OSError, TypeError, ValueError):
+                fileStamps.append(None)
+
+        return (cacheKey, tuple(fileStamps), isStableKey)
+
+    def countUncacheableCall(self):
+        with self._lock:
+            self._stats['uncacheableCalls'] += 1
+
+    def get(self, cacheKey, fileStamps, useDisk=True):
+        import time
+
+        now = time.time()
+        invalidReason = None
+        with self._lock:
+            memoryEntry = self._memoryEntries.get(cacheKey)
+            if (memoryEntry is not None):
+                result, entryFileStamps, createdTime = memoryEntry
+                invalidReason = self._getEntryInvalidReason(entryFileStamps, createdTime, fileStamps, now)
+                if (invalidReason is None):
+                    self._memoryEntries.move_to_end(cacheKey)
+                    self._stats['memoryHits'] += 1
+                    return result
+                del self._memoryEntries[cacheKey]
+
+            if (self._diskCacheFilepath and useDisk):
+                result, diskInvalidReason = self._getFromDisk(cacheKey, fileStamps, now)
+                if (result is not _NOT_CACHED):
+                    return result
+                invalidReason = invalidReason or diskInvalidReason
+
+            # a stale entry found in both tiers is counted once
+            if (invalidReason is not None):
+                self._stats[invalidReason] += 1
+            self._stats['misses'] += 1
+            return _NOT_CACHED
+
+    def put(self, cacheKey, result, fileStamps, useDisk=True):
+        import time
+
+        now = time.time()
+        with self._lock:
+            self._putInMemory(cacheKey, (result, fileStamps, now))
+            if (self._diskCacheFilepath and useDisk):
+                self._putOnDisk(cacheKey, result, fileStamps, now)
+
+    def clear(self):
+        with self._lock:
+            self._memoryEntries.clear()
+            if (self._diskCacheFilepath):
+                diskConnection = self._getDiskConnection()
+                with diskConnection:
+                    diskConnection.execute("DELETE FROM memoize_cache WHERE function_name = ?", (self._functionName,))
+                self._diskEntryCount = 0
+
+            for statName in self._stats:
+                self._stats[statName] = 0
+
+    def getStats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memoryEntries'] = len(self._memoryEntries)
+            if (self._diskCacheFilepath):
+                self._diskEntryCount = None
+                stats['diskEntries'] = self._getDiskEntryCount()
+
+        lookups = stats['memoryHits'] + stats['diskHits'] + stats['misses']
+        stats['hitRatio'] = ((stats['memoryHits'] + stats['diskHits']) / lookups) if (lookups) else 0.0
+        return stats
+
+    def _getEntryInvalidReason(self, entryFileStamps, createdTime, fileStamps, now):
+        '''
+        Returns None if the cached entry can be used, otherwise the name of the stat counting why not.
+        '''
+        if (self._ttlSeconds is not None and (now - createdTime) > self._ttlSeconds):
+            return 'expirations'
+        if (entryFileStamps != fileStamps):
+            return 'invalidations'
+        return None
+
+    def _putInMemory(self, cacheKey, memoryEntry):
+        self._memoryEntries[cacheKey] = memoryEntry
+        self._memoryEntries.move_to_end(cacheKey)
+        while (len(self._memoryEntries) > self._maxSize):
+            self._memoryEntries.popitem(last=False)
+            self._stats['memoryEvictions'] += 1
+
+    def _getDiskConnection(self):
+        '''
+        Returns the connection to the disk cache database, (re)connecting on first use and after a
+        fork (a SQLite connection can't be shared with a child process).
+        '''
+        import sqlite3
+
+        if (self._diskConnection is None or self._diskConnectionPid != os.getpid()):
+            parentDir = os.path.dirname(os.path.abspath(self._diskCacheFilepath))
+            os.makedirs(parentDir, exist_ok=True)
+
+            self._diskConnection = sqlite3.connect(self._diskCacheFilepath, timeout=30, check_same_thread=False)
+            self._diskConnection.execute("PRAGMA journal_mode=WAL")
+            self._diskConnection.execute("PRAGMA synchronous=NORMAL")
+            with self._diskConnection:
+                self._diskConnection.execute('''
+                    CREATE TABLE IF NOT EXISTS memoize_cache (
+                        function_name TEXT NOT NULL, cache_key TEXT NOT NULL, result BLOB NOT NULL, file_stamps TEXT NOT NULL,
+                        created_time REAL NOT NULL, access_time REAL NOT NULL, PRIMARY KEY (function_name, cache_key))''')
+                self._diskConnection.execute("CREATE INDEX IF NOT EXISTS memoize_cache_access ON memoize_cache (function_name, access_time)")
+            self._diskConnectionPid = os.getpid()
+            self._diskEntryCount = None
+
+        return self._diskConnection
+
+    def _getDiskEntryCount(self):
+        '''
+        Returns the number of disk cache entries of this function. The count is kept up to date in
+        memory between queries, counting replaced entries as added, so it can be a bit high.
+        '''
+        if (self._diskEntryCount is None):
+            diskConnection = self._getDiskConnection()
+            self._diskEntryCount = diskConnection.execute("SELECT COUNT(*) FROM memoize_cache WHERE function_name = ?", (self._functionName,)).fetchone()[0]
+        return self._diskEntryCount
+
+    def _getFromDisk(self, cacheKey, fileStamps, now):
+        import hashlib
+        import pickle
+
+        diskKey = hashlib.sha256(cacheKey).hexdigest()
+        diskConnection = self._getDiskConnection()
+        row = diskConnection.execute("SELECT result, file_stamps, created_time FROM memoize_cache WHERE function_name = ? AND cache_key = ?",
+                                     (self._functionName, diskKey)).fetchone()
+        if (row is None):
+            return (_NOT_CACHED, None)
+
+        pickledResult, entryFileStamps, createdTime = row
+        with diskConnection:
+            invalidReason = self._getEntryInvalidReason(entryFileStamps, createdTime, repr(fileStamps), now)
+            if (invalidReason is not None):
+                diskConnection.execute("DELETE FROM memoize_cache WHERE function_name = ? AND cache_key = ?", (self._functionName, diskKey))
+                self._diskEntryCount = None
+                return (_NOT_CACHED, invalidReason)
+
+            diskConnection.execute("UPDATE memoize_cache SET access_time = ? WHERE function_name = ? AND cache_key = ?", (now, self._functionName, diskKey))
+
+        result = pickle.loads(pickledResult)
+        self._stats['diskHits'] += 1
+        self._putInMemory(cacheKey, (result, fileStamps, createdTime))
+        return (result, None)
+
+    def _putOnDisk(self, cacheKey, result, fileStamps, now):
+        import hashlib
+        import pickle
+
+        try:
+            pickledResult = pickle.dumps(result, protocol=4)
+        except Exception:
+            # results that can't be pickled are only cached in memory
+            return
+
+        diskKey = hashlib.sha256(cacheKey).hexdigest()
+        diskConnection = self._getDiskConnection()
+        entryCount = self._getDiskEntryCount()
+        with diskConnection:
+            diskConnection.execute("INSERT OR REPLACE INTO memoize_cache VALUES (?, ?, ?, ?, ?, ?)", 
+                                   (self._functionName, diskKey, pickledResult, repr(fileStamps), now, now))
+            self._diskEntryCount = entryCount + 1
+
+            # evict a batch of the least recently used entries at once, to not have to evict on every put
+            if (self._diskEntryCount > self._maxDiskEntries):
+                self._diskEntryCount = None
+                if (self._getDiskEntryCount() > self._maxDiskEntries):
+                    numEntriesToEvict = self._diskEntryCount - int(self._maxDiskEntries * 0.9)
+                    diskConnection.execute('''
+                        DELETE FROM memoize_cache WHERE function_name = ? AND cache_key IN (
+                            SELECT cache_key FROM memoize_cache WHERE function_name = ? ORDER BY access_time LIMIT ?)''',
+                        (self._functionName, self._functionName, numEntriesToEvict))
+                    self._stats['diskEvictions'] += numEntriesToEvict
+                    self._diskEntryCount -= numEntriesToEvict
+
+class _ParallelMapChunkSizer:
+    '''
+    Chooses the parallelMap chunk sizes: a fixed size if one was given, otherwise grown from 1 towards
+    about targetChunkSeconds of work per chunk, based on the measured time per item, and capped so
+    that (when the number of items is known) every worker gets a few chunks.
+    '''
+    def __init__(self, fixedChunkSize, numItems, numWorkers, targetChunkSeconds=0.1, maxChunkSize=10000):
+        self._fixedChunkSize = fixedChunkSize
+        self._targetChunkSeconds = targetChunkSeconds
+        self._maxChunkSize = maxChunkSize
+        if (numItems is not None):
+            self._maxChunkSize = max(1, min(maxChunkSize, -(-numItems // (numWorkers * 4))))
+
+        self._timedItems = 0
+        self._timedSeconds = 0.0
+
+    def getChunkSize(self):
+        if (self._fixedChunkSize):
+            return self._fixedChunkSize
+        if (self._timedItems == 0 or self._timedSeconds <= 0):
+            # single items until the first chunk is timed
+            return 1
+
+        secondsPerItem = self._timedSeconds / self._timedItems
+        return max(1, min(self._maxChunkSize, int(self._targetChunkSeconds / secondsPerItem)))
+
+    def addChunkTiming(self, numItems, seconds):
+        self._timedItems += numItems
+        self._timedSeconds += seconds
+
+def _runParallelMapChunk(func, chunkItems, captureErrors, picklableErrors=False):
+    '''
+    Runs the function on each item of the chunk (in a worker), returning the list of (True, result)
+    or (False, (exception, traceback text)) for each item, and the time taken. Module-level so it can
+    run in a process pool.
+
+    With picklableErrors (for a process pool), a captured exception that can't be pickled and
+    unpickled is replaced by a RuntimeError with its type name and message, so it can't break the
+    whole pool when sent back.
+    '''
+    import time
+    import traceback
+
+    startTime = time.perf_counter()
+    chunkResults = []
+    for item in chunkItems:
+        if (not captureErrors):
+            chunkResults.append((True, func(item)))
+            continue
+
+        try:
+            chunkResults.append((True, func(item)))
+        except Exception as exception:
+            if (picklableErrors):
+                exception = _getPicklableException(exception)
+            chunkResults.append((False, (exception, traceback.format_exc())))
+
+    return (chunkResults, time.perf_counter() - startTime)
+
+def _getPicklableException(exception):
+    '''
+    Returns the given exception if it survives a pickle round trip, otherwise a RuntimeError
+    standing in for it ("<TypeName>: <message>").
+    '''
+    import pickle
+
+    try:
+        pickle.loads(pickle.dumps(exception))
+        return exception
+    except Exception:
+        return RuntimeError("{}: {}".format(type(exception).__name__, exception))
@@ -0,0 +1,111 @@
+import os
+import sys
+import asyncio
+import unittest
+
+# Add project root to PYTHONPATH so MLU modules can be imported
+scriptPath = os.path.dirname(os.path.realpath(__file__))
+projectRoot = os.path.abspath(os.path.join(scriptPath ,".."))
+sys.path.insert(0, projectRoot)
+
+from com.nwrobel import mypycommons
+import com.nwrobel.mypycommons.aio
+import com.nwrobel.mypycommons.file
+
+import common
+
+class Aio_ModuleTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.helper = common.TestHelper()
+
+    def setUp(self):
+        self.helper.copyDataToTestTempDir('test-dir')
+        self.testDirectory = mypycommons.file.joinPaths(self.helper.testTempDir, 'test-dir')
+
+    def tearDown(self):
+        self.helper.cleanup()
+
+    @classmethod
+    def tearDownClass(self):
+        mypycommons.aio.shutdownExecutor()
+
+    def test_readAndWriteFile(self):
+        outputPath = mypycommons.file.joinPaths(self.helper.testTempDir, 'output.txt')
+
+        async def run():
+            await mypycommons.aio.writeToFile(outputPath, ['a', 'b'])
+            await mypycommons.aio.writeToFile(outputPath, 'c', append=True)
+            return await mypycommons.aio.readFile(outputPath)
+
+        self.assertEqual(asyncio.run(run()), ['a', 'b', 'c'])
+
+    def test_iterateFileLines(self):
+        outputPath = mypycommons.file.joinPaths(self.helper.testTempDir, 'lines.txt.gz')
+        expectedLines = [str(i) for i in range(5000)]
+        mypycommons.file.writeToFile(outputPath, expectedLines, compression='auto')
+
+        async def run():
+            return [line async for line in mypycommons.aio.iterateFileLines(outputPath, batchSize=100)]
+
+        self.assertEqual(asyncio.run(run()), expectedLines)
+
+    def test_childPaths(self):
+        async def run():
+            walkedFilepaths = [path async for path in mypycommons.aio.iterateChildPaths(self.testDirectory, pathType='file', batchSize=3)]
+            sortedPaths = await mypycommons.aio.getChildPathsRecursive(self.testDirectory, pathType='file')
+            return (walkedFilepaths, sortedPaths)
+
+        walkedFilepaths, sortedPaths = asyncio.run(run())
+        self.assertEqual(sorted(walkedFilepaths), sortedPaths)
+        self.assertEqual(sortedPaths, mypycommons.file.getChildPathsRecursive(self.testDirectory, pathType='file'))
+
+    def test_copyToDirectory(self):
+        destDir = mypycommons.file.joinPaths(self.helper.testTempDir, 'copy')
+        mypycommons.file.createDirectory(destDir)
+
+        async def run():
+            await mypycommons.aio.copyToDirectory(self.testDirectory, destDir)
+
+        asyncio.run(run())
+        copiedFilepaths = mypycommons.file.getChildPathsRecursive(mypycommons.file.joinPaths(destDir, 'test-dir'), pathType='file')
+        self.assertEqual(len(copiedFilepaths), len(mypycommons.file.getChildPathsRecursive(self.testDirectory, pathType='file')))
+
+    def test_concurrencyLimits(self):
+        mypycommons.aio.configureExecutor(maxWorkers=2, maxPendingOperations=3)
+        try:
+            async def run():
+                # the event loop stays responsive while many reads are waiting on the executor
+                tickCount = 0
+                async def tick():
+                    nonlocal tickCount
+                    while (True):
+                        tickCount += 1
+                        await asyncio.sleep(0)
+
+                ticker = asyncio.ensure_future(tick())
+                results = await asyncio.gather(*[mypycommons.aio.readFile(mypycommons.file.joinPaths(self.testDirectory, 'raw.txt')) for i in range(20)])
+                ticker.cancel()
+                return (results, tickCount)
+
+            results, tickCount = asyncio.run(run())
+            self.assertEqual(len(results), 20)
+            self.assertEqual(results[0][0], 'qwertyuiop')
+            self.assertGreater(tickCount, 0)
+        finally:
+            mypycommons.aio.configureExecutor()
+
+    def test_cancellation(self):
+        async def run():
+            readTask = asyncio.ensure_future(mypycommons.aio.getChildPathsRecursive(self.testDirectory))
+            readTask.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await readTask
+
+            # the module stays usable after a cancelled operation
+            return await mypycommons.aio.readFile(mypycommons.file.joinPaths(self.testDirectory, 'raw.txt'))
+
+        self.assertEqual(asyncio.run(run())[0], 'qwertyuiop')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -56,5 +56,151 @@ class Archive_ModuleTest(unittest.TestCase):
 
         self.assertTrue(mypycommons.file.pathExists(testArchiveOutFilepath))
 
+    def test_archiveIndex(self):
+        testArchiveOutFilepath = mypycommons.file.joinPaths(self.tempDir, 'test-out-index.tar')
+        mypycommons.archive.createTarArchive(self.archiveInputDirPath, testArchiveOutFilepath, writeIndex=True)
+        self.assertTrue(mypycommons.file.pathExists(testArchiveOutFilepath + '.index.json'))
+
+        memberNames = mypycommons.archive.listArchiveMembers(testArchiveOutFilepath)
+        memberName = self.archiveInputFilepath.lstrip('/')
+        self.assertIn(memberName, memberNames)
+        self.assertEqual(len(memberNames), 4)
+
+        with open(self.archiveInputFilepath, 'rb') as inputFile:
+            expectedData = inputFile.read()
+        self.assertEqual(mypycommons.archive.readArchiveMember(testArchiveOutFilepath, memberName), expectedData)
+
+        outputFilepath = mypycommons.file.joinPaths(self.tempDir, 'extracted-member.txt')
+        mypycommons.archive.extractArchiveMember(testArchiveOutFilepath, memberName, outputFilepath)
+        with open(outputFilepath, 'rb') as outputFile:
+            self.assertEqual(outputFile.read(), expectedData)
+
+        with self.assertRaises(mypycommons.archive.ArchiveMemberNotFoundError):
+            mypycommons.archive.readArchiveMember(testArchiveOutFilepath, 'not-a-member')
+
+        # the index is rebuilt on first use when there is no sidecar file
+        mypycommons.file.deletePath(testArchiveOutFilepath + '.index.json')
+        self.assertEqual(mypycommons.archive.listArchiveMembers(testArchiveOutFilepath), memberNames)
+
+    def test_createIndexedGzipArchive(self):
+        import tarfile
+
+        testArchiveOutFilepath = mypycommons.file.joinPaths(self.tempDir, 'test-out-index.tar.gz')
+        archiveIndex = mypycommons.archive.createIndexedGzipArchive(self.archiveInputDirPath, testArchiveOutFilepath, blockSizeBytes=64 * 1024)
+        self.assertEqual(archiveIndex.archiveFormat, 'tar.gz-blocks')
+
+        # still a standard .tar.gz
+        with tarfile.open(testArchiveOutFilepath, 'r:gz') as tar:
+            self.assertEqual(tar.getnames(), mypycommons.archive.listArchiveMembers(testArchiveOutFilepath))
+
+        for inputFilepath in mypycommons.file.getChildPathsRecursive(self.archiveInputDirPath, pathType='file'):
+            with open(inputFilepath, 'rb') as inputFile:
+                expectedData = inputFile.read()
+            memberData = mypycommons.archive.readArchiveMember(testArchiveOutFilepath, inputFilepath)
+            self.assertEqual(memberData, expectedData)
+
+        with self.assertRaises(ValueError):
+            mypycommons.archive.buildArchiveIndex(testArchiveOutFilepath)
+
+    def test_verifyArchive(self):
+        import gzip
+        import shutil
+
+        testArchiveOutFilepath = mypycommons.file.joinPaths(self.tempDir, 'test-out-verify.tar')
+        mypycommons.archive.createTarArchive(self.archiveInputDirPath, testArchiveOutFilepath, writeManifest=True)
+
+        result = mypycommons.archive.verifyArchive(testArchiveOutFilepath)
+        self.assertTrue(result.isValid)
+        self.assertEqual(result.verifiedCount, 3)
+        self.assertGreater(result.throughputBytesPerSecond, 0)
+        # the index of the tar is only built in memory
+        self.assertFalse(mypycommons.file.pathExists(testArchiveOutFilepath + '.index.json'))
+
+        # a (non-indexed) compressed tar is verified by streaming it
+        compressedArchiveFilepath = testArchiveOutFilepath + '.gz'
+        with open(testArchiveOutFilepath, 'rb') as archiveFile:
+            with gzip.open(compressedArchiveFilepath, 'wb') as compressedFile:
+                shutil.copyfileobj(archiveFile, compressedFile)
+        result = mypycommons.archive.verifyArchive(compressedArchiveFilepath, manifestFilepath=testArchiveOutFilepath + '.sha256.json')
+        self.assertTrue(result.isValid)
+        self.assertEqual(result.verifiedCount, 3)
+
+        # corrupt one byte of a member
+        memberName = self.archiveInputFilepath.lstrip('/')
+        member = mypycommons.archive.loadArchiveIndex(testArchiveOutFilepath).getMember(memberName)
+        with open(testArchiveOutFilepath, 'r+b') as archiveFile:
+            archiveFile.seek(member.offset + 10)
+            originalByte = archiveFile.read(1)
+            archiveFile.seek(member.offset + 10)
+            archiveFile.write(bytes([originalByte[0] ^ 0xFF]))
+
+        result = mypycommons.archive.verifyArchive(testArchiveOutFilepath, numWorkers=2)
+        self.assertFalse(result.isValid)
+        self.assertEqual(result.mismatchedMembers, [memberName])
+
+        indexedArchiveFilepath = mypycommons.file.joinPaths(self.tempDir, 'test-out-verify.tar.gz')
+        mypycommons.archive.createIndexedGzipArchive(self.archiveInputDirPath, indexedArchiveFilepath, blockSizeBytes=64 * 1024, writeManifest=True)
+        result = mypycommons.archive.verifyArchive(indexedArchiveFilepath)
+        self.assertTrue(result.isValid)
+        self.assertEqual((result.missingMembers, result.extraMembers), ([], []))
+
+    def test_createTarArchive_failure(self):
+        testArchiveOutFilepath = mypycommons.file.joinPaths(self.tempDir, 'not-a-dir/test-out.tar')
+        with self.assertRaises(mypycommons.archive.ArchiveCreationError):
+            mypycommons.archive.createTarArchive(self.archiveInputFilepath, testArchiveOutFilepath)
+
+    def test_compressionCodecs(self):
+        testData = b'abcdefgh' * 10000
+        self.assertIn('lzma', mypycommons.archive.getAvailableCompressionCodecNames())
+        for codecName in mypycommons.archive.getAvailableCompressionCodecNames():
+            codec = mypycommons.archive.getCompressionCodec(codecName)
+            self.assertEqual(codec.decompress(codec.compress(testData)), testData)
+
+        with self.assertRaises(ValueError):
+            mypycommons.archive.getCompressionCodec('not-a-codec')
+
+        # an incomplete codec can't be created
+        class IncompleteCodec(mypycommons.archive.CompressionCodec):
+            name = 'incomplete'
+            def compress(self, data, level=None):
+                return data
+
+        with self.assertRaises(TypeError):
+            IncompleteCodec()
+
+        randomFilepath = mypycommons.file.joinPaths(self.tempDir, 'random.bin')
+        with open(randomFilepath, 'wb') as randomFile:
+            randomFile.write(os.urandom(500000))
+
+        self.assertLess(mypycommons.archive.estimateCompressionRatio(self.archiveInputFilepath), 0.9)
+        self.assertGreater(mypycommons.archive.estimateCompressionRatio(randomFilepath), 0.95)
+        self.assertEqual(mypycommons.archive.selectCompressionCodec(randomFilepath).name, 'store')
+        self.assertEqual(mypycommons.archive.selectCompressionCodec(self.archiveInputFilepath, 'bz2').name, 'bz2')
+
+        compressedFilepath = mypycommons.file.joinPaths(self.tempDir, 'compressed.xz')
+        codec = mypycommons.archive.compressFile(self.archiveInputFilepath, compressedFilepath, preferredCodecName='lzma')
+        self.assertEqual(codec.name, 'lzma')
+        self.assertEqual(mypycommons.file.readFile(compressedFilepath), mypycommons.file.readFile(self.archiveInputFilepath))
+
+    def test_createZipArchive(self):
+        import zipfile
+
+        inputDir = mypycommons.file.joinPaths(self.tempDir, 'zip-input')
+        mypycommons.file.createDirectory(inputDir)
+        mypycommons.file.copyToDirectory(self.archiveInputFilepath, inputDir)
+        with open(mypycommons.file.joinPaths(inputDir, 'random.bin'), 'wb') as randomFile:
+            randomFile.write(os.urandom(100000))
+
+        testArchiveOutFilepath = mypycommons.file.joinPaths(self.tempDir, 'test-out.zip')
+        mypycommons.archive.createZipArchive(inputDir, testArchiveOutFilepath)
+
+        with zipfile.ZipFile(testArchiveOutFilepath) as zipArchive:
+            self.assertIsNone(zipArchive.testzip())
+            compressTypes = { zipInfo.filename: zipInfo.compress_type for zipInfo in zipArchive.infolist() }
+        self.assertEqual(compressTypes, { 'zip-input/random.bin': zipfile.ZIP_STORED, 'zip-input/test-archive-input-file-1.txt': zipfile.ZIP_DEFLATED })
+
+        with self.assertRaises(ValueError):
+            mypycommons.archive.createZipArchive(inputDir, testArchiveOutFilepath, compression='zstd')
+
 if __name__ == '__main__':
     unittest.main()
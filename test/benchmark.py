@@ -0,0 +1,390 @@
+'''
+Benchmark suite for the hot paths of the library: walking and reading files, creating and reading
+archives, the compression codecs, logging, time parsing and formatting, and duplicate detection. The
+inputs are synthetic files, directory trees and lists generated (from a fixed seed) in a temp dir,
+so runs with the same scale are comparable.
+
+The results are written as JSON. When a baseline results file (from an earlier run) is given, each
+benchmark is compared to it and the ones slower than the baseline by more than the threshold are
+flagged as regressions (the exit code is then 1).
+
+Usage: python benchmark.py [--scale N] [--repeat N] [--output results.json]
+                           [--baseline baseline.json] [--threshold 0.2] [--only name,...]
+'''
+
+import os
+import sys
+import json
+import time
+import platform
+import random
+import argparse
+import functools
+import contextlib
+from datetime import datetime, timedelta
+
+# Add project root to PYTHONPATH so MLU modules can be imported
+scriptPath = os.path.dirname(os.path.realpath(__file__))
+projectRoot = os.path.abspath(os.path.join(scriptPath ,".."))
+sys.path.insert(0, projectRoot)
+
+from com.nwrobel import mypycommons
+import com.nwrobel.mypycommons.archive
+import com.nwrobel.mypycommons.file
+import com.nwrobel.mypycommons.logger
+import com.nwrobel.mypycommons.time
+import com.nwrobel.mypycommons.utils
+
+import common
+
+@contextlib.contextmanager
+def suppressStdout():
+    '''
+    Sends the stdout of the process (including of child processes, like the verbose tar output) to
+    devnull, so printing the output isn't part of the timings.
+    '''
+    sys.stdout.flush()
+    savedStdoutFd = os.dup(1)
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+        try:
+            yield
+        finally:
+            os.dup2(savedStdoutFd, 1)
+            os.close(savedStdoutFd)
+
+class BenchmarkInputs:
+    '''
+    The synthetic inputs of the benchmarks, sized by the scale factor (1 is a run of a few seconds).
+    Each input is created the first time a benchmark uses it, so running only some of the benchmarks
+    (--only) creates only their inputs.
+    '''
+    def __init__(self, helper: common.BenchmarkHelper, scale: float):
+        self.scale = scale
+        self.helper = helper
+        self.outputDir = mypycommons.file.joinPaths(helper.testTempDir, 'output')
+        mypycommons.file.createDirectory(self.outputDir)
+
+        self.numLogMessages = max(1, int(20000 * scale))
+
+    @functools.cached_property
+    def treeDir(self):
+        return self.helper.createSyntheticTree('tree', numDirs=max(1, int(40 * self.scale)), filesPerDir=25, fileSizeBytes=2048)
+
+    @functools.cached_property
+    def treeFileCount(self):
+        return len(mypycommons.file.getChildPathsRecursive(self.treeDir, pathType='file'))
+
+    @functools.cached_property
+    def textFilepath(self):
+        return self.helper.createSyntheticTextFile('lines.txt', numLines=max(1, int(200000 * self.scale)))
+
+    @functools.cached_property
+    def csvFilepath(self):
+        return self.helper.createSyntheticCSVFile('rows.csv', numRows=max(1, int(50000 * self.scale)))
+
+    @functools.cached_property
+    def formattedTimes(self):
+        return mypycommons.time.formatDatetimesForDisplay(self.datetimes)
+
+    @functools.cached_property
+    def datetimes(self):
+        generator = random.Random(self.helper.seed)
+        startDatetime = datetime(1970, 1, 1)
+        return [startDatetime + timedelta(seconds=generator.randint(0, 2000000000)) for i in range(max(1, int(100000 * self.scale)))]
+
+    @functools.cached_property
+    def duplicatedPaths(self):
+        # about 10% of the paths are duplicates
+        generator = random.Random(self.helper.seed)
+        numPaths = max(1, int(200000 * self.scale))
+        return ["/data/dir{}/file{}.txt".format(generator.randrange(100), generator.randrange(numPaths * 5)) for i in range(numPaths)]
+
+    @functools.cached_property
+    def randomFilepath(self):
+        # random bytes, standing in for already-compressed media
+        numBytes = max(1, int(2 * 1024 * 1024 * self.scale))
+        filepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'random.bin')
+        with open(filepath, 'wb') as randomFile:
+            randomFile.write(random.Random(self.helper.seed).getrandbits(numBytes * 8).to_bytes(numBytes, 'little'))
+        return filepath
+
+    @functools.cached_property
+    def compressionData(self):
+        # half text, half random bytes
+        with open(self.textFilepath, 'rb') as textFile:
+            textData = textFile.read(max(1, int(2 * 1024 * 1024 * self.scale)))
+        with open(self.randomFilepath, 'rb') as randomFile:
+            return textData + randomFile.read(len(textData))
+
+    @functools.cached_property
+    def testArchiveData(self):
+        # the archive test data files (real text), not scaled
+        testDataDir = mypycommons.file.joinPaths(scriptPath, 'data/test-archive-input-dir')
+        testData = b''
+        for filepath in sorted(mypycommons.file.getChildPathsRecursive(testDataDir, pathType='file')):
+            with open(filepath, 'rb') as inputFile:
+                testData += inputFile.read()
+        return testData
+
+    @functools.cached_property
+    def compressedData(self):
+        return { codecName: mypycommons.archive.getCompressionCodec(codecName).compress(self.compressionData) 
+                 for codecName in mypycommons.archive.getAvailableCompressionCodecNames() }
+
+    @functools.cached_property
+    def tarFilepath(self):
+        tarFilepath = mypycommons.file.joinPaths(self.outputDir, 'prepared.tar')
+        with suppressStdout():
+            mypycommons.archive.createTarArchive(self.treeDir, tarFilepath, writeIndex=True)
+        return tarFilepath
+
+    @functools.cached_property
+    def indexedGzipFilepath(self):
+        indexedGzipFilepath = mypycommons.file.joinPaths(self.outputDir, 'prepared.tar.gz')
+        mypycommons.archive.createIndexedGzipArchive(self.treeDir, indexedGzipFilepath, blockSizeBytes=256 * 1024)
+        return indexedGzipFilepath
+
+    @functools.cached_property
+    def archiveMemberNames(self):
+        return [member.name for member in mypycommons.archive.loadArchiveIndex(self.indexedGzipFilepath) if (member.memberType == 'file')]
+
+# Each benchmark takes the inputs and returns the number of operations it did (files, lines, messages...),
+# or (number of operations, dict of other values to add to its results)
+def benchmarkGetChildPathsRecursive(inputs):
+    return len(mypycommons.file.getChildPathsRecursive(inputs.treeDir))
+
+def benchmarkGetFilesByExtension(inputs):
+    return len(mypycommons.file.getFilesByExtension(inputs.treeDir, '.log'))
+
+def benchmarkReadFile(inputs):
+    return len(mypycommons.file.readFile(inputs.textFilepath))
+
+def benchmarkReadCSVFile(inputs):
+    return len(mypycommons.file.readCSVFile(inputs.csvFilepath))
+
+def benchmarkGetFileLineCount(inputs):
+    return mypycommons.file.getFileLineCount(inputs.textFilepath)
+
+def benchmarkCreateTarArchive(inputs):
+    archiveFilepath = mypycommons.file.joinPaths(inputs.outputDir, 'benchmark.tar')
+    with suppressStdout():
+        mypycommons.archive.createTarArchive(inputs.treeDir, archiveFilepath)
+    mypycommons.file.deletePath(archiveFilepath)
+    return inputs.treeFileCount
+
+def benchmarkCreateIndexedGzipArchive(inputs):
+    archiveFilepath = mypycommons.file.joinPaths(inputs.outputDir, 'benchmark.tar.gz')
+    mypycommons.archive.createIndexedGzipArchive(inputs.treeDir, archiveFilepath, blockSizeBytes=256 * 1024)
+    mypycommons.file.deletePath(archiveFilepath)
+    mypycommons.file.deletePath(archiveFilepath + '.index.json')
+    return inputs.treeFileCount
+
+def benchmarkExtractTarArchive(inputs):
+    import tarfile
+
+    extractDir = mypycommons.file.joinPaths(inputs.outputDir, 'extracted')
+    with tarfile.open(inputs.tarFilepath) as tar:
+        tar.extractall(extractDir)
+    mypycommons.file.deletePath(extractDir)
+    return inputs.treeFileCount
+
+def benchmarkReadArchiveMember(inputs):
+    archiveIndex = mypycommons.archive.loadArchiveIndex(inputs.indexedGzipFilepath)
+    for memberName in inputs.archiveMemberNames:
+        mypycommons.archive.readArchiveMember(inputs.indexedGzipFilepath, memberName, archiveIndex)
+    return len(inputs.archiveMemberNames)
+
+def benchmarkSelectCompressionCodec(inputs):
+    filepaths = [inputs.textFilepath, inputs.randomFilepath]
+    for filepath in filepaths:
+        mypycommons.archive.selectCompressionCodec(filepath)
+    return len(filepaths)
+
+def createCodecBenchmarks(codecName):
+    '''
+    Returns the BENCHMARKS entries of the given compression codec, counting bytes: compressing the
+    synthetic data and the archive test data (recording the compressed size and ratio), and
+    decompressing the synthetic data.
+    '''
+    def compressData(data):
+        compressedBytes = len(mypycommons.archive.getCompressionCodec(codecName).compress(data))
+        return (len(data), { 'compressedBytes': compressedBytes, 'ratio': compressedBytes / max(len(data), 1) })
+
+    def benchmarkCompress(inputs):
+        return compressData(inputs.compressionData)
+
+    def benchmarkCompressTestData(inputs):
+        return compressData(inputs.testArchiveData)
+
+    def benchmarkDecompress(inputs):
+        mypycommons.archive.getCompressionCodec(codecName).decompress(inputs.compressedData[codecName])
+        return len(inputs.compressionData)
+
+    return {
+        'archive.codec.{}.compress'.format(codecName): (benchmarkCompress, ('compressionData',)),
+        'archive.codec.{}.compressTestData'.format(codecName): (benchmarkCompressTestData, ('testArchiveData',)),
+        'archive.codec.{}.decompress'.format(codecName): (benchmarkDecompress, ('compressionData', 'compressedData'))
+    }
+
+def benchmarkLoggerThroughput(inputs):
+    logger = mypycommons.logger.CommonLogger('benchmark', inputs.outputDir, 'benchmark.log')
+    logger.setConsoleOutputLogLevel(mypycommons.logger.LogLevel.ERROR)
+    loggerObj = logger.getLogger()
+    try:
+        for messageIndex in range(inputs.numLogMessages):
+            loggerObj.info("Benchmark message %d of %d", messageIndex, inputs.numLogMessages)
+    finally:
+        for handler in list(loggerObj.handlers):
+            handler.close()
+            loggerObj.removeHandler(handler)
+        mypycommons.file.deletePath(logger.logFilepath)
+
+    return inputs.numLogMessages
+
+def benchmarkTimeParsing(inputs):
+    return len(mypycommons.time.getDateTimesFromFormattedTimes(inputs.formattedTimes))
+
+def benchmarkTimeFormatting(inputs):
+    return len(mypycommons.time.formatDatetimesForDisplay(inputs.datetimes))
+
+def benchmarkGetListDupes(inputs):
+    mypycommons.utils.getListDupes(inputs.duplicatedPaths)
+    return len(inputs.duplicatedPaths)
+
+def benchmarkGetDuplicateCounts(inputs):
+    mypycommons.utils.getDuplicateCounts(inputs.duplicatedPaths)
+    return len(inputs.duplicatedPaths)
+
+def benchmarkGetDuplicateIndexes(inputs):
+    mypycommons.utils.getDuplicateIndexes(inputs.duplicatedPaths)
+    return len(inputs.duplicatedPaths)
+
+def benchmarkGetDuplicatesByKey(inputs):
+    mypycommons.utils.getDuplicatesByKey(inputs.duplicatedPaths, os.path.basename)
+    return len(inputs.duplicatedPaths)
+
+# Benchmark name -> (benchmark function, names of the inputs it uses, created before it is timed)
+BENCHMARKS = {
+    'file.getChildPathsRecursive': (benchmarkGetChildPathsRecursive, ('treeDir',)),
+    'file.getFilesByExtension': (benchmarkGetFilesByExtension, ('treeDir',)),
+    'file.readFile': (benchmarkReadFile, ('textFilepath',)),
+    'file.readCSVFile': (benchmarkReadCSVFile, ('csvFilepath',)),
+    'file.getFileLineCount': (benchmarkGetFileLineCount, ('textFilepath',)),
+    'archive.createTarArchive': (benchmarkCreateTarArchive, ('treeDir', 'treeFileCount')),
+    'archive.createIndexedGzipArchive': (benchmarkCreateIndexedGzipArchive, ('treeDir', 'treeFileCount')),
+    'archive.extractTar': (benchmarkExtractTarArchive, ('tarFilepath', 'treeFileCount')),
+    'archive.readArchiveMember': (benchmarkReadArchiveMember, ('indexedGzipFilepath', 'archiveMemberNames')),
+    'archive.selectCompressionCodec': (benchmarkSelectCompressionCodec, ('textFilepath', 'randomFilepath')),
+    'logger.CommonLogger': (benchmarkLoggerThroughput, ()),
+    'time.getDateTimesFromFormattedTimes': (benchmarkTimeParsing, ('formattedTimes',)),
+    'time.formatDatetimesForDisplay': (benchmarkTimeFormatting, ('datetimes',)),
+    'utils.getListDupes': (benchmarkGetListDupes, ('duplicatedPaths',)),
+    'utils.getDuplicateCounts': (benchmarkGetDuplicateCounts, ('duplicatedPaths',)),
+    'utils.getDuplicateIndexes': (benchmarkGetDuplicateIndexes, ('duplicatedPaths',)),
+    'utils.getDuplicatesByKey': (benchmarkGetDuplicatesByKey, ('duplicatedPaths',)),
+}
+for codecName in mypycommons.archive.getAvailableCompressionCodecNames():
+    BENCHMARKS.update(createCodecBenchmarks(codecName))
+
+def runBenchmarks(scale, repeat, benchmarkNames=None):
+    '''
+    Runs the benchmarks (all, or the ones with the given names) on inputs of the given scale, each
+    the given number of times, and returns the results dict (JSON serializable). The best time of the
+    runs is used for comparisons, as it is the least affected by other activity on the machine.
+    '''
+    helper = common.BenchmarkHelper()
+    try:
+        inputs = BenchmarkInputs(helper, scale)
+        results = {}
+
+        for name, (benchmarkFunc, inputNames) in BENCHMARKS.items():
+            if (benchmarkNames and name not in benchmarkNames):
+                continue
+
+            for inputName in inputNames:
+                getattr(inputs, inputName)
+
+            runSeconds = []
+            for runIndex in range(repeat):
+                startTime = time.perf_counter()
+                numOperations = benchmarkFunc(inputs)
+                runSeconds.append(time.perf_counter() - startTime)
+
+            otherResults = {}
+            if (isinstance(numOperations, tuple)):
+                numOperations, otherResults = numOperations
+
+            runSeconds.sort()
+            results[name] = {
+                'operations': numOperations,
+                'bestSeconds': runSeconds[0],
+                'medianSeconds': runSeconds[len(runSeconds) // 2],
+                'operationsPerSecond': numOperations / max(runSeconds[0], 1e-9)
+            }
+            results[name].update(otherResults)
+            print("{:<40} {:>10.4f}s {:>14,.0f} ops/s{}".format(name, runSeconds[0], results[name]['operationsPerSecond'],
+                                                            "   ratio {:.3f}".format(otherResults['ratio']) if ('ratio' in otherResults) else ''))
+    finally:
+        helper.cleanup()
+
+    return {
+        'scale': scale,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'createdTime': mypycommons.time.getCurrentFormattedTime(),
+        'results': results
+    }
+
+def compareResults(results, baselineResults, threshold):
+    '''
+    Compares the results to the baseline results, printing the change of each benchmark. Returns the
+    list of names of the benchmarks that got slower by more than the threshold (fraction, ex: 0.2).
+    '''
+    if (results['scale'] != baselineResults['scale']):
+        print("Warning: the baseline was run with scale {}, this run with scale {}".format(baselineResults['scale'], results['scale']))
+
+    regressions = []
+    print("\n{:<40} {:>11} {:>11} {:>9}".format('benchmark', 'baseline', 'current', 'change'))
+    for name, result in results['results'].items():
+        baselineResult = baselineResults['results'].get(name)
+        if (baselineResult is None):
+            print("{:<40} {:>11} {:>10.4f}s".format(name, 'n/a', result['bestSeconds']))
+            continue
+
+        change = (result['bestSeconds'] / max(baselineResult['bestSeconds'], 1e-9)) - 1
+        isRegression = (change > threshold)
+        if (isRegression):
+            regressions.append(name)
+
+        print("{:<40} {:>10.4f}s {:>10.4f}s {:>+8.1%}{}".format(name, baselineResult['bestSeconds'], result['bestSeconds'], change,
+                                                              '  REGRESSION' if (isRegression) else ''))
+
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks the hot paths of the library")
+    parser.add_argument('--scale', type=float, default=1.0, help="size factor of the synthetic inputs")
+    parser.add_argument('--repeat', type=int, default=3, help="number of runs of each benchmark")
+    parser.add_argument('--output', help="path of the JSON results file to write")
+    parser.add_argument('--baseline', help="path of an earlier JSON results file to compare to")
+    parser.add_argument('--threshold', type=float, default=0.2, help="slowdown (fraction) flagged as a regression")
+    parser.add_argument('--only', help="comma separated names of the benchmarks to run")
+    args = parser.parse_args()
+
+    benchmarkNames = args.only.split(',') if (args.only) else None
+    results = runBenchmarks(args.scale, max(1, args.repeat), benchmarkNames)
+
+    if (args.output):
+        with open(args.output, 'w', encoding='utf-8') as outputFile:
+            json.dump(results, outputFile, indent=2)
+
+    if (args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as baselineFile:
+            baselineResults = json.load(baselineFile)
+
+        regressions = compareResults(results, baselineResults, args.threshold)
+        if (regressions):
+            print("\n{} regression(s) over {:.0%}: {}".format(len(regressions), args.threshold, ', '.join(regressions)))
+            sys.exit(1)
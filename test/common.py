@@ -1,7 +1,12 @@
+import os
+
 from com.nwrobel import mypycommons
 import com.nwrobel.mypycommons.file
 
 class TestHelper:
+    # name of the temp dir created (and removed again) next to the tests
+    tempDirName = '~temp'
+
     def __init__(self):
         self._thisDir = mypycommons.file.getThisScriptCurrentDirectory()
         self.testDataDir = self._getTestDataDir()
@@ -16,7 +21,7 @@ class TestHelper:
 
     def _getTestTempDir(self):
         thisDirectory = mypycommons.file.getThisScriptCurrentDirectory()
-        tempDir = mypycommons.file.joinPaths(thisDirectory, '~temp')
+        tempDir = mypycommons.file.joinPaths(thisDirectory, self.tempDirName)
 
         if (mypycommons.file.pathExists(tempDir)):
             mypycommons.file.deletePath(tempDir)
@@ -30,4 +35,98 @@ class TestHelper:
 
     def copyDataToTestTempDir(self, partialPath):
         sourcePath = mypycommons.file.joinPaths(self.testDataDir, partialPath)
-        mypycommons.file.copyToDirectory(sourcePath, self.testTempDir)
\ No newline at end of file
+        mypycommons.file.copyToDirectory(sourcePath, self.testTempDir)
+
+class BenchmarkHelper(TestHelper):
+    '''
+    Test helper generating synthetic data of a configurable size for the benchmarks. The data is
+    generated from a fixed random seed, so the same sizes always give the same files.
+    '''
+    tempDirName = '~benchmark-temp'
+
+    def __init__(self, seed=1234):
+        super().__init__()
+        self.seed = seed
+
+    def createSyntheticTree(self, name, numDirs, filesPerDir, fileSizeBytes, fileExts=('.txt', '.log', '.csv')):
+        '''
+        Creates a directory tree in the temp dir with the given number of dirs (nested up to 3 levels
+        deep), each containing the given number of text files of about the given size. The file
+        extensions cycle through the given ones. Returns the path of the root dir of the tree.
+        '''
+        import random
+
+        generator = random.Random(self.seed)
+        rootDir = mypycommons.file.joinPaths(self.testTempDir, name)
+        mypycommons.file.createDirectory(rootDir)
+
+        dirPaths = []
+        for dirIndex in range(numDirs):
+            parentDir = dirPaths[generator.randrange(len(dirPaths))] if (dirPaths and dirIndex % 4) else rootDir
+            if (parentDir.count(os.sep) - rootDir.count(os.sep) >= 3):
+                parentDir = rootDir
+
+            dirPath = mypycommons.file.joinPaths(parentDir, 'dir{:04d}'.format(dirIndex))
+            mypycommons.file.createDirectory(dirPath)
+            dirPaths.append(dirPath)
+
+            for fileIndex in range(filesPerDir):
+                fileExt = fileExts[fileIndex % len(fileExts)]
+                filepath = mypycommons.file.joinPaths(dirPath, 'file{:04d}{}'.format(fileIndex, fileExt))
+                self._writeSyntheticText(filepath, generator, fileSizeBytes)
+
+        return rootDir
+
+    def createSyntheticTextFile(self, name, numLines, lineLength=80):
+        '''
+        Creates a text file in the temp dir with the given number of lines of random words, each of
+        about the given length. Returns the path of the file.
+        '''
+        import random
+
+        generator = random.Random(self.seed)
+        filepath = mypycommons.file.joinPaths(self.testTempDir, name)
+        with open(filepath, 'w', encoding='utf-8', newline='\n') as outputFile:
+            outputFile.writelines(self._getSyntheticLine(generator, lineLength) + '\n' for i in range(numLines))
+
+        return filepath
+
+    def createSyntheticCSVFile(self, name, numRows, numColumns=8):
+        '''
+        Creates a CSV file in the temp dir with a header row and the given number of rows of random
+        numbers and words. Returns the path of the file.
+        '''
+        import csv
+        import random
+
+        generator = random.Random(self.seed)
+        filepath = mypycommons.file.joinPaths(self.testTempDir, name)
+        with open(filepath, 'w', encoding='utf-8', newline='') as outputFile:
+            writer = csv.writer(outputFile)
+            writer.writerow(['column{}'.format(columnIndex) for columnIndex in range(numColumns)])
+            for rowIndex in range(numRows):
+                writer.writerow([rowIndex] + [(generator.randrange(1000000) if (columnIndex % 2) else self._getSyntheticLine(generator, 12)) 
+                                              for columnIndex in range(1, numColumns)])
+
+        return filepath
+
+    def _writeSyntheticText(self, filepath, generator, sizeBytes):
+        lines = []
+        writtenBytes = 0
+        while (writtenBytes < sizeBytes):
+            line = self._getSyntheticLine(generator, min(80, sizeBytes - writtenBytes))
+            lines.append(line)
+            writtenBytes += len(line) + 1
+
+        with open(filepath, 'w', encoding='utf-8', newline='\n') as outputFile:
+            outputFile.write('\n'.join(lines) + '\n')
+
+    def _getSyntheticLine(self, generator, length):
+        words = []
+        lineLength = 0
+        while (lineLength < length):
+            word = ''.join(generator.choice('abcdefghijklmnopqrstuvwxyz') for i in range(generator.randint(2, 9)))
+            words.append(word)
+            lineLength += len(word) + 1
+
+        return ' '.join(words)[:max(length, 1)]
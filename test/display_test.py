@@ -0,0 +1,69 @@
+import os
+import io
+import sys
+import unittest
+import logging
+
+# Add project root to PYTHONPATH so MLU modules can be imported
+scriptPath = os.path.dirname(os.path.realpath(__file__))
+projectRoot = os.path.abspath(os.path.join(scriptPath ,".."))
+sys.path.insert(0, projectRoot)
+
+from com.nwrobel import mypycommons
+import com.nwrobel.mypycommons.display
+
+class TerminalStream(io.StringIO):
+    def isatty(self):
+        return True
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+class Display_ModuleTest(unittest.TestCase):
+    def test_ProgressBar_terminal(self):
+        stream = TerminalStream()
+        with mypycommons.display.ProgressBar(100000, prefix='Test', minIntervalSeconds=60, stream=stream) as progressBar:
+            for i in range(100000):
+                progressBar.update()
+
+        self.assertEqual(progressBar.iteration, 100000)
+        # only the first redraw, the completed redraw and the final redraw are throttled through
+        draws = stream.getvalue().split('\r')[1:]
+        self.assertLessEqual(len(draws), 3)
+        self.assertIn('100.0%', draws[-1])
+        self.assertTrue(stream.getvalue().endswith('\n'))
+
+    def test_ProgressBar_notTerminal(self):
+        handler = ListHandler()
+        logger = logging.getLogger('progressbartest')
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+
+        stream = io.StringIO()
+        progressBar = mypycommons.display.ProgressBar(10, prefix='Test', stream=stream, logger=logger, logIntervalSeconds=0)
+        for i in range(10):
+            progressBar.update()
+        progressBar.finish()
+
+        self.assertEqual(stream.getvalue(), '')
+        self.assertEqual(len(handler.messages), 10)
+        self.assertTrue(handler.messages[-1].startswith('Test 100.0% 10/10'))
+        self.assertEqual(progressBar.getEtaSeconds(), 0)
+
+        # finishing early writes the progress not written yet
+        progressBar = mypycommons.display.ProgressBar(10, prefix='Test', stream=stream, logIntervalSeconds=60)
+        for i in range(3):
+            progressBar.update()
+        progressBar.finish()
+
+        progressLines = stream.getvalue().splitlines()
+        self.assertEqual(len(progressLines), 2)
+        self.assertTrue(progressLines[-1].startswith('Test 30.0% 3/10'))
+
+if __name__ == '__main__':
+    unittest.main()
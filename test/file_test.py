@@ -1,6 +1,10 @@
 import os
 import sys
+import time
+import random
 import unittest
+import unittest.mock
+from pathlib import PurePosixPath
 
 # Add project root to PYTHONPATH so MLU modules can be imported
 scriptPath = os.path.dirname(os.path.realpath(__file__))
@@ -142,5 +146,443 @@ class File_ModuleTest(unittest.TestCase):
 
         self.assertFalse(data)
 
+    @unittest.skipIf(os.name == 'nt', "string path functions are only used on POSIX systems")
+    def test_pathFunctions_matchPathlib(self):
+        '''
+        Property test: the string based path functions give the same results as pathlib for
+        randomly generated paths.
+        '''
+        randomGen = random.Random(1234)
+        pathPieces = ['a', 'b.txt', '.hidden', 'x.tar.gz', 'name.', '..', '.', '', '.a.b', 'c d', '...']
+        pathStarts = ['', '/', '//', '///', './', '../']
+
+        testPaths = ['', '/', '//', '.', '..', 'a', '/a', '//a', 'a/', 'a/.', './a', 'a//b', '/a/b/../c.txt/']
+        for i in range(5000):
+            pieces = [randomGen.choice(pathPieces) for j in range(randomGen.randint(0, 5))]
+            testPaths.append(randomGen.choice(pathStarts) + '/'.join(pieces) + randomGen.choice(['', '/', '//']))
+
+        for testPath in testPaths:
+            pathObj = PurePosixPath(testPath)
+            self.assertEqual(mypycommons.file.getFilename(testPath), pathObj.name, testPath)
+            self.assertEqual(mypycommons.file.getFileExtension(testPath), pathObj.suffix, testPath)
+            self.assertEqual(mypycommons.file.getFileBaseName(testPath), pathObj.stem, testPath)
+            self.assertEqual(mypycommons.file.getParentDirectoryPath(testPath), mypycommons.file.removeTrailingSlashFromPath(str(pathObj.parent)), testPath)
+
+        self.assertEqual(mypycommons.file.getFilenames(iter(testPaths)), [PurePosixPath(testPath).name for testPath in testPaths])
+        self.assertEqual(mypycommons.file.getFileExtensions(testPaths), [PurePosixPath(testPath).suffix for testPath in testPaths])
+        self.assertEqual(mypycommons.file.getFileBaseNames(testPaths), [PurePosixPath(testPath).stem for testPath in testPaths])
+        expected = [mypycommons.file.removeTrailingSlashFromPath('\\\\?\\' + str(PurePosixPath(testPath).parent)) for testPath in testPaths]
+        self.assertEqual(mypycommons.file.getParentDirectoryPaths(testPaths, useWindowsExtendedPaths=True), expected)
+
+    def test_joinChildPaths(self):
+        childPaths = ['a.txt', '../b', 'c/./d/', '/abs/path', '']
+        for rootPath in ['/data/root', 'relative/root', '/', '']:
+            expected = [mypycommons.file.joinPaths(rootPath, childPath) for childPath in childPaths]
+            self.assertEqual(mypycommons.file.joinChildPaths(rootPath, childPaths), expected)
+
+    def test_watchDirectory(self):
+        FileChangeEvent = mypycommons.file.FileChangeEvent
+
+        for usePolling in [False, True]:
+            watchParentDir = mypycommons.file.joinPaths(self.helper.testTempDir, 'watch-{}'.format(usePolling))
+            mypycommons.file.createDirectory(watchParentDir)
+            mypycommons.file.copyToDirectory(mypycommons.file.joinPaths(self.helper.testDataDir, 'test-dir'), watchParentDir)
+            watchDir = mypycommons.file.joinPaths(watchParentDir, 'test-dir')
+
+            newFilePath = mypycommons.file.joinPaths(watchDir, 'foo/new-file.txt')
+            changedFilePath = mypycommons.file.joinPaths(watchDir, 'test-file.txt')
+            deletedFilePath = mypycommons.file.joinPaths(watchDir, 'raw.txt')
+
+            with mypycommons.file.watchDirectory(watchDir, debounceSeconds=0.05, pollIntervalSeconds=0.05, usePolling=usePolling) as watcher:
+                mypycommons.file.writeToFile(newFilePath, 'new')
+                mypycommons.file.writeToFile(changedFilePath, 'changed', append=True)
+                mypycommons.file.deletePath(deletedFilePath)
+
+                events = watcher.getEvents(timeoutSeconds=5)
+                # changes may be split across batches when polling
+                while (len(events) < 3):
+                    moreEvents = watcher.getEvents(timeoutSeconds=1)
+                    if (not moreEvents):
+                        break
+                    events += moreEvents
+
+            self.assertEqual(set(events), {
+                FileChangeEvent(FileChangeEvent.CREATED, newFilePath),
+                FileChangeEvent(FileChangeEvent.MODIFIED, changedFilePath),
+                FileChangeEvent(FileChangeEvent.DELETED, deletedFilePath)
+            }, watcher.backendName)
+
+    def test_watchDirectory_callback(self):
+        receivedEvents = []
+        watcher = mypycommons.file.watchDirectory(self.testDirectory, callback=receivedEvents.extend, debounceSeconds=0.05)
+
+        newDirPath = mypycommons.file.joinPaths(self.testDirectory, 'new-dir')
+        mypycommons.file.createDirectory(newDirPath)
+        mypycommons.file.writeToFile(mypycommons.file.joinPaths(newDirPath, 'new-file.txt'), 'new')
+
+        for i in range(50):
+            if (len(receivedEvents) >= 2):
+                break
+            time.sleep(0.1)
+        watcher.close()
+
+        self.assertEqual([event.path for event in receivedEvents], [newDirPath, mypycommons.file.joinPaths(newDirPath, 'new-file.txt')])
+        self.assertTrue(receivedEvents[0].isDirectory)
+
+    def test_watchDirectory_movedSubdirectory(self):
+        FileChangeEvent = mypycommons.file.FileChangeEvent
+        subDirPath = mypycommons.file.joinPaths(self.testDirectory, 'foo')
+        renamedDirPath = mypycommons.file.joinPaths(self.testDirectory, 'renamed')
+        outsideDirPath = mypycommons.file.joinPaths(self.helper.testTempDir, 'outside')
+        mypycommons.file.createDirectory(outsideDirPath)
+
+        def getAllEvents(watcher, timeoutSeconds=5):
+            events = watcher.getEvents(timeoutSeconds=timeoutSeconds)
+            while (True):
+                moreEvents = watcher.getEvents(timeoutSeconds=0.5)
+                if (not moreEvents):
+                    return events
+                events += moreEvents
+
+        with mypycommons.file.watchDirectory(self.testDirectory, debounceSeconds=0.05) as watcher:
+            # the events are read after both changes, so the file is created in the already renamed dir
+            os.rename(subDirPath, renamedDirPath)
+            mypycommons.file.writeToFile(mypycommons.file.joinPaths(renamedDirPath, 'late.txt'), 'late')
+            events = getAllEvents(watcher)
+
+            createdPaths = [event.path for event in events if (event.eventType == FileChangeEvent.CREATED)]
+            self.assertIn(mypycommons.file.joinPaths(renamedDirPath, 'late.txt'), createdPaths)
+            self.assertNotIn(mypycommons.file.joinPaths(subDirPath, 'late.txt'), createdPaths)
+
+            # changes in the dir moved out of the root are not reported
+            movedDirPath = mypycommons.file.joinPaths(outsideDirPath, 'moved')
+            os.rename(renamedDirPath, movedDirPath)
+            events = getAllEvents(watcher)
+            mypycommons.file.writeToFile(mypycommons.file.joinPaths(movedDirPath, 'outside.txt'), 'outside')
+            events += getAllEvents(watcher, timeoutSeconds=0.5)
+
+        self.assertIn(FileChangeEvent(FileChangeEvent.DELETED, renamedDirPath, isDirectory=True), events)
+        self.assertFalse([event for event in events if (event.path.endswith('outside.txt'))], watcher.backendName)
+
+    def test_followFile(self):
+        logFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'follow.log')
+        checkpointFilepath = logFilepath + '.checkpoint'
+        mypycommons.file.writeToFile(logFilepath, ['line 1', 'line 2'])
+
+        lines = list(mypycommons.file.followFile(logFilepath, idleTimeoutSeconds=0))
+        self.assertEqual(lines, [])
+
+        lines = list(mypycommons.file.followFile(logFilepath, fromStart=True, checkpointFilepath=checkpointFilepath, idleTimeoutSeconds=0))
+        self.assertEqual(lines, ['line 1', 'line 2'])
+
+        # resumes from the checkpoint
+        mypycommons.file.writeToFile(logFilepath, ['line 3', 'line 4'], append=True)
+        follower = mypycommons.file.followFile(logFilepath, fromStart=True, checkpointFilepath=checkpointFilepath, idleTimeoutSeconds=0)
+        self.assertEqual(next(follower), 'line 3')
+        follower.close()
+
+        follower = mypycommons.file.followFile(logFilepath, checkpointFilepath=checkpointFilepath, pollIntervalSeconds=0.01, idleTimeoutSeconds=0.1)
+        self.assertEqual(next(follower), 'line 4')
+
+        # rotation: the rest of the old file is read, then the new file from its start
+        mypycommons.file.renamePath(logFilepath, 'follow.log.1')
+        mypycommons.file.writeToFile(logFilepath + '.1', 'line 5', append=True)
+        mypycommons.file.writeToFile(logFilepath, ['line 6', 'line 7'])
+        self.assertEqual(list(follower), ['line 5', 'line 6', 'line 7'])
+
+        # truncation
+        mypycommons.file.writeToFile(logFilepath, 'line 8')
+        lines = list(mypycommons.file.followFile(logFilepath, checkpointFilepath=checkpointFilepath, idleTimeoutSeconds=0))
+        self.assertEqual(lines, ['line 8'])
+
+    def test_compressedFiles(self):
+        testLines = ['line 1', 'line 2', 'ünïcode line']
+        testJson = { 'a': [1, 2, 3], 'b': 'c' }
+        testCSV = ['# comment line', 'name,size', 'a.txt,10', '', 'b.txt,20']
+
+        for compression, extension, magicBytes in [('gzip', '.gz', b'\x1f\x8b'), ('bz2', '.bz2', b'BZh'), ('xz', '.xz', b'\xfd7zXZ')]:
+            textFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'lines.txt' + extension)
+            mypycommons.file.writeToFile(textFilepath, testLines[:2], compression='auto')
+            mypycommons.file.writeToFile(textFilepath, testLines[2], append=True, compression=compression)
+
+            with open(textFilepath, 'rb') as f:
+                self.assertEqual(f.read(len(magicBytes)), magicBytes)
+            self.assertEqual(mypycommons.file.readFile(textFilepath), testLines)
+
+            # detection is by content, not extension
+            jsonFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, compression + '.json')
+            mypycommons.file.writeJsonFile(jsonFilepath, testJson, compression=compression)
+            self.assertEqual(mypycommons.file.readJsonFile(jsonFilepath), testJson)
+
+            csvFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, compression + '.csv')
+            mypycommons.file.writeToFile(csvFilepath, testCSV, compression=compression)
+            self.assertEqual(mypycommons.file.readCSVFile(csvFilepath), [{ 'name': 'a.txt', 'size': '10' }, { 'name': 'b.txt', 'size': '20' }])
+
+        plainFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'plain.gz')
+        mypycommons.file.writeToFile(plainFilepath, testLines)
+        self.assertEqual(mypycommons.file.readFile(plainFilepath), testLines)
+
+        # plain text files starting like a compressed file are read as text
+        for firstLine in ['BZh', 'BZh91AY&SY but not bz2', '\x1f\x8b', '\x1f\x8b\x08 not gzip']:
+            plainFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'plain.txt')
+            with open(plainFilepath, 'w', encoding='latin-1') as plainFile:
+                plainFile.write('\n'.join([firstLine, 'line 1', 'line 2']))
+            self.assertEqual(mypycommons.file.readFile(plainFilepath, encoding='latin-1'), [firstLine, 'line 1', 'line 2'])
+
+        plainCSVFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'plain.csv')
+        mypycommons.file.writeToFile(plainCSVFilepath, ['BZh,size', 'a.txt,10'])
+        self.assertEqual(mypycommons.file.readCSVFile(plainCSVFilepath), [{ 'BZh': 'a.txt', 'size': '10' }])
+
+        with self.assertRaises(ValueError):
+            mypycommons.file.writeToFile(plainFilepath, testLines, compression='zip')
+
+    def test_writeCSVFile(self):
+        csvFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'output.csv')
+        rows = [{ 'name': 'a.txt', 'size': '10' }, { 'name': '#not a comment', 'size': '20' }, { 'name': 'c, "quoted"', 'size': '' }]
+
+        mypycommons.file.writeCSVFile(csvFilepath, rows)
+        self.assertEqual(mypycommons.file.readCSVFile(csvFilepath), rows)
+
+        # tuple rows and column batches, appended with the header of the existing file
+        with mypycommons.file.CSVFileWriter(csvFilepath, append=True, bufferSizeBytes=64) as writer:
+            writer.writeComment("appended rows")
+            writer.writeRow(('d.txt', 40))
+            writer.writeColumns({ 'name': ['e{}.txt'.format(i) for i in range(100)], 'size': list(range(100)) })
+            writer.writeRow({ 'name': 'f.txt' })
+
+        readRows = mypycommons.file.readCSVFile(csvFilepath)
+        self.assertEqual(len(readRows), 3 + 1 + 100 + 1)
+        self.assertEqual(readRows[3], { 'name': 'd.txt', 'size': '40' })
+        self.assertEqual(readRows[-2], { 'name': 'e99.txt', 'size': '99' })
+        self.assertEqual(readRows[-1], { 'name': 'f.txt', 'size': '' })
+
+        with self.assertRaises(ValueError):
+            mypycommons.file.CSVFileWriter(csvFilepath, ['other'], append=True)
+        with self.assertRaises(ValueError):
+            mypycommons.file.writeCSVFile(csvFilepath, [('a', 1)])
+        with self.assertRaises(ValueError):
+            mypycommons.file.writeCSVFile(csvFilepath, [{ 'name': 'a' }, { 'other': 'b' }])
+
+        # appending to a file without a final line break
+        noLineBreakFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'no-line-break.csv')
+        with open(noLineBreakFilepath, 'w') as outputFile:
+            outputFile.write('name,size\na.txt,10')
+        mypycommons.file.writeCSVFile(noLineBreakFilepath, [('b.txt', 20)], append=True)
+        self.assertEqual(mypycommons.file.readCSVFile(noLineBreakFilepath), [{ 'name': 'a.txt', 'size': '10' }, { 'name': 'b.txt', 'size': '20' }])
+
+        # a failed atomic write leaves the existing file unchanged
+        mypycommons.file.writeCSVFile(csvFilepath, rows)
+        with self.assertRaises(ValueError):
+            mypycommons.file.writeCSVFile(csvFilepath, [{ 'name': 'a' }, { 'other': 'b' }], atomic=True)
+        self.assertEqual(mypycommons.file.readCSVFile(csvFilepath), rows)
+        self.assertFalse([name for name in os.listdir(self.helper.testTempDir) if name.endswith('.tmp')])
+
+        with self.assertRaises(ValueError):
+            mypycommons.file.writeCSVFile(csvFilepath, rows, append=True, atomic=True)
+
+        # single column files keep blank values, compressed files round-trip too
+        singleColumnFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'single.csv.gz')
+        columns = { 'value': ['x', '', '  ', '# y'] }
+        mypycommons.file.writeCSVFile(singleColumnFilepath, columns, compression='auto')
+        self.assertEqual([row['value'] for row in mypycommons.file.readCSVFile(singleColumnFilepath)], columns['value'])
+
+        # appending to a compressed file keeps its compression
+        mypycommons.file.writeCSVFile(singleColumnFilepath, [('b,',)], append=True)
+        self.assertEqual([row['value'] for row in mypycommons.file.readCSVFile(singleColumnFilepath)], columns['value'] + ['b,'])
+        with self.assertRaises(ValueError):
+            mypycommons.file.writeCSVFile(singleColumnFilepath, [('c',)], append=True, compression='bz2')
+        with self.assertRaises(ValueError):
+            mypycommons.file.writeCSVFile(csvFilepath, [('c', 1)], append=True, compression='gzip')
+
+    def test_sortFileLines(self):
+        randomGen = random.Random(1234)
+        testLines = [str(randomGen.randrange(2000)) for i in range(5000)] + ['', 'x y', 'x y']
+        inputFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'unsorted.txt')
+        outputFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'sorted.txt')
+        mypycommons.file.writeToFile(inputFilepath, testLines, compression='gzip')
+
+        lineCount = mypycommons.file.sortFileLines(inputFilepath, outputFilepath, maxRunBytes=4096)
+        self.assertEqual(lineCount, len(testLines))
+        self.assertEqual(mypycommons.file.readFile(outputFilepath), sorted(testLines))
+
+        numberLines = testLines[:5000]
+        mypycommons.file.writeToFile(inputFilepath, numberLines)
+        mypycommons.file.sortFileLines(inputFilepath, outputFilepath, keyFunc=int, reverse=True, unique=True, maxRunBytes=4096, 
+                                       numProcesses=2, compressSpillFiles=True, maxMergeFiles=4)
+        expected = sorted(set(numberLines), key=int, reverse=True)
+        self.assertEqual(mypycommons.file.readFile(outputFilepath), expected)
+
+        # sorting in place
+        mypycommons.file.sortFileLines(inputFilepath, inputFilepath, keyFunc=len)
+        self.assertEqual(mypycommons.file.readFile(inputFilepath), sorted(numberLines, key=len))
+
+    def test_searchFiles(self):
+        binaryFilepath = mypycommons.file.joinPaths(self.testDirectory, 'binary.dat')
+        with open(binaryFilepath, 'wb') as binaryFile:
+            binaryFile.write(b'asdfghjkl\0\1\2')
+        mypycommons.file.writeToFile(self.testFilePath, ['x', 'ASDFGHJKL again'], append=True)
+
+        for numWorkers, useProcesses in [(1, False), (None, False), (2, True)]:
+            results = list(mypycommons.file.searchFiles(self.testDirectory, 'asdfghjkl', numWorkers=numWorkers, useProcesses=useProcesses))
+            self.assertEqual(len(results), 11)
+            for filepath, lineNumber, line in results:
+                self.assertEqual((lineNumber, line), (3, "asdfghjkl;'"))
+
+        results = sorted(mypycommons.file.searchFiles(self.testDirectory, 'ASDF', ignoreCase=True, fileExt='.txt'))
+        testFileResults = [result for result in results if (result[0] == self.testFilePath)]
+        self.assertEqual([lineNumber for filepath, lineNumber, line in testFileResults], [3, 5])
+        self.assertTrue(all(filepath.endswith('.txt') for filepath, lineNumber, line in results))
+
+        results = list(mypycommons.file.searchFiles(self.testDirectory, r'^\d+$', isRegex=True, fileExt=['.log']))
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(line == '1234567890' for filepath, lineNumber, line in results))
+
+        results = list(mypycommons.file.searchFiles(self.testDirectory, 'asdfghjkl', skipBinaryFiles=False))
+        self.assertIn(binaryFilepath, [filepath for filepath, lineNumber, line in results])
+
+    def test_atomicWrites(self):
+        outputPath = mypycommons.file.joinPaths(self.helper.testTempDir, 'atomic.txt')
+        mypycommons.file.writeToFile(outputPath, ['a', 'b'], atomic=True, durability='full')
+        self.assertEqual(mypycommons.file.readFile(outputPath), ['a', 'b'])
+        os.chmod(outputPath, 0o640)
+
+        # a failed write leaves the old file and no temp files behind
+        with self.assertRaises(RuntimeError):
+            with mypycommons.file.atomicWriteFile(outputPath) as outputFile:
+                outputFile.write('torn')
+                raise RuntimeError()
+        self.assertEqual(mypycommons.file.readFile(outputPath), ['a', 'b'])
+        self.assertEqual(os.listdir(self.helper.testTempDir).count('atomic.txt'), 1)
+        self.assertFalse([name for name in os.listdir(self.helper.testTempDir) if name.endswith('.tmp')])
+
+        # all the compressed data is in the temp file when it is synced
+        syncedSizes = []
+        realFsync = os.fsync
+        def recordingFsync(fileDescriptor):
+            syncedSizes.append(os.fstat(fileDescriptor).st_size)
+            realFsync(fileDescriptor)
+
+        with unittest.mock.patch('os.fsync', recordingFsync):
+            with mypycommons.file.atomicWriteFile(outputPath, 'wb', compression='gzip') as outputFile:
+                outputFile.write(b'c\n')
+        self.assertEqual(mypycommons.file.readFile(outputPath), ['c'])
+        self.assertEqual(syncedSizes, [os.path.getsize(outputPath)])
+        self.assertEqual(os.stat(outputPath).st_mode & 0o777, 0o640)
+
+        with self.assertRaises(ValueError):
+            mypycommons.file.writeToFile(outputPath, 'x', append=True, atomic=True)
+
+        for atomic in [False, True]:
+            jsonPath = mypycommons.file.joinPaths(self.helper.testTempDir, 'atomic-{}.json'.format(atomic))
+            mypycommons.file.writeJsonFile(jsonPath, {'a': 1}, atomic=atomic, durability='file')
+            with self.assertRaises(ValueError):
+                mypycommons.file.writeJsonFile(jsonPath, {'a': 2}, atomic=atomic)
+            self.assertEqual(mypycommons.file.readJsonFile(jsonPath), {'a': 1})
+
+    def test_atomicWriteBatch(self):
+        outputPaths = [mypycommons.file.joinPaths(self.helper.testTempDir, 'batch-{}.txt'.format(i)) for i in range(20)]
+
+        with mypycommons.file.AtomicWriteBatch() as batch:
+            for i, outputPath in enumerate(outputPaths):
+                mypycommons.file.writeToFile(outputPath, str(i), durability='full', batch=batch)
+            self.assertFalse(any(mypycommons.file.pathExists(outputPath) for outputPath in outputPaths))
+
+        for i, outputPath in enumerate(outputPaths):
+            self.assertEqual(mypycommons.file.readFile(outputPath), [str(i)])
+
+        with self.assertRaises(RuntimeError):
+            with mypycommons.file.AtomicWriteBatch() as batch:
+                mypycommons.file.writeToFile(outputPaths[0], 'changed', batch=batch)
+                raise RuntimeError()
+        self.assertEqual(mypycommons.file.readFile(outputPaths[0]), ['0'])
+        self.assertEqual(len(os.listdir(self.helper.testTempDir)), len(outputPaths) + 1)
+
+    def test_movePaths(self):
+        sourceDir = mypycommons.file.joinPaths(self.helper.testTempDir, 'move-source')
+        mypycommons.file.createDirectory(sourceDir)
+        sourcePaths = [mypycommons.file.joinPaths(sourceDir, 'file-{}.txt'.format(i)) for i in range(50)]
+        for i, sourcePath in enumerate(sourcePaths):
+            mypycommons.file.writeToFile(sourcePath, str(i))
+
+        destDir = mypycommons.file.joinPaths(self.helper.testTempDir, 'move-dest')
+        plan = [(sourcePath, mypycommons.file.joinPaths(destDir, 'sub/{}'.format(mypycommons.file.getFilename(sourcePath)))) for sourcePath in sourcePaths]
+        # a chain: test-file.txt replaces test-file2.txt, which is moved away first
+        plan.append((mypycommons.file.joinPaths(self.testDirectory, 'test-file2.txt'), mypycommons.file.joinPaths(destDir, 'file2.txt')))
+        plan.append((self.testFilePath, mypycommons.file.joinPaths(self.testDirectory, 'test-file2.txt')))
+        plan.append((self.testDirectory, self.testDirectory))
+
+        result = mypycommons.file.movePaths(plan)
+        self.assertEqual((result.renamedCount, result.copiedCount, result.skippedCount), (52, 0, 1))
+        self.assertFalse(mypycommons.file.pathExists(self.testFilePath))
+        for i, sourcePath in enumerate(sourcePaths):
+            self.assertFalse(mypycommons.file.pathExists(sourcePath))
+            self.assertEqual(mypycommons.file.readFile(plan[i][1]), [str(i)])
+
+        result = mypycommons.file.renamePaths([(mypycommons.file.joinPaths(destDir, 'file2.txt'), 'renamed.txt'), (mypycommons.file.joinPaths(destDir, 'sub'), 'renamed-dir')])
+        self.assertEqual(result.renamedCount, 2)
+        self.assertTrue(mypycommons.file.isFile(mypycommons.file.joinPaths(destDir, 'renamed.txt')))
+        self.assertTrue(mypycommons.file.isDirectory(mypycommons.file.joinPaths(destDir, 'renamed-dir')))
+
+    def test_movePaths_planErrors(self):
+        testFile2Path = mypycommons.file.joinPaths(self.testDirectory, 'test-file2.txt')
+        outsideFilePath = mypycommons.file.joinPaths(self.helper.testTempDir, 'outside.txt')
+        mypycommons.file.writeToFile(outsideFilePath, 'outside')
+        newDir = mypycommons.file.joinPaths(self.helper.testTempDir, 'new')
+        invalidPlans = [
+            [(self.testFilePath, testFile2Path)],
+            [(self.testFilePath, testFile2Path), (testFile2Path, self.testFilePath)],
+            [(self.testFilePath, 'a.txt'), (self.testFilePath, 'b.txt')],
+            [(self.testFilePath, 'a.txt'), (testFile2Path, 'a.txt')],
+            [(mypycommons.file.joinPaths(self.testDirectory, 'missing.txt'), 'a.txt')],
+            [(self.testDirectory, mypycommons.file.joinPaths(self.testDirectory, 'bar/moved'))],
+            [(self.testDirectory, 'moved-dir'), (self.testFilePath, 'moved.txt')],
+            # a destination inside the destination of another move
+            [(self.testDirectory, mypycommons.file.joinPaths(newDir, 'moved-dir')), (outsideFilePath, mypycommons.file.joinPaths(newDir, 'moved-dir/f.txt'))]
+        ]
+
+        for plan in invalidPlans:
+            with self.assertRaises(mypycommons.file.MovePlanError):
+                mypycommons.file.movePaths(plan)
+            # nothing was moved
+            self.assertTrue(mypycommons.file.isFile(self.testFilePath))
+            self.assertTrue(mypycommons.file.isFile(testFile2Path))
+            self.assertTrue(mypycommons.file.isFile(outsideFilePath))
+            # no directory is created while planning
+            self.assertFalse(mypycommons.file.pathExists(newDir))
+
+        with self.assertRaises(ValueError):
+            mypycommons.file.renamePaths([(self.testFilePath, 'bar/x.txt')])
+
+        testFileLines = mypycommons.file.readFile(self.testFilePath)
+        mypycommons.file.movePaths([(self.testFilePath, testFile2Path)], overwrite=True)
+        self.assertEqual(mypycommons.file.readFile(testFile2Path), testFileLines)
+
+    @unittest.skipUnless(os.path.isdir('/dev/shm') and os.stat('/dev/shm').st_dev != os.stat(os.path.dirname(os.path.realpath(__file__))).st_dev,
+                         "requires /dev/shm on another file system")
+    def test_movePaths_acrossDevices(self):
+        import tempfile
+
+        otherDeviceDir = tempfile.mkdtemp(dir='/dev/shm')
+        try:
+            expectedFilepaths = mypycommons.file.getChildPathsRecursive(self.testDirectory, pathType='file')
+            testFileLines = mypycommons.file.readFile(self.testFilePath)
+            plan = [(self.testDirectory, mypycommons.file.joinPaths(otherDeviceDir, 'moved-dir'))]
+            for i in range(10):
+                filepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'file-{}.bin'.format(i))
+                with open(filepath, 'wb') as outputFile:
+                    outputFile.write(os.urandom(100000))
+                plan.append((filepath, mypycommons.file.joinPaths(otherDeviceDir, 'files/file-{}.bin'.format(i))))
+
+            result = mypycommons.file.movePaths(plan, numWorkers=4)
+            self.assertEqual((result.renamedCount, result.copiedCount), (0, 11))
+            self.assertFalse(mypycommons.file.pathExists(self.testDirectory))
+
+            movedFilepaths = mypycommons.file.getChildPathsRecursive(mypycommons.file.joinPaths(otherDeviceDir, 'moved-dir'), pathType='file')
+            self.assertEqual(len(movedFilepaths), len(expectedFilepaths))
+            self.assertEqual(mypycommons.file.readFile(mypycommons.file.joinPaths(otherDeviceDir, 'moved-dir/test-file.txt')), testFileLines)
+            self.assertEqual(sorted(os.listdir(mypycommons.file.joinPaths(otherDeviceDir, 'files'))), sorted('file-{}.bin'.format(i) for i in range(10)))
+        finally:
+            mypycommons.file.deletePath(otherDeviceDir)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,51 @@
+import os
+import sys
+import subprocess
+import unittest
+
+# Add project root to PYTHONPATH so MLU modules can be imported
+scriptPath = os.path.dirname(os.path.realpath(__file__))
+projectRoot = os.path.abspath(os.path.join(scriptPath ,".."))
+sys.path.insert(0, projectRoot)
+
+from com.nwrobel import mypycommons
+
+# Modules that must only be imported when a function needing them is called
+LAZY_IMPORTED_MODULES = ['csv', 'json', 'subprocess', 'inspect', 'shutil', 'pathlib', 'gzip', 'socket', 'random', 'pytimeparse']
+
+def getModulesImportedBy(importStatement):
+    '''
+    Runs the given import statement in a new interpreter with "-X importtime" and returns the names
+    of all the modules that were imported.
+    '''
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', importStatement], cwd=projectRoot, capture_output=True, text=True, check=True)
+
+    importedModules = []
+    for line in result.stderr.splitlines():
+        if (line.startswith('import time:') and 'self [us]' not in line):
+            importedModules.append(line.split('|')[-1].strip())
+
+    return importedModules
+
+class Import_ModuleTest(unittest.TestCase):
+    def test_moduleImportsAreLazy(self):
+        for moduleName in ['aio', 'archive', 'display', 'file', 'instrumentation', 'logger', 'system', 'time', 'utils']:
+            importedModules = getModulesImportedBy("import com.nwrobel.mypycommons.{}".format(moduleName))
+            self.assertIn("com.nwrobel.mypycommons.{}".format(moduleName), importedModules)
+
+            for lazyModuleName in LAZY_IMPORTED_MODULES:
+                self.assertNotIn(lazyModuleName, importedModules, "importing {} imported {}".format(moduleName, lazyModuleName))
+
+    def test_packageImportIsLazy(self):
+        importedModules = getModulesImportedBy("from com.nwrobel import mypycommons")
+        self.assertFalse([name for name in importedModules if name.startswith('com.nwrobel.mypycommons.')])
+
+    def test_packageLazyAttributes(self):
+        self.assertEqual(mypycommons.utils.getListDupes([1, 1]), {1})
+        self.assertIn('file', dir(mypycommons))
+
+        with self.assertRaises(AttributeError):
+            mypycommons.notAModule
+
+if __name__ == '__main__':
+    unittest.main()
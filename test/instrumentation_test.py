@@ -0,0 +1,143 @@
+import os
+import sys
+import time
+import unittest
+
+# Add project root to PYTHONPATH so MLU modules can be imported
+scriptPath = os.path.dirname(os.path.realpath(__file__))
+projectRoot = os.path.abspath(os.path.join(scriptPath ,".."))
+sys.path.insert(0, projectRoot)
+
+from com.nwrobel import mypycommons
+import com.nwrobel.mypycommons.archive
+import com.nwrobel.mypycommons.file
+import com.nwrobel.mypycommons.instrumentation
+import com.nwrobel.mypycommons.logger
+
+import common
+
+class Instrumentation_ModuleTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.helper = common.TestHelper()
+
+    def setUp(self):
+        self.helper.copyDataToTestTempDir('test-dir')
+        self.testDirectory = mypycommons.file.joinPaths(self.helper.testTempDir, 'test-dir')
+        mypycommons.instrumentation.resetInstrumentationStats()
+
+    def tearDown(self):
+        mypycommons.instrumentation.stopInstrumentationLogging()
+        mypycommons.instrumentation.disableInstrumentation()
+        self.helper.cleanup()
+
+    def test_enableAndDisable(self):
+        originalReadFile = mypycommons.file.readFile
+        originalOpen = open
+
+        mypycommons.instrumentation.enableInstrumentation()
+        self.assertTrue(mypycommons.instrumentation.isInstrumentationEnabled())
+        self.assertIsNot(mypycommons.file.readFile, originalReadFile)
+        self.assertIs(mypycommons.file.readFile.__wrapped__, originalReadFile)
+
+        mypycommons.instrumentation.disableInstrumentation()
+        self.assertFalse(mypycommons.instrumentation.isInstrumentationEnabled())
+        self.assertIs(mypycommons.file.readFile, originalReadFile)
+        self.assertIs(open, originalOpen)
+
+        # functions patched by someone else after enabling are left in place
+        mypycommons.instrumentation.enableInstrumentation()
+        def otherStat(*args, **kwargs):
+            return originalStat(*args, **kwargs)
+        originalStat = os.stat.__wrapped__
+        os.stat = otherStat
+        try:
+            mypycommons.instrumentation.disableInstrumentation()
+            self.assertIs(os.stat, otherStat)
+            self.assertIs(open, originalOpen)
+        finally:
+            os.stat = originalStat
+
+        # nothing is recorded while disabled
+        mypycommons.file.readFile(mypycommons.file.joinPaths(self.testDirectory, 'raw.txt'))
+        self.assertEqual(mypycommons.instrumentation.getInstrumentationStats(), {})
+
+    def test_fileStats(self):
+        outputFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'output.txt')
+        outputLines = ['line {}'.format(i) for i in range(1000)]
+
+        mypycommons.instrumentation.enableInstrumentation()
+        mypycommons.file.writeToFile(outputFilepath, outputLines)
+        for i in range(3):
+            self.assertEqual(mypycommons.file.readFile(outputFilepath), outputLines)
+
+        with self.assertRaises(Exception):
+            mypycommons.file.readFile(mypycommons.file.joinPaths(self.helper.testTempDir, 'missing.txt'))
+
+        stats = mypycommons.instrumentation.getInstrumentationStats()
+        fileSize = os.path.getsize(outputFilepath)
+
+        self.assertEqual(stats['file.readFile']['calls'], 4)
+        self.assertEqual(stats['file.readFile']['errors'], 1)
+        self.assertEqual(stats['file.readFile']['openCalls'], 4)
+        self.assertEqual(stats['file.writeToFile']['calls'], 1)
+        self.assertGreater(stats['file.readFile']['totalSeconds'], 0)
+
+        if (os.path.exists('/proc/thread-self/io')):
+            self.assertGreaterEqual(stats['file.readFile']['bytesRead'], 3 * fileSize)
+            self.assertGreaterEqual(stats['file.writeToFile']['bytesWritten'], fileSize)
+
+        mypycommons.instrumentation.resetInstrumentationStats()
+        self.assertEqual(mypycommons.instrumentation.getInstrumentationStats(), {})
+
+    def test_nestedCallsAndGenerators(self):
+        mypycommons.instrumentation.enableInstrumentation()
+        filepaths = mypycommons.file.getChildPathsRecursive(self.testDirectory, pathType='file')
+        matches = list(mypycommons.file.searchFiles(self.testDirectory, 'qwertyuiop', numWorkers=1))
+
+        stats = mypycommons.instrumentation.getInstrumentationStats()
+        self.assertEqual(stats['file.getChildPathsRecursive']['calls'], 1)
+        self.assertEqual(stats['file.searchFiles']['calls'], 1)
+        self.assertTrue(matches)
+
+        # the stat calls of the files found are counted
+        self.assertGreaterEqual(stats['file.getChildPathsRecursive']['statCalls'], len(filepaths))
+
+        # the path probing helpers are recorded too
+        isFileCalls = stats['file._isFile']['calls']
+        self.assertTrue(mypycommons.file.isFile(filepaths[0]))
+        stats = mypycommons.instrumentation.getInstrumentationStats()
+        self.assertEqual(stats['file._isFile']['calls'], isFileCalls + 1)
+        self.assertGreaterEqual(stats['file._scanDirectoryPaths']['calls'], 1)
+
+    def test_archiveStats(self):
+        archiveFilepath = mypycommons.file.joinPaths(self.helper.testTempDir, 'archive.tar.gz')
+
+        mypycommons.instrumentation.enableInstrumentation()
+        mypycommons.archive.createIndexedGzipArchive(self.testDirectory, archiveFilepath)
+        memberNames = mypycommons.archive.listArchiveMembers(archiveFilepath)
+
+        stats = mypycommons.instrumentation.getInstrumentationStats()
+        self.assertEqual(stats['archive.createIndexedGzipArchive']['calls'], 1)
+        self.assertEqual(stats['archive.listArchiveMembers']['calls'], 1)
+        self.assertIn('archive.loadArchiveIndex', stats)
+        self.assertTrue(memberNames)
+
+    def test_periodicLogging(self):
+        loggerWrapper = mypycommons.logger.CommonLogger('instrumentationlogger', logDir=self.helper.testTempDir, logFilename='instrumentation.log')
+        loggerWrapper.setConsoleOutputLogLevel(mypycommons.logger.LogLevel.ERROR)
+
+        mypycommons.instrumentation.enableInstrumentation(['file'])
+        mypycommons.file.readFile(mypycommons.file.joinPaths(self.testDirectory, 'raw.txt'))
+        mypycommons.instrumentation.startInstrumentationLogging(loggerWrapper, intervalSeconds=0.05)
+        time.sleep(0.3)
+        mypycommons.instrumentation.stopInstrumentationLogging()
+
+        for handler in loggerWrapper.getLogger().handlers:
+            handler.flush()
+
+        with open(loggerWrapper.logFilepath, encoding='utf-8') as logFile:
+            self.assertIn('I/O [file.readFile]: calls=1', logFile.read())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 
 # Add project root to PYTHONPATH so MLU modules can be imported
 scriptPath = os.path.dirname(os.path.realpath(__file__))
@@ -38,5 +39,98 @@ class Logger_ModuleTest(unittest.TestCase):
 
         self.assertTrue(mypycommons.file.pathExists(loggerWrapper.logFilepath))
 
+    def test_logger_rateLimit(self):
+        loggerWrapper = mypycommons.logger.CommonLogger("ratelimitlogger", logDir=self.tempDir, logFilename='ratelimit.log')
+        loggerWrapper.setConsoleOutputLogLevel(mypycommons.logger.LogLevel.ERROR)
+        loggerWrapper.setFileOutputRateLimit(maxMessages=5, perSeconds=60, summaryIntervalSeconds=60)
+        logger = loggerWrapper.getLogger()
+
+        for i in range(100):
+            logger.info("message {}".format(i))
+        loggerWrapper.flushSuppressedSummaries()
+
+        logLines = mypycommons.file.readFile(loggerWrapper.logFilepath)
+        self.assertEqual(len(logLines), 6)
+        self.assertIn("95 log messages were suppressed", logLines[-1])
+
+    def test_logger_duplicateSuppression(self):
+        loggerWrapper = mypycommons.logger.CommonLogger("deduplogger", logDir=self.tempDir, logFilename='dedup.log')
+        loggerWrapper.setConsoleOutputLogLevel(mypycommons.logger.LogLevel.ERROR)
+        loggerWrapper.setFileOutputDuplicateSuppression(summaryIntervalSeconds=60)
+        logger = loggerWrapper.getLogger()
+
+        for i in range(50):
+            logger.info("connection failed")
+        logger.info("other message")
+        loggerWrapper.flushSuppressedSummaries()
+
+        logLines = mypycommons.file.readFile(loggerWrapper.logFilepath)
+        self.assertEqual(len(logLines), 3)
+        self.assertIn("repeated 49 more times: connection failed", logLines[-1])
+
+    def test_logger_duplicateSuppression_quietStream(self):
+        loggerWrapper = mypycommons.logger.CommonLogger("quietlogger", logDir=self.tempDir, logFilename='quiet.log')
+        loggerWrapper.setConsoleOutputLogLevel(mypycommons.logger.LogLevel.ERROR)
+        loggerWrapper.setFileOutputDuplicateSuppression(summaryIntervalSeconds=0.2)
+        logger = loggerWrapper.getLogger()
+
+        # the summary is logged after the interval even though nothing else is logged
+        for i in range(1000):
+            logger.error("dependency failed")
+        time.sleep(0.6)
+
+        logLines = mypycommons.file.readFile(loggerWrapper.logFilepath)
+        self.assertEqual(len(logLines), 2)
+        self.assertIn("repeated 999 more times: dependency failed", logLines[-1])
+        loggerWrapper.clearOutputFilters()
+
+    def test_logger_suppressedSummaryAtExit(self):
+        import subprocess
+
+        logFilename = 'exit.log'
+        script = '''
+import sys
+sys.path.insert(0, {!r})
+from com.nwrobel import mypycommons
+import com.nwrobel.mypycommons.logger
+
+loggerWrapper = mypycommons.logger.CommonLogger("exitlogger", logDir={!r}, logFilename={!r})
+loggerWrapper.setConsoleOutputLogLevel(mypycommons.logger.LogLevel.ERROR)
+loggerWrapper.setFileOutputDuplicateSuppression(summaryIntervalSeconds=60)
+for i in range(10):
+    loggerWrapper.getLogger().error("dependency failed")
+'''.format(projectRoot, self.tempDir, logFilename)
+        subprocess.run([sys.executable, '-c', script], check=True)
+
+        logLines = mypycommons.file.readFile(mypycommons.file.joinPaths(self.tempDir, logFilename))
+        self.assertEqual(len(logLines), 2)
+        self.assertIn("repeated 9 more times: dependency failed", logLines[-1])
+
+    def test_suppressingFilter_abstract(self):
+        class IncompleteFilter(mypycommons.logger.SuppressingFilter):
+            def _shouldLog(self, record, now):
+                return True
+
+        with self.assertRaises(TypeError):
+            IncompleteFilter(None, 10.0)
+
+    def test_logger_sampling(self):
+        loggerWrapper = mypycommons.logger.CommonLogger("samplinglogger", logDir=self.tempDir, logFilename='sampling.log')
+        loggerWrapper.setConsoleOutputLogLevel(mypycommons.logger.LogLevel.ERROR)
+        loggerWrapper.setFileOutputSampling({ mypycommons.logger.LogLevel.INFO: 0.0 }, summaryIntervalSeconds=60)
+        logger = loggerWrapper.getLogger()
+
+        for i in range(20):
+            logger.info("sampled message")
+        logger.warning("unsampled message")
+        loggerWrapper.clearOutputFilters()
+        logger.info("unfiltered message")
+
+        logLines = mypycommons.file.readFile(loggerWrapper.logFilepath)
+        self.assertEqual(len(logLines), 3)
+        self.assertIn("unsampled message", logLines[0])
+        self.assertIn("Sampling dropped 20 INFO log messages", logLines[1])
+        self.assertIn("unfiltered message", logLines[2])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import time
+import unittest
+import unittest.mock
+
+# Add project root to PYTHONPATH so MLU modules can be imported
+scriptPath = os.path.dirname(os.path.realpath(__file__))
+projectRoot = os.path.abspath(os.path.join(scriptPath ,".."))
+sys.path.insert(0, projectRoot)
+
+from com.nwrobel import mypycommons
+import com.nwrobel.mypycommons.file
+import com.nwrobel.mypycommons.logger
+import com.nwrobel.mypycommons.system
+
+import common
+
+class System_ModuleTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.helper = common.TestHelper()
+
+    @classmethod
+    def tearDownClass(self):
+        self.helper.cleanup()
+
+    def test_thisMachineIsWindowsOS(self):
+        self.assertEqual(mypycommons.system.thisMachineIsWindowsOS(), os.name == 'nt')
+
+    @unittest.skipUnless(os.path.exists('/proc/self/stat'), "requires /proc")
+    def test_resourceSample(self):
+        sampler = mypycommons.system.ResourceSampler()
+        firstSample = sampler.sampleNow()
+        sum(range(2000000))
+        secondSample = sampler.sampleNow()
+
+        self.assertGreater(firstSample.rssBytes, 0)
+        self.assertGreater(firstSample.openFds, 0)
+        self.assertIsNotNone(firstSample.loadAverage)
+        self.assertIsNone(firstSample.cpuPercent)
+        self.assertGreaterEqual(secondSample.cpuSeconds, firstSample.cpuSeconds)
+        self.assertGreaterEqual(secondSample.cpuPercent, 0)
+        self.assertGreaterEqual(secondSample.readBytes, firstSample.readBytes)
+
+        # the CPU usage interval doesn't depend on the wall clock, which can be set back
+        realTime = time.time
+        with unittest.mock.patch('time.time', side_effect=lambda: realTime() - 3600):
+            sum(range(2000000))
+            thirdSample = sampler.sampleNow()
+        self.assertGreaterEqual(thirdSample.cpuPercent, 0)
+        self.assertLess(thirdSample.timestamp, secondSample.timestamp)
+
+    @unittest.skipUnless(os.path.exists('/proc/self/stat'), "requires /proc")
+    def test_resourceSampler(self):
+        sampler = mypycommons.system.ResourceSampler(intervalSeconds=0.01, maxSamples=50)
+        with sampler:
+            self.assertTrue(sampler.isRunning())
+            with sampler.phase('allocate'):
+                data = b'x' * (32 * 1024 * 1024)
+                time.sleep(0.05)
+            with sampler.phase('idle'):
+                time.sleep(0.05)
+
+        self.assertFalse(sampler.isRunning())
+        del data
+
+        # the ring buffer keeps only the latest samples
+        samples = sampler.getSamples()
+        self.assertLessEqual(len(samples), 50)
+        self.assertEqual(samples, sorted(samples, key=lambda sample: sample.timestamp))
+
+        summary = json.loads(sampler.getSummaryJson())
+        self.assertEqual(summary['sampleCount'], len(samples))
+        self.assertEqual(set(summary['phases']), {'allocate', 'idle'})
+        self.assertGreaterEqual(summary['rssBytes']['peak'], summary['phases']['allocate']['rssBytes']['peak'])
+        self.assertGreater(summary['phases']['allocate']['rssBytes']['peak'], 32 * 1024 * 1024)
+        self.assertEqual(len(json.loads(sampler.getSamplesJson())), len(samples))
+
+        loggerWrapper = mypycommons.logger.CommonLogger('systemlogger', logDir=self.helper.testTempDir, logFilename='system.log')
+        loggerWrapper.setConsoleOutputLogLevel(mypycommons.logger.LogLevel.ERROR)
+        sampler.logSummary(loggerWrapper)
+        for handler in loggerWrapper.getLogger().handlers:
+            handler.flush()
+
+        with open(loggerWrapper.logFilepath, encoding='utf-8') as logFile:
+            logText = logFile.read()
+        self.assertIn('Resources [all]', logText)
+        self.assertIn('Resources [allocate]', logText)
+
+        with self.assertRaises(ValueError):
+            mypycommons.system.ResourceSampler(intervalSeconds=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import os
 import sys
 import unittest
+from array import array
+from datetime import datetime
 
 # Add project root to PYTHONPATH so MLU modules can be imported
 scriptPath = os.path.dirname(os.path.realpath(__file__))
@@ -22,5 +24,86 @@ class Time_ModuleTest(unittest.TestCase):
         timeD = mypycommons.time.getTimedeltaFromFormattedDuration('0:03:01')
         self.assertEqual(timeD.total_seconds(), 181)
 
+    def test_getDateTimeFromFormattedTime(self):
+        testTimes = ['2012-01-27 02:29:33', '1900-01-01 00:00:00', '9999-12-31 23:59:59', '2012-1-27 2:29:33']
+        for testTime in testTimes:
+            self.assertEqual(mypycommons.time.getDateTimeFromFormattedTime(testTime), datetime.strptime(testTime, "%Y-%m-%d %H:%M:%S"))
+
+        invalidTimes = ['2012-13-27 02:29:33', '2012-01-27 24:29:33', '2012-+1-27 02:29:33', '2012-01-27T02:29:33', '2012-01-27 02:29:33.5']
+        for invalidTime in invalidTimes:
+            with self.assertRaises(ValueError):
+                mypycommons.time.getDateTimeFromFormattedTime(invalidTime)
+
+        self.assertEqual(mypycommons.time.getDateTimesFromFormattedTimes(iter(testTimes[:2])), [datetime(2012, 1, 27, 2, 29, 33), datetime(1900, 1, 1)])
+
+    def test_formatDatetimeForDisplay(self):
+        testDatetimes = [datetime(2012, 1, 27, 2, 29, 33), datetime(1000, 1, 1), datetime(9999, 12, 31, 23, 59, 59, 999999)]
+        for testDatetime in testDatetimes:
+            self.assertEqual(mypycommons.time.formatDatetimeForDisplay(testDatetime), testDatetime.strftime("%Y-%m-%d %H:%M:%S"))
+
+        self.assertEqual(mypycommons.time.formatDatetimesForDisplay(testDatetimes[:1]), ['2012-01-27 02:29:33'])
+
+    def test_areValidTimestamps(self):
+        # out of the range of datetime: 1e20, -1e20, inf and nan
+        testTimestamps = [0, 1327631373.5, -2500000000.0, 99999999999.0, 1e20, -1e20, float('inf'), float('nan'), 'x', None]
+        expected = [mypycommons.time.isValidTimestamp(timestamp) for timestamp in testTimestamps]
+
+        self.assertEqual(expected, [True, True, False, False, False, False, False, False, False, False])
+        self.assertEqual(mypycommons.time.areValidTimestamps(testTimestamps), expected)
+        self.assertEqual(mypycommons.time.areValidTimestamps(array('d', testTimestamps[:8])), expected[:8])
+
+    def test_applyDeltaSecondsToTimestamps(self):
+        self.assertEqual(mypycommons.time.applyDeltaSecondsToTimestamp(1000.5, -60), 940.5)
+        self.assertEqual(mypycommons.time.applyDeltaSecondsToTimestamps([1000.5, 0], 60), [1060.5, 60])
+
+        result = mypycommons.time.applyDeltaSecondsToTimestamps(array('d', [1000.5, 0]), 60)
+        self.assertEqual(result, array('d', [1060.5, 60]))
+
+    def test_formatTimestampsForDisplay(self):
+        testTimestamps = [0, 1327631373.9]
+        expected = [mypycommons.time.formatDatetimeForDisplay(datetime.fromtimestamp(timestamp)) for timestamp in testTimestamps]
+
+        self.assertEqual(mypycommons.time.formatTimestampsForDisplay(testTimestamps), expected)
+        self.assertEqual(mypycommons.time.formatTimestampsForDisplay(array('d', testTimestamps)), expected)
+
+    def test_stopwatch(self):
+        stopwatch = mypycommons.time.Stopwatch().start()
+        elapsedNs = stopwatch.stop()
+        self.assertGreaterEqual(elapsedNs, 0)
+        self.assertEqual(stopwatch.elapsedNanoseconds, elapsedNs)
+
+        with mypycommons.time.Stopwatch() as stopwatch:
+            pass
+        self.assertGreaterEqual(stopwatch.elapsedSeconds, 0)
+
+    def test_timed(self):
+        @mypycommons.time.timed('test-function')
+        def timedFunction(value):
+            return value * 2
+
+        mypycommons.time.resetTimingStats()
+        with mypycommons.time.timed('test-disabled'):
+            timedFunction(1)
+        self.assertEqual(mypycommons.time.getTimingStats(), {})
+
+        mypycommons.time.enableTiming()
+        try:
+            for i in range(10):
+                with mypycommons.time.timed('test-block'):
+                    self.assertEqual(timedFunction(i), i * 2)
+            with mypycommons.time.Stopwatch('test-block'):
+                pass
+        finally:
+            mypycommons.time.disableTiming()
+
+        timingStats = mypycommons.time.getTimingStats()
+        self.assertEqual(set(timingStats), {'test-function', 'test-block'})
+        self.assertEqual(timingStats['test-function']['count'], 10)
+        self.assertEqual(timingStats['test-block']['count'], 11)
+        self.assertLessEqual(timingStats['test-block']['p50Seconds'], timingStats['test-block']['maxSeconds'])
+
+        self.assertIn('test-block', mypycommons.time.getTimingStatsJson())
+        mypycommons.time.resetTimingStats()
+
 if __name__ == '__main__':
     unittest.main()
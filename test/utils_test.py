@@ -0,0 +1,226 @@
+import io
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+# Add project root to PYTHONPATH so MLU modules can be imported
+scriptPath = os.path.dirname(os.path.realpath(__file__))
+projectRoot = os.path.abspath(os.path.join(scriptPath ,".."))
+sys.path.insert(0, projectRoot)
+
+from com.nwrobel import mypycommons
+import com.nwrobel.mypycommons.utils
+import com.nwrobel.mypycommons.file
+import com.nwrobel.mypycommons.display
+
+def squareOrRaise(x):
+    '''
+    Module-level (picklable) function for the parallelMap tests.
+    '''
+    if (x < 0):
+        raise ValueError("negative: {}".format(x))
+    return x * x
+
+class TwoArgumentError(Exception):
+    '''
+    Exception that can be pickled but not unpickled (its __init__ takes two arguments).
+    '''
+    def __init__(self, a, b):
+        super().__init__("{} and {}".format(a, b))
+
+def squareOrRaiseUnpicklable(x):
+    if (x == 5):
+        raise TwoArgumentError(x, 'unpicklable')
+    return x * x
+
+class Utils_ModuleTest(unittest.TestCase):
+    def test_getListDupes(self):
+        self.assertEqual(mypycommons.utils.getListDupes([1, 2, 3, 2, 1, 2]), {1, 2})
+        self.assertEqual(mypycommons.utils.getListDupes(['a', 'b']), set())
+        self.assertEqual(mypycommons.utils.getListDupes([[1], [2]]), set())
+
+    def test_getDuplicateCounts(self):
+        result = mypycommons.utils.getDuplicateCounts(x for x in [3, 1, 3, 2, 1, 3])
+        self.assertEqual(result, {3: 3, 1: 2})
+        self.assertEqual(list(result), [3, 1])
+
+        result = mypycommons.utils.getDuplicateCounts(['a1', 'b1', 'a2'], keyFunc=lambda x: x[0])
+        self.assertEqual(result, {'a': 2})
+
+    def test_getDuplicateIndexes(self):
+        result = mypycommons.utils.getDuplicateIndexes(['x', 'y', 'x', 'z', 'x', 'y'])
+        self.assertEqual(result, {'x': [0, 2, 4], 'y': [1, 5]})
+
+        result = mypycommons.utils.getDuplicateIndexes([1, 2, 3, 4], keyFunc=lambda x: x % 2)
+        self.assertEqual(result, {1: [0, 2], 0: [1, 3]})
+
+    def test_getDuplicatesByKey(self):
+        testPaths = ['/a/x.txt', '/b/x.txt', '/b/y.txt', '/c/x.txt']
+        result = mypycommons.utils.getDuplicatesByKey(iter(testPaths), mypycommons.file.getFilename)
+        self.assertEqual(result, {'x.txt': ['/a/x.txt', '/b/x.txt', '/c/x.txt']})
+
+    def test_memoize(self):
+        calls = []
+
+        @mypycommons.utils.memoize(maxSize=2)
+        def square(x, offset=0):
+            calls.append(x)
+            return x * x + offset
+
+        self.assertEqual([square(2), square(2), square(3), square(2, offset=1)], [4, 4, 9, 5])
+        self.assertEqual(calls, [2, 3, 2])
+        self.assertEqual(square.__name__, 'square')
+
+        # maxSize 2: x=2 was evicted when (2, offset=1) was added after 3
+        square(2)
+        stats = square.getCacheStats()
+        self.assertEqual((stats['memoryHits'], stats['misses'], stats['memoryEvictions'], stats['memoryEntries']), (1, 4, 2, 2))
+
+        # arguments that can't be pickled are not cached, the function is still called
+        lock = threading.Lock()
+        @mypycommons.utils.memoize()
+        def isLocked(lock):
+            return lock.locked()
+
+        self.assertEqual([isLocked(lock), isLocked(lock)], [False, False])
+        self.assertEqual((isLocked.getCacheStats()['uncacheableCalls'], isLocked.getCacheStats()['misses']), (2, 0))
+
+        square.clearCache()
+        square(3)
+        self.assertEqual(square.getCacheStats()['misses'], 1)
+
+        @mypycommons.utils.memoize(ttlSeconds=0.05)
+        def getList(x):
+            calls.append(x)
+            return [x]
+
+        self.assertIs(getList([1]), getList([1]))
+        time.sleep(0.1)
+        getList([1])
+        self.assertEqual(getList.getCacheStats()['expirations'], 1)
+
+    def test_memoize_fileDependenciesAndDisk(self):
+        tempDir = tempfile.mkdtemp()
+        try:
+            testFilepath = os.path.join(tempDir, 'input.txt')
+            cacheFilepath = os.path.join(tempDir, 'cache', 'memoize.sqlite')
+            mypycommons.file.writeToFile(testFilepath, ['a', 'b'])
+            calls = []
+
+            def decorate():
+                @mypycommons.utils.memoize(diskCacheFilepath=cacheFilepath, maxDiskEntries=10, fileDependencyArgs=['filepath'])
+                def countLines(filepath):
+                    calls.append(filepath)
+                    return mypycommons.file.getFileLineCount(filepath)
+                return countLines
+
+            countLines = decorate()
+            self.assertEqual([countLines(testFilepath), countLines(filepath=testFilepath)], [2, 2])
+            self.assertEqual(len(calls), 1)
+
+            # a new decoration of the same function (like a new process run) uses the disk cache
+            countLines = decorate()
+            self.assertEqual(countLines(testFilepath), 2)
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(countLines.getCacheStats()['diskHits'], 1)
+
+            # changing the file invalidates the cached result
+            mypycommons.file.writeToFile(testFilepath, ['a', 'b', 'c'])
+            self.assertEqual(countLines(testFilepath), 3)
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(countLines.getCacheStats()['invalidations'], 1)
+
+            for i in range(20):
+                otherFilepath = os.path.join(tempDir, 'other-{}.txt'.format(i))
+                mypycommons.file.writeToFile(otherFilepath, 'x')
+                countLines(otherFilepath)
+            stats = countLines.getCacheStats()
+            self.assertLessEqual(stats['diskEntries'], 10)
+            self.assertGreater(stats['diskEvictions'], 0)
+
+            with self.assertRaises(ValueError):
+                mypycommons.utils.memoize(fileDependencyArgs=['notAnArg'])(lambda filepath: 0)
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_memoize_setArguments(self):
+        import subprocess
+
+        tempDir = tempfile.mkdtemp()
+        try:
+            cacheFilepath = os.path.join(tempDir, 'memoize.sqlite')
+            script = '''
+import sys
+sys.path.insert(0, {!r})
+from com.nwrobel import mypycommons
+import com.nwrobel.mypycommons.utils
+
+@mypycommons.utils.memoize(diskCacheFilepath={!r})
+def countNames(names):
+    return len(names)
+
+countNames(frozenset('name{{}}'.format(i) for i in range(20)))
+countNames({{'names': {{'a', 'b', 'c'}}}})
+print(countNames.getCacheStats()['diskHits'])
+'''.format(projectRoot, cacheFilepath)
+
+            # the pickled data of sets depends on the hash seed of the process, the cache keys don't
+            diskHits = []
+            for hashSeed in ['1', '2', '3']:
+                environment = dict(os.environ, PYTHONHASHSEED=hashSeed)
+                diskHits.append(int(subprocess.run([sys.executable, '-c', script], env=environment, check=True, capture_output=True, text=True).stdout))
+            self.assertEqual(diskHits, [0, 2, 2])
+
+            # sets of items that can't be sorted are only cached in memory
+            @mypycommons.utils.memoize(diskCacheFilepath=cacheFilepath)
+            def countItems(items):
+                return len(items)
+
+            self.assertEqual([countItems({1, 'a'}), countItems({1, 'a'})], [2, 2])
+            stats = countItems.getCacheStats()
+            self.assertEqual((stats['memoryHits'], stats['uncacheableCalls'], stats['diskEntries']), (1, 2, 0))
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_parallelMap(self):
+        items = list(range(500))
+        expected = [x * x for x in items]
+
+        self.assertEqual(list(mypycommons.utils.parallelMap(squareOrRaise, items, numWorkers=2)), expected)
+        self.assertEqual(list(mypycommons.utils.parallelMap(squareOrRaise, iter(items), useThreads=True, chunkSize=7)), expected)
+
+        unorderedResults = list(mypycommons.utils.parallelMap(squareOrRaise, (x for x in items), useThreads=True, ordered=False, maxPendingChunks=2))
+        self.assertEqual(sorted(unorderedResults), list(zip(items, expected)))
+
+        with self.assertRaises(ValueError):
+            list(mypycommons.utils.parallelMap(squareOrRaise, [1, -2, 3], numWorkers=2))
+
+        results = list(mypycommons.utils.parallelMap(squareOrRaise, [1, -2, 3], useThreads=True, captureErrors=True))
+        self.assertEqual((results[0], results[2]), (1, 9))
+        self.assertIsInstance(results[1], mypycommons.utils.ParallelMapItemError)
+        self.assertEqual(results[1].item, -2)
+        self.assertIsInstance(results[1].exception, ValueError)
+        self.assertIn('negative: -2', results[1].tracebackText)
+
+        # in a process pool too, including exceptions that can't be sent back as they are
+        results = list(mypycommons.utils.parallelMap(squareOrRaise, [1, -2, 3], numWorkers=2, captureErrors=True))
+        self.assertEqual((results[0], results[2]), (1, 9))
+        self.assertIsInstance(results[1].exception, ValueError)
+
+        results = list(mypycommons.utils.parallelMap(squareOrRaiseUnpicklable, range(10), numWorkers=2, captureErrors=True))
+        self.assertEqual([result for x, result in enumerate(results) if (x != 5)], [x * x for x in range(10) if (x != 5)])
+        self.assertIsInstance(results[5], mypycommons.utils.ParallelMapItemError)
+        self.assertIsInstance(results[5].exception, RuntimeError)
+        self.assertEqual(str(results[5].exception), 'TwoArgumentError: 5 and unpicklable')
+        self.assertIn('TwoArgumentError', results[5].tracebackText)
+
+        progressBar = mypycommons.display.ProgressBar(len(items), stream=io.StringIO())
+        list(mypycommons.utils.parallelMap(squareOrRaise, items, useThreads=True, progressBar=progressBar))
+        self.assertEqual(progressBar.iteration, len(items))
+
+if __name__ == '__main__':
+    unittest.main()